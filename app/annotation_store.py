@@ -0,0 +1,267 @@
+"""
+Armazenamento colunar das anotações (projetos com 100k+ retângulos).
+
+Cada página é um array estruturado NumPy (x0, y0, x1, y1 normalizados +
+ids de label/perfil); labels e perfis são internados numa única tabela de
+strings. Normalizar/desnormalizar e exportar são operações vetorizadas por
+página. O JSON cru de um projeto só vira array quando a página é acessada.
+
+A interface de dict[int, list[StoredRectNorm]] continua valendo: store[p]
+devolve uma lista nova de StoredRectNorm (cópia, não vista viva) e
+store[p] = lista grava a página inteira.
+
+spatial_index(p) devolve o índice de grade da página (app/spatial_index.py),
+guardado até a página ser regravada ou removida.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, MutableMapping, Sequence, Tuple
+
+import numpy as np
+
+from .model import StoredRectNorm
+
+RECT_DTYPE = np.dtype([
+    ("x0", "<f8"), ("y0", "<f8"), ("x1", "<f8"), ("y1", "<f8"),
+    ("label", "<i4"), ("profile", "<i4"),
+])
+
+_EMPTY = np.zeros(0, dtype=RECT_DTYPE)
+_EMPTY.setflags(write=False)
+
+
+class AnnotationStore(MutableMapping):
+    def __init__(self) -> None:
+        self._strings: List[str] = [""]
+        self._ids: Dict[str, int] = {"": 0}
+        self._pages: Dict[int, np.ndarray] = {}
+        self._raw: Dict[int, Any] = {}  # JSON cru do projeto, convertido no primeiro acesso
+        self._indexes: Dict[int, Any] = {}  # página -> GridIndex
+
+    # ---------------- strings internadas ----------------
+
+    def intern(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            i = self._ids[s] = len(self._strings)
+            self._strings.append(s)
+        return i
+
+    def _intern_many(self, values: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self.intern(str(v or "")) for v in values), dtype=np.int32, count=len(values))
+
+    def strings(self, ids: np.ndarray) -> List[str]:
+        table = self._strings
+        return [table[i] for i in ids.tolist()]
+
+    # ---------------- API colunar ----------------
+
+    def page_array(self, page: int) -> np.ndarray:
+        """Array estruturado da página (vazio se não houver retângulos)."""
+        arr = self._pages.get(page)
+        if arr is None:
+            raw = self._raw.pop(page, None)
+            if raw is None:
+                return _EMPTY
+            arr = self._pages[page] = self._array_from_json(raw)
+        return arr
+
+    def set_page_array(self, page: int, arr: np.ndarray) -> None:
+        self._raw.pop(page, None)
+        self._indexes.pop(page, None)
+        self._pages[page] = np.ascontiguousarray(arr, dtype=RECT_DTYPE)
+
+    def count(self, page: int) -> int:
+        arr = self._pages.get(page)
+        if arr is not None:
+            return len(arr)
+        return len(self._raw.get(page) or ())
+
+    @property
+    def total(self) -> int:
+        return sum(len(a) for a in self._pages.values()) + sum(len(r or ()) for r in self._raw.values())
+
+    def set_page_pixels(
+        self,
+        page: int,
+        rects_px: Sequence[Sequence[float]],
+        img_w: float,
+        img_h: float,
+        labels: Sequence[str],
+        profiles: Sequence[str],
+    ) -> None:
+        """Grava a página a partir de (x0, y0, x1, y1) em pixels (normalização vetorizada)."""
+        px = np.asarray(rects_px, dtype=np.float64).reshape(-1, 4)
+        arr = np.empty(len(px), dtype=RECT_DTYPE)
+        w, h = max(1.0, float(img_w)), max(1.0, float(img_h))
+        arr["x0"] = px[:, 0] / w
+        arr["y0"] = px[:, 1] / h
+        arr["x1"] = px[:, 2] / w
+        arr["y1"] = px[:, 3] / h
+        arr["label"] = self._intern_many(labels)
+        arr["profile"] = self._intern_many(profiles)
+        self.set_page_array(page, arr)
+
+    def page_pixels(self, page: int, img_w: float, img_h: float) -> np.ndarray:
+        """(N, 4) com x0, y0, x1, y1 em pixels."""
+        arr = self.page_array(page)
+        out = np.empty((len(arr), 4), dtype=np.float64)
+        out[:, 0] = arr["x0"] * img_w
+        out[:, 1] = arr["y0"] * img_h
+        out[:, 2] = arr["x1"] * img_w
+        out[:, 3] = arr["y1"] * img_h
+        return out
+
+    def boxes(self, page: int) -> np.ndarray:
+        """(N, 4) com x0, y0, x1, y1 normalizados."""
+        arr = self.page_array(page)
+        return np.column_stack([arr["x0"], arr["y0"], arr["x1"], arr["y1"]]) if len(arr) else np.zeros((0, 4))
+
+    def spatial_index(self, page: int):
+        """GridIndex da página (índices = linhas de page_array), reconstruído só depois de mudanças."""
+        idx = self._indexes.get(page)
+        if idx is None:
+            from .spatial_index import GridIndex
+
+            idx = self._indexes[page] = GridIndex(self.boxes(page))
+        return idx
+
+    def labels(self, page: int) -> List[str]:
+        return self.strings(self.page_array(page)["label"])
+
+    def profiles(self, page: int) -> List[str]:
+        return self.strings(self.page_array(page)["profile"])
+
+    # ---------------- API dict[int, list[StoredRectNorm]] ----------------
+
+    def __getitem__(self, page: int) -> List[StoredRectNorm]:
+        if page not in self._pages and page not in self._raw:
+            raise KeyError(page)
+        arr = self.page_array(page)
+        return [
+            StoredRectNorm(label=lb, x0n=x0, y0n=y0, x1n=x1, y1n=y1, profile=pf)
+            for x0, y0, x1, y1, lb, pf in zip(
+                arr["x0"].tolist(), arr["y0"].tolist(), arr["x1"].tolist(), arr["y1"].tolist(),
+                self.strings(arr["label"]), self.strings(arr["profile"]),
+            )
+        ]
+
+    def __setitem__(self, page: int, rects: Sequence[StoredRectNorm]) -> None:
+        arr = np.empty(len(rects), dtype=RECT_DTYPE)
+        arr["x0"] = [r.x0n for r in rects]
+        arr["y0"] = [r.y0n for r in rects]
+        arr["x1"] = [r.x1n for r in rects]
+        arr["y1"] = [r.y1n for r in rects]
+        arr["label"] = self._intern_many([r.label for r in rects])
+        arr["profile"] = self._intern_many([r.profile for r in rects])
+        self.set_page_array(page, arr)
+
+    def __delitem__(self, page: int) -> None:
+        self._indexes.pop(page, None)
+        if self._pages.pop(page, None) is None and self._raw.pop(page, None) is None:
+            raise KeyError(page)
+
+    def __contains__(self, page: object) -> bool:
+        return page in self._pages or page in self._raw
+
+    def __iter__(self) -> Iterator[int]:
+        yield from list(self._pages)
+        yield from list(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._pages) + len(self._raw)
+
+    # ---------------- serialização ----------------
+
+    def _array_from_json(self, items: Any) -> np.ndarray:
+        items = list(items or [])
+        arr = np.empty(len(items), dtype=RECT_DTYPE)
+        for name, key in (("x0", "x0_norm"), ("y0", "y0_norm"), ("x1", "x1_norm"), ("y1", "y1_norm")):
+            arr[name] = [float(it.get(key, 0.0)) for it in items]
+        arr["label"] = self._intern_many([str(it.get("label", "Campo")) for it in items])
+        arr["profile"] = self._intern_many([str(it.get("profile", "") or "") for it in items])
+        return arr
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "AnnotationStore":
+        """Formato "annotations" do projeto; conversão adiada por página."""
+        store = cls()
+        for k, items in (data or {}).items():
+            try:
+                store._raw[int(k)] = items or []
+            except (TypeError, ValueError):
+                continue
+        return store
+
+    def to_json(self) -> Dict[str, Any]:
+        """Formato "annotations" (uma lista de objetos por página); páginas não acessadas saem como vieram."""
+        out: Dict[str, Any] = {}
+        for page, arr in self._pages.items():
+            out[str(page)] = [
+                {"label": lb, "x0_norm": x0, "y0_norm": y0, "x1_norm": x1, "y1_norm": y1, "profile": pf}
+                for x0, y0, x1, y1, lb, pf in zip(
+                    arr["x0"].tolist(), arr["y0"].tolist(), arr["x1"].tolist(), arr["y1"].tolist(),
+                    self.strings(arr["label"]), self.strings(arr["profile"]),
+                )
+            ]
+        for page, items in self._raw.items():
+            out[str(page)] = items
+        return out
+
+    def to_columnar_json(self) -> Dict[str, Any]:
+        """Formato compacto: tabela de strings + uma lista por coluna em cada página."""
+        pages: Dict[str, Any] = {}
+        for page in sorted(self):
+            arr = self.page_array(page)
+            pages[str(page)] = {name: arr[name].tolist() for name in RECT_DTYPE.names}
+        return {"strings": list(self._strings), "pages": pages}
+
+    @classmethod
+    def from_columnar_json(cls, data: Dict[str, Any]) -> "AnnotationStore":
+        store = cls()
+        remap = np.array([store.intern(str(s)) for s in (data or {}).get("strings", [""])] or [0], dtype=np.int32)
+        for k, cols in ((data or {}).get("pages") or {}).items():
+            try:
+                page = int(k)
+            except (TypeError, ValueError):
+                continue
+            n = len(cols.get("x0", []))
+            arr = np.empty(n, dtype=RECT_DTYPE)
+            for name in ("x0", "y0", "x1", "y1"):
+                arr[name] = cols.get(name, [0.0] * n)
+            for name in ("label", "profile"):
+                arr[name] = remap[np.asarray(cols.get(name, [0] * n), dtype=np.int64)]
+            store._pages[page] = arr
+        return store
+
+
+def rows_for_page(
+    store: AnnotationStore,
+    page: int,
+    page_value: int,
+    base_file: str,
+    img_w: int,
+    img_h: int,
+    profile_name: str = "",
+) -> List[Tuple[Any, ...]]:
+    """Linhas do CSV (mesma ordem de colunas de export_csv) calculadas por página, sem objeto por retângulo."""
+    arr = store.page_array(page)
+    if not len(arr):
+        return []
+    x0 = arr["x0"] * img_w
+    y0 = arr["y0"] * img_h
+    x1 = arr["x1"] * img_w
+    y1 = arr["y1"] * img_h
+    cols = (
+        arr["x0"].tolist(), arr["y0"].tolist(), arr["x1"].tolist(), arr["y1"].tolist(),
+        x0.tolist(), y0.tolist(), np.abs(x1 - x0).tolist(), np.abs(y1 - y0).tolist(),
+    )
+    labels = store.strings(arr["label"])
+    profiles = [p or profile_name or "" for p in store.strings(arr["profile"])]
+    return [
+        (base_file, page_value, lb, pf,
+         f"{nx0:.6f}", f"{ny0:.6f}", f"{nx1:.6f}", f"{ny1:.6f}",
+         f"{px0:.2f}", f"{py0:.2f}", f"{pw:.2f}", f"{ph:.2f}",
+         img_w, img_h)
+        for lb, pf, nx0, ny0, nx1, ny1, px0, py0, pw, ph in zip(labels, profiles, *cols)
+    ]
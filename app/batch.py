@@ -0,0 +1,843 @@
+"""
+Execução em lote (sem GUI): aplica os retângulos e o perfil OCR de um
+projeto JSON a outros documentos (PDF/imagem) e grava o texto em CSV.
+
+Uso:
+    python -m app.batch projeto.json doc1.pdf doc2.pdf -o resultado.csv [--register]
+        [--processes N | --pipeline [--workers N] [--queue-mb M] [--stats]]
+        [--journal arq.jsonl] [--resume]
+        [--progress] [--metrics-file m.prom] [--metrics-json m.jsonl] [--perf-profile PASTA]
+        [--raster-cache [PASTA]]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import threading
+from collections import deque
+from functools import lru_cache
+from contextlib import nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import cv2
+import fitz  # PyMuPDF
+
+from ocr.cascade import CascadeStep, cascade_from_json, run_cascade
+from ocr.preprocess import OCRParams, apply_preprocess
+from ocr.tesseract_engine import run_ocr
+
+from .journal import JournalKey, ResultJournal, default_journal_path
+from .metrics import REGISTRY, MetricsExporter, ProgressLine
+from .model import StoredRectNorm
+from .pdf_render import render_pdf_page_bgr
+from .pipeline import Pipeline, Stage
+from .profiling import ProfileSession
+from .project_io import load_project_json
+from .raster_broker import RasterBroker, RasterDescriptor, attach, peak_rss_bytes
+from .raster_cache import DiskRasterCache
+from .registration import PageRegistrar
+
+
+RESULT_FIELDS = [
+    "file", "page", "region", "label", "ocr_profile", "text", "conf",
+    "cascade_step", "cascade_accepted",
+    "x0_norm", "y0_norm", "x1_norm", "y1_norm",
+]
+
+PAGES_RENDERED = REGISTRY.counter("ocr_pages_rendered_total", "Páginas renderizadas/decodificadas")
+REGIONS_DONE = REGISTRY.counter("ocr_regions_total", "Regiões concluídas", ("profile",))
+REGIONS_BLANK = REGISTRY.counter("ocr_regions_blank_total", "Regiões com recorte vazio (OCR pulado)")
+FAILURES = REGISTRY.counter("ocr_failures_total", "Falhas", ("stage",))
+CACHE_HITS = REGISTRY.counter("ocr_cache_hits_total", "Acertos de cache", ("cache",))
+STAGE_SECONDS = REGISTRY.histogram("ocr_stage_seconds", "Tempo por estágio", ("stage",))
+
+
+@dataclass
+class BatchProject:
+    source_path: str
+    is_pdf: bool
+    render_zoom: float
+    stored_norm: Dict[int, List[StoredRectNorm]]
+    ocr_profiles: Dict[str, dict] = field(default_factory=dict)
+    active_profile_name: str = ""
+    cascade: List[CascadeStep] = field(default_factory=list)
+
+    def params_for(self, profile_name: str = "") -> OCRParams:
+        name = profile_name or self.active_profile_name
+        return OCRParams.from_dict(self.ocr_profiles.get(name, {}))
+
+    def rects_for_page(self, page_index: int) -> List[StoredRectNorm]:
+        return self.stored_norm.get(page_index, [])
+
+    def requested_profile(self, sr: StoredRectNorm) -> str:
+        return sr.profile or self.active_profile_name
+
+
+@dataclass(frozen=True)
+class PageRef:
+    source_path: str
+    page_index: int
+
+    @property
+    def base_file(self) -> str:
+        return os.path.basename(self.source_path)
+
+    @property
+    def page_value(self) -> int:
+        # page no CSV: 1-based para PDF e TIFF multipágina, 0 para imagem de um quadro (igual ao export_csv)
+        if is_pdf_path(self.source_path) or image_frame_count(self.source_path) > 1:
+            return self.page_index + 1
+        return 0
+
+
+def load_batch_project(path: str) -> BatchProject:
+    data = load_project_json(path)
+    source_path = data.get("source_path") or ""
+    return BatchProject(
+        source_path=source_path,
+        is_pdf=bool(data.get("is_pdf", False)) or is_pdf_path(source_path),
+        render_zoom=float(data.get("pdf_render_zoom", 2.5)),
+        stored_norm=data.get("annotations_parsed", {}),
+        ocr_profiles=data.get("ocr_profiles", {}) or {},
+        active_profile_name=data.get("active_profile_name", "") or "",
+        cascade=cascade_from_json(data.get("ocr_cascade")),
+    )
+
+
+def is_pdf_path(path: str) -> bool:
+    return str(path).lower().endswith(".pdf")
+
+
+@lru_cache(maxsize=256)
+def image_frame_count(path: str) -> int:
+    """Quadros da imagem (TIFF multipágina); demais formatos têm um."""
+    if not str(path).lower().endswith((".tif", ".tiff")):
+        return 1
+    imcount = getattr(cv2, "imcount", None)  # OpenCV >= 4.6: conta sem decodificar
+    if imcount is not None:
+        return max(1, int(imcount(path)))
+    ok, frames = cv2.imreadmulti(path, flags=cv2.IMREAD_COLOR)
+    return max(1, len(frames)) if ok else 1
+
+
+def read_image_frame(path: str, frame: int) -> Optional[np.ndarray]:
+    """Decodifica só o quadro pedido (quadro 0 = cv2.imread)."""
+    if frame == 0:
+        return cv2.imread(path, cv2.IMREAD_COLOR)
+    try:
+        ok, mats = cv2.imreadmulti(path, [], frame, 1, cv2.IMREAD_COLOR)  # faixa: OpenCV >= 4.5.1
+    except (cv2.error, TypeError):
+        ok, mats = cv2.imreadmulti(path, flags=cv2.IMREAD_COLOR)
+        mats = mats[frame:frame + 1] if ok else []
+    return mats[0] if ok and mats else None
+
+
+def iter_document_pages(
+    path: str,
+    zoom: float,
+    page_filter: Optional[Callable[[int], bool]] = None,
+    raster_cache: Optional[DiskRasterCache] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Gera (page_index, bgr) para cada página do documento (só as aceitas por
+    page_filter). Com raster_cache, páginas já renderizadas vêm do disco
+    (mmap, somente leitura).
+    """
+    if is_pdf_path(path):
+        doc = fitz.open(path)
+        doc_hash = raster_cache.document_hash(path) if raster_cache is not None else ""
+        try:
+            for page_index in range(doc.page_count):
+                if page_filter is None or page_filter(page_index):
+                    with STAGE_SECONDS.time(stage="render"):
+                        if raster_cache is not None:
+                            page_bgr = raster_cache.render_pdf_page_bgr(doc, doc_hash, page_index, zoom)
+                        else:
+                            page_bgr = render_pdf_page_bgr(doc, page_index, zoom)
+                    PAGES_RENDERED.inc()
+                    yield page_index, page_bgr
+        finally:
+            doc.close()
+    else:
+        # um quadro por vez: TIFF multipágina não fica inteiro em memória
+        for frame in range(image_frame_count(path)):
+            if page_filter is None or page_filter(frame):
+                with STAGE_SECONDS.time(stage="render"):
+                    img = read_image_frame(path, frame)
+                if img is None:
+                    raise RuntimeError(f"Não foi possível carregar o quadro {frame + 1} da imagem: {path}")
+                PAGES_RENDERED.inc()
+                yield frame, img
+
+
+def count_pages(doc_paths: List[str], wanted: Optional[Callable[[str, int], bool]] = None) -> int:
+    """
+    Páginas que o lote vai renderizar. wanted(path, page_index) deve seguir o
+    mesmo critério do page_filter da execução (WorkPlan.wants_page), senão
+    % e ETA do --progress contam páginas que nunca serão renderizadas.
+    """
+    total = 0
+    for path in doc_paths:
+        if is_pdf_path(path):
+            with fitz.open(path) as doc:
+                n = doc.page_count
+        else:
+            n = image_frame_count(path)
+        total += n if wanted is None else sum(1 for i in range(n) if wanted(path, i))
+    return total
+
+
+def template_page_loader(project: BatchProject) -> Callable[[int], Optional[np.ndarray]]:
+    """Carrega sob demanda as páginas do documento-template do projeto."""
+    state: Dict[str, fitz.Document | None] = {"doc": None}
+
+    def load(page_index: int) -> Optional[np.ndarray]:
+        path = project.source_path
+        if not path or not os.path.exists(path):
+            return None
+        if not project.is_pdf:
+            return read_image_frame(path, page_index) if page_index < image_frame_count(path) else None
+        if state["doc"] is None:
+            state["doc"] = fitz.open(path)
+        doc = state["doc"]
+        if page_index >= doc.page_count:
+            return None
+        return render_pdf_page_bgr(doc, page_index, project.render_zoom)
+
+    return load
+
+
+def crop_norm(page_bgr: np.ndarray, sr: StoredRectNorm) -> Optional[np.ndarray]:
+    h, w = page_bgr.shape[:2]
+    x0 = int(round(min(sr.x0n, sr.x1n) * w))
+    x1 = int(round(max(sr.x0n, sr.x1n) * w))
+    y0 = int(round(min(sr.y0n, sr.y1n) * h))
+    y1 = int(round(max(sr.y0n, sr.y1n) * h))
+    x0, x1 = max(0, x0), min(w, x1)
+    y0, y1 = max(0, y0), min(h, y1)
+    if x1 - x0 <= 1 or y1 - y0 <= 1:
+        return None
+    return page_bgr[y0:y1, x0:x1]
+
+
+def config_key(params: OCRParams) -> Tuple:
+    """Chave da configuração resolvida (idioma, whitelist/blacklist, pré-processamento)."""
+    return tuple(sorted(params.to_dict().items()))
+
+
+def group_by_config(
+    rects: List[StoredRectNorm], project: BatchProject
+) -> Tuple[List[List[Tuple[int, str, OCRParams]]], List[int]]:
+    """
+    Agrupa as regiões pela configuração OCR resolvida, para que cada
+    configuração rode em sequência em vez de alternar a cada região.
+    Retorna (grupos de (índice, perfil, params), índices que vão para a cascata).
+    """
+    groups: Dict[Tuple, List[Tuple[int, str, OCRParams]]] = {}
+    resolved: Dict[str, OCRParams] = {}
+    cascaded: List[int] = []
+
+    for i, sr in enumerate(rects):
+        # perfil vinculado à região tem prioridade sobre a cascata
+        if not sr.profile and project.cascade:
+            cascaded.append(i)
+            continue
+        name = sr.profile or project.active_profile_name
+        if name not in resolved:
+            resolved[name] = project.params_for(name)
+        params = resolved[name]
+        groups.setdefault(config_key(params), []).append((i, name, params))
+
+    return list(groups.values()), cascaded
+
+
+def _result_row(
+    page: PageRef,
+    region: int,
+    sr: StoredRectNorm,
+    requested_profile: str,
+    profile_name: str,
+    text: str,
+    conf: Optional[float],
+    step: Union[str, int] = "",
+    accepted: Union[str, int] = "",
+) -> Dict[str, Union[str, int]]:
+    return {
+        "file": page.base_file,
+        "page": page.page_value,
+        "region": region,
+        "label": sr.label,
+        "ocr_profile": profile_name,
+        "text": text,
+        "conf": "" if conf is None else f"{conf:.1f}",
+        "cascade_step": step,
+        "cascade_accepted": accepted,
+        "x0_norm": f"{sr.x0n:.6f}",
+        "y0_norm": f"{sr.y0n:.6f}",
+        "x1_norm": f"{sr.x1n:.6f}",
+        "y1_norm": f"{sr.y1n:.6f}",
+        # campos internos (não vão para o CSV)
+        "_source": page.source_path,
+        "_page_index": page.page_index,
+        "_requested_profile": requested_profile,
+    }
+
+
+def ocr_page(
+    page_bgr: np.ndarray,
+    rects: List[StoredRectNorm],
+    project: BatchProject,
+    *,
+    page: PageRef,
+    regions: Optional[List[int]] = None,
+) -> List[Dict[str, Union[str, int]]]:
+    """OCR das regiões de uma página; regions[i] é o índice original de rects[i]."""
+    regions = regions if regions is not None else list(range(len(rects)))
+    rows: List[Optional[Dict[str, Union[str, int]]]] = [None] * len(rects)
+    groups, cascaded = group_by_config(rects, project)
+
+    for members in groups:
+        for i, profile_name, params in members:
+            sr = rects[i]
+            crop = crop_norm(page_bgr, sr)
+            text, conf = "", None
+            if crop is not None:
+                with STAGE_SECONDS.time(stage="preprocess"):
+                    img_ocr, _ = apply_preprocess(crop, params)
+                with STAGE_SECONDS.time(stage="ocr"):
+                    text, conf, _ = run_ocr(img_ocr, params)
+            else:
+                REGIONS_BLANK.inc()
+            rows[i] = _result_row(page, regions[i], sr, profile_name, profile_name, text, conf)
+
+    for i in cascaded:
+        sr = rects[i]
+        requested = project.requested_profile(sr)
+        crop = crop_norm(page_bgr, sr)
+        if crop is None:
+            REGIONS_BLANK.inc()
+            rows[i] = _result_row(page, regions[i], sr, requested, "", "", None)
+            continue
+        with STAGE_SECONDS.time(stage="cascade"):
+            res = run_cascade(crop, project.cascade, project.ocr_profiles)
+        # passo 1-based no CSV
+        step = res.step + 1 if res.step >= 0 else ""
+        rows[i] = _result_row(page, regions[i], sr, requested, res.profile, res.text, res.conf,
+                              step, int(res.accepted))
+
+    # mantém a ordem original das regiões na saída
+    return [r for r in rows if r is not None]
+
+
+# ---------------- seleção de trabalho / saída ----------------
+
+class WorkPlan:
+    """Quais regiões de cada página ainda precisam rodar (com diário, pula as concluídas)."""
+    def __init__(self, project: BatchProject, journal: Optional[ResultJournal] = None):
+        self.project = project
+        self.journal = journal
+        self.skipped = 0  # regiões desta execução já presentes no diário
+        self._lock = threading.Lock()
+
+    def key(self, source_path: str, page_index: int, region: int, sr: StoredRectNorm) -> JournalKey:
+        assert self.journal is not None
+        return (
+            self.journal.digest(source_path), page_index, region,
+            sr.label, self.project.requested_profile(sr),
+        )
+
+    def todo(self, source_path: str, page_index: int) -> List[int]:
+        rects = self.project.rects_for_page(page_index)
+        if self.journal is None:
+            return list(range(len(rects)))
+        return [
+            r for r, sr in enumerate(rects)
+            if self.key(source_path, page_index, r, sr) not in self.journal
+        ]
+
+    def wants_page(self, source_path: str, page_index: int) -> bool:
+        """Mesmo critério de page_filter, sem contar regiões puladas (para estimar o total)."""
+        return bool(self.todo(source_path, page_index))
+
+    def page_filter(self, source_path: str) -> Callable[[int], bool]:
+        def wanted(page_index: int) -> bool:
+            if self.todo(source_path, page_index):
+                return True
+            # página inteira já no diário: não é renderizada nem passa por select()
+            self._count_skipped(len(self.project.rects_for_page(page_index)))
+            return False
+
+        return wanted
+
+    def _count_skipped(self, n: int) -> None:
+        if n and self.journal is not None:
+            CACHE_HITS.inc(n, cache="journal")
+            with self._lock:
+                self.skipped += n
+
+    def select(
+        self, source_path: str, page_index: int, rects: List[StoredRectNorm]
+    ) -> Tuple[List[StoredRectNorm], List[int]]:
+        """Filtra rects (já registrados, mesma ordem do projeto) para as regiões pendentes."""
+        regions = self.todo(source_path, page_index)
+        self._count_skipped(len(rects) - len(regions))
+        return [rects[r] for r in regions], regions
+
+
+class RowSink:
+    """Destino das linhas: CSV direto ou diário (CSV montado no final)."""
+    def __init__(self, writer: Optional[csv.DictWriter], plan: WorkPlan):
+        self._writer = writer
+        self._plan = plan
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def writerows(self, rows: List[Dict[str, Union[str, int]]]) -> None:
+        journal = self._plan.journal
+        with self._lock:
+            for row in rows:
+                if journal is not None:
+                    key = (
+                        journal.digest(str(row["_source"])), int(row["_page_index"]), int(row["region"]),
+                        str(row["label"]), str(row["_requested_profile"]),
+                    )
+                    journal.append(key, row)
+                else:
+                    self._writer.writerow(row)
+                self.count += 1
+                REGIONS_DONE.inc(profile=str(row["ocr_profile"]))
+
+
+def write_csv_from_journal(out_path: str, journal: ResultJournal, doc_paths: List[str]) -> int:
+    """
+    CSV final a partir do diário, na ordem documento/página/região. A chave
+    é o conteúdo (sha256): arquivos idênticos em caminhos diferentes
+    compartilham o OCR, e as linhas saem uma vez por caminho, com o "file"
+    de cada um.
+    """
+    by_digest: Dict[str, List[Tuple[JournalKey, Dict[str, Any]]]] = {}
+    for k, row in journal.items():
+        by_digest.setdefault(k[0], []).append((k, row))
+    for entries in by_digest.values():
+        entries.sort(key=lambda e: (e[0][1], e[0][2]))
+
+    n = 0
+    seen = set()
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for path in doc_paths:
+            if os.path.abspath(path) in seen:
+                continue
+            seen.add(os.path.abspath(path))
+            base = os.path.basename(path)
+            for _, row in by_digest.get(journal.digest(path), ()):
+                writer.writerow({**row, "file": base})
+                n += 1
+    os.replace(tmp, out_path)
+    return n
+
+
+# ---------------- workers em processos (raster compartilhado) ----------------
+
+_WORKER_PROJECT: Optional[BatchProject] = None
+# medidas feitas nos workers, devolvidas com cada pedaço e somadas no registro do principal
+_WORKER_METRICS = (STAGE_SECONDS, REGIONS_BLANK)
+
+
+def _init_worker(project: BatchProject) -> None:
+    global _WORKER_PROJECT
+    _WORKER_PROJECT = project
+    # com fork o worker herda os valores do principal: zera para só devolver o que medir
+    for metric in _WORKER_METRICS:
+        metric.take()
+
+
+def _ocr_shared_chunk(
+    desc: RasterDescriptor,
+    rects: List[StoredRectNorm],
+    regions: List[int],
+    page: PageRef,
+) -> Tuple[List[Dict[str, Union[str, int]]], int, Optional[int], List[Dict]]:
+    shm, page_bgr = attach(desc)
+    try:
+        rows = ocr_page(page_bgr, rects, _WORKER_PROJECT, page=page, regions=regions)
+    finally:
+        del page_bgr
+        shm.close()
+    return rows, os.getpid(), peak_rss_bytes(), [metric.take() for metric in _WORKER_METRICS]
+
+
+def _iter_shared_pages(
+    broker: RasterBroker,
+    path: str,
+    zoom: float,
+    page_filter: Callable[[int], bool],
+    raster_cache: Optional[DiskRasterCache] = None,
+) -> Iterator[Tuple[int, RasterDescriptor]]:
+    if is_pdf_path(path):
+        doc = fitz.open(path)
+        doc_hash = raster_cache.document_hash(path) if raster_cache is not None else ""
+        try:
+            for page_index in range(doc.page_count):
+                if page_filter(page_index):
+                    with STAGE_SECONDS.time(stage="render"):
+                        if raster_cache is not None:
+                            desc = broker.publish(
+                                raster_cache.render_pdf_page_bgr(doc, doc_hash, page_index, zoom)
+                            )
+                        else:
+                            desc = broker.render_pdf_page(doc, page_index, zoom)
+                    PAGES_RENDERED.inc()
+                    yield page_index, desc
+        finally:
+            doc.close()
+    else:
+        for frame in range(image_frame_count(path)):
+            if page_filter(frame):
+                with STAGE_SECONDS.time(stage="render"):
+                    img = read_image_frame(path, frame)
+                if img is None:
+                    raise RuntimeError(f"Não foi possível carregar o quadro {frame + 1} da imagem: {path}")
+                PAGES_RENDERED.inc()
+                yield frame, broker.publish(img)
+
+
+def _chunks(n_items: int, n_chunks: int) -> List[slice]:
+    size = max(1, -(-n_items // max(1, n_chunks)))
+    return [slice(i, i + size) for i in range(0, n_items, size)]
+
+
+def _run_shared(
+    project: BatchProject,
+    doc_paths: List[str],
+    sink: RowSink,
+    plan: WorkPlan,
+    registrar: Optional[PageRegistrar],
+    processes: int,
+    stats: Dict[str, int],
+    max_pages_in_flight: int = 2,
+    raster_cache: Optional[DiskRasterCache] = None,
+) -> None:
+    worker_peak: Dict[int, int] = {}
+    pending: Deque[List[Future]] = deque()
+
+    def drain(limit: int) -> None:
+        while len(pending) > limit:
+            for fut in pending.popleft():
+                rows, pid, peak, measured = fut.result()
+                for metric, values in zip(_WORKER_METRICS, measured):
+                    metric.merge(values)
+                sink.writerows(rows)
+                if peak:
+                    worker_peak[pid] = max(worker_peak.get(pid, 0), peak)
+
+    with RasterBroker() as broker, ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(project,)
+    ) as pool:
+        for path in doc_paths:
+            for page_index, desc in _iter_shared_pages(
+                broker, path, project.render_zoom, plan.page_filter(path), raster_cache
+            ):
+                page = PageRef(path, page_index)
+                rects = project.rects_for_page(page_index)
+                if registrar is not None:
+                    shm, page_bgr = attach(desc)
+                    try:
+                        rects, _ = registrar.register_rects(page_index, page_bgr, rects)
+                    finally:
+                        del page_bgr
+                        shm.close()
+                rects, regions = plan.select(path, page_index, rects)
+
+                # mais pedaços que workers para equilibrar páginas com muitas regiões
+                chunks = _chunks(len(rects), processes * 2)
+                broker.retain(desc, len(chunks))
+                futures = []
+                for sl in chunks:
+                    fut = pool.submit(_ocr_shared_chunk, desc, rects[sl], regions[sl], page)
+                    fut.add_done_callback(lambda _f, d=desc: broker.release(d))
+                    futures.append(fut)
+                pending.append(futures)
+                # limita páginas em memória compartilhada ao mesmo tempo
+                drain(max_pages_in_flight - 1)
+        drain(0)
+
+        stats["shared_peak_bytes"] = broker.peak_bytes
+
+    stats["main_peak_rss_bytes"] = peak_rss_bytes() or 0
+    stats["worker_peak_rss_bytes"] = max(worker_peak.values(), default=0)
+
+
+# ---------------- pipeline em estágios (filas limitadas) ----------------
+
+@dataclass
+class _PageTask:
+    page: PageRef
+    page_bgr: np.ndarray
+
+
+@dataclass
+class _RegionTask:
+    page: PageRef
+    region: int
+    sr: StoredRectNorm
+    profile_name: str
+    params: Optional[OCRParams]  # None = cascata
+    crop: Optional[np.ndarray]
+    img_ocr: Optional[np.ndarray] = None
+
+
+def build_ocr_pipeline(
+    project: BatchProject,
+    sink: RowSink,
+    plan: WorkPlan,
+    registrar: Optional[PageRegistrar],
+    *,
+    workers: int = 0,
+    queue_bytes: int = 0,
+    raster_cache: Optional[DiskRasterCache] = None,
+) -> Pipeline:
+    """Estágios: decode (fitz.open/load_page) -> crop -> preprocess -> ocr -> write."""
+    workers = workers or (os.cpu_count() or 1)
+
+    def decode(path: str) -> Iterator[_PageTask]:
+        for page_index, page_bgr in iter_document_pages(
+            path, project.render_zoom, plan.page_filter(path), raster_cache
+        ):
+            yield _PageTask(PageRef(path, page_index), page_bgr)
+
+    def crop(task: _PageTask) -> Iterator[_RegionTask]:
+        page = task.page
+        rects = project.rects_for_page(page.page_index)
+        if registrar is not None:
+            rects, _ = registrar.register_rects(page.page_index, task.page_bgr, rects)
+        rects, regions = plan.select(page.source_path, page.page_index, rects)
+        groups, cascaded = group_by_config(rects, project)
+        # mesma configuração em sequência; cópia do recorte libera o raster da página
+        for members in groups:
+            for i, profile_name, params in members:
+                c = crop_norm(task.page_bgr, rects[i])
+                yield _RegionTask(page, regions[i], rects[i], profile_name, params,
+                                  None if c is None else c.copy())
+        for i in cascaded:
+            c = crop_norm(task.page_bgr, rects[i])
+            yield _RegionTask(page, regions[i], rects[i], "", None, None if c is None else c.copy())
+
+    def preprocess(task: _RegionTask) -> _RegionTask:
+        if task.params is not None and task.crop is not None:
+            with STAGE_SECONDS.time(stage="preprocess"):
+                task.img_ocr, _ = apply_preprocess(task.crop, task.params)
+            task.crop = None
+        return task
+
+    def recognize(task: _RegionTask) -> Dict[str, Union[str, int]]:
+        if task.params is None:
+            requested = project.requested_profile(task.sr)
+            if task.crop is None:
+                REGIONS_BLANK.inc()
+                return _result_row(task.page, task.region, task.sr, requested, "", "", None)
+            with STAGE_SECONDS.time(stage="cascade"):
+                res = run_cascade(task.crop, project.cascade, project.ocr_profiles)
+            step = res.step + 1 if res.step >= 0 else ""
+            return _result_row(task.page, task.region, task.sr, requested, res.profile,
+                               res.text, res.conf, step, int(res.accepted))
+        text, conf = "", None
+        if task.img_ocr is not None:
+            with STAGE_SECONDS.time(stage="ocr"):
+                text, conf, _ = run_ocr(task.img_ocr, task.params)
+        else:
+            REGIONS_BLANK.inc()
+        return _result_row(task.page, task.region, task.sr, task.profile_name, task.profile_name, text, conf)
+
+    def write(row: Dict[str, Union[str, int]]) -> None:
+        sink.writerows([row])
+
+    stages = [
+        Stage("decode", decode, workers=1, queue_size=4, expand=True),
+        Stage("crop", crop, workers=1, queue_size=2, max_bytes=queue_bytes, expand=True),
+        Stage("preprocess", preprocess, workers=workers, queue_size=4 * workers),
+        Stage("ocr", recognize, workers=workers, queue_size=4 * workers),
+        Stage("write", write, workers=1, queue_size=64),
+    ]
+    return Pipeline(stages)
+
+
+def format_pipeline_stats(stats: List[Dict[str, Any]]) -> str:
+    return " | ".join(
+        f"{s['stage']}: fila {s['queue_depth']} ok {s['processed']} uso {100.0 * s['utilization']:.0f}%"
+        for s in stats
+    )
+
+
+def _run_serial(
+    project: BatchProject,
+    doc_paths: List[str],
+    sink: RowSink,
+    plan: WorkPlan,
+    registrar: Optional[PageRegistrar],
+    raster_cache: Optional[DiskRasterCache] = None,
+) -> None:
+    for path in doc_paths:
+        for page_index, page_bgr in iter_document_pages(
+            path, project.render_zoom, plan.page_filter(path), raster_cache
+        ):
+            rects = project.rects_for_page(page_index)
+            if registrar is not None:
+                rects, _ = registrar.register_rects(page_index, page_bgr, rects)
+            rects, regions = plan.select(path, page_index, rects)
+            rows = ocr_page(page_bgr, rects, project, page=PageRef(path, page_index), regions=regions)
+            sink.writerows(rows)
+
+
+def run_batch(
+    project: BatchProject,
+    doc_paths: List[str],
+    out_path: str,
+    *,
+    register: bool = False,
+    processes: int = 0,
+    pipeline: bool = False,
+    workers: int = 0,
+    queue_bytes: int = 0,
+    on_stats: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    journal: Optional[ResultJournal] = None,
+    stats: Optional[Dict[str, int]] = None,
+    raster_cache: Optional[DiskRasterCache] = None,
+) -> int:
+    """
+    Roda o lote e grava o CSV. Com journal, cada região concluída vai para o
+    diário e o CSV é montado no final a partir dele (uma linha por região,
+    mesmo após retomadas). Retorna o nº de linhas do CSV.
+    """
+    registrar = PageRegistrar(template_page_loader(project)) if register else None
+    stats = stats if stats is not None else {}
+    plan = WorkPlan(project, journal)
+
+    def execute(sink: RowSink) -> None:
+        try:
+            if processes > 0:
+                _run_shared(project, doc_paths, sink, plan, registrar, processes, stats,
+                            raster_cache=raster_cache)
+            elif pipeline:
+                build_ocr_pipeline(
+                    project, sink, plan, registrar, workers=workers, queue_bytes=queue_bytes,
+                    raster_cache=raster_cache,
+                ).run(doc_paths, on_stats=on_stats)
+            else:
+                _run_serial(project, doc_paths, sink, plan, registrar, raster_cache)
+        except Exception:
+            FAILURES.inc(stage="batch")
+            raise
+
+    if journal is not None:
+        sink = RowSink(None, plan)
+        try:
+            execute(sink)
+        finally:
+            journal.sync()
+        stats["journal_skipped"] = plan.skipped
+        stats["journal_new"] = sink.count
+        return write_csv_from_journal(out_path, journal, doc_paths)
+
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        sink = RowSink(writer, plan)
+        execute(sink)
+    return sink.count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.batch", description="OCR em lote a partir de um projeto JSON.")
+    ap.add_argument("project", help="Projeto JSON (retângulos + perfis OCR)")
+    ap.add_argument("documents", nargs="+", help="PDFs/imagens a processar")
+    ap.add_argument("-o", "--output", required=True, help="CSV de saída")
+    ap.add_argument("--register", action="store_true",
+                    help="Alinha cada página ao template do projeto antes de recortar")
+    ap.add_argument("--processes", type=int, default=0,
+                    help="Workers em processos; páginas vão por memória compartilhada (0 = serial)")
+    ap.add_argument("--pipeline", action="store_true",
+                    help="Render, recorte, pré-processamento, OCR e escrita em estágios sobrepostos")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="Threads dos estágios preprocess/ocr do pipeline (0 = nº de CPUs)")
+    ap.add_argument("--queue-mb", type=float, default=512.0,
+                    help="Teto de memória das páginas na fila do pipeline (MB)")
+    ap.add_argument("--stats", action="store_true", help="Mostra fila/uso de cada estágio do pipeline")
+    ap.add_argument("--journal", default="",
+                    help="Diário JSONL de resultados (padrão com --resume: <saída>.journal.jsonl)")
+    ap.add_argument("--resume", action="store_true",
+                    help="Retoma a partir do diário, pulando regiões já concluídas")
+    ap.add_argument("--progress", action="store_true", help="Linha de progresso com pág/s e ETA")
+    ap.add_argument("--metrics-file", default="",
+                    help="Grava as métricas no formato texto do Prometheus (atualizado periodicamente)")
+    ap.add_argument("--metrics-json", default="", help="Anexa snapshots JSON das métricas (JSONL)")
+    ap.add_argument("--metrics-interval", type=float, default=10.0, help="Intervalo dos snapshots (s)")
+    ap.add_argument("--raster-cache", metavar="PASTA", nargs="?", const="", default=None,
+                    help="Cache em disco das páginas renderizadas (padrão: ~/.cache/marcador/rasters)")
+    ap.add_argument("--raster-cache-mb", type=float, default=4096.0, help="Teto do cache de páginas (MB)")
+    ap.add_argument("--raster-cache-compress", action="store_true",
+                    help="Grava páginas compactadas (.npz) em vez de .npy mapeável")
+    ap.add_argument("--perf-profile", metavar="PASTA", nargs="?", const="", default=None,
+                    help="Grava perfil de desempenho (pstats + pilhas collapsed) do processo principal")
+    args = ap.parse_args(argv)
+
+    project = load_batch_project(args.project)
+    stats: Dict[str, int] = {}
+    raster_cache = None
+    if args.raster_cache is not None:
+        raster_cache = DiskRasterCache(args.raster_cache, int(args.raster_cache_mb * 1024 * 1024),
+                                       compress=args.raster_cache_compress)
+    on_stats = (lambda st: print(format_pipeline_stats(st), file=sys.stderr)) if args.stats else None
+
+    journal = None
+    if args.journal or args.resume:
+        journal = ResultJournal(args.journal or default_journal_path(args.output), resume=args.resume)
+
+    progress = nullcontext()
+    if args.progress:
+        # só páginas com regiões pendentes são renderizadas (importante com --resume)
+        total = count_pages(args.documents, WorkPlan(project, journal).wants_page)
+        progress = ProgressLine(total, PAGES_RENDERED.total, REGIONS_DONE.total)
+
+    perf = None
+    if args.perf_profile is not None:
+        docs = args.documents[0] + (f" +{len(args.documents) - 1}" if len(args.documents) > 1 else "")
+        perf = ProfileSession(docs, project.active_profile_name)
+
+    try:
+        with MetricsExporter(prom_path=args.metrics_file, json_path=args.metrics_json,
+                             interval=args.metrics_interval), progress, (perf or nullcontext()):
+            n = run_batch(project, args.documents, args.output,
+                          register=args.register, processes=args.processes,
+                          pipeline=args.pipeline, workers=args.workers,
+                          queue_bytes=int(args.queue_mb * 1024 * 1024), on_stats=on_stats,
+                          journal=journal, stats=stats, raster_cache=raster_cache)
+    finally:
+        if journal is not None:
+            journal.close()
+
+    print(f"{n} regiões processadas -> {args.output}")
+    if perf is not None:
+        paths = perf.write(args.perf_profile)
+        print(f"perfil de desempenho: {paths['.prof']} | {paths['.collapsed']}")
+    if journal is not None:
+        print(f"diário: {stats.get('journal_skipped', 0)} já concluídas, {stats.get('journal_new', 0)} novas")
+    if "shared_peak_bytes" in stats:
+        mb = 1024 * 1024
+        print(
+            f"memória: compartilhada pico {stats['shared_peak_bytes'] / mb:.1f} MB | "
+            f"principal pico {stats['main_peak_rss_bytes'] / mb:.1f} MB | "
+            f"worker pico {stats['worker_peak_rss_bytes'] / mb:.1f} MB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
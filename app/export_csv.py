@@ -2,13 +2,17 @@ from __future__ import annotations
 
 import csv
 import os
-from typing import Dict, List, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 
 import fitz  # PyMuPDF
 
 from .model import StoredRectNorm
 from .pdf_render import get_rendered_size
 
+if TYPE_CHECKING:
+    from .annotation_store import AnnotationStore
+    from .image_source import ImageDocument
+
 
 def export_csv_file(
     out_path: str,
@@ -22,11 +26,33 @@ def export_csv_file(
     image_w_px: int,
     image_h_px: int,
     profile_name: str = "",
+    image_doc: Optional[ImageDocument] = None,
 ) -> None:
-    rows: List[Dict[str, Union[str, int]]] = []
     base = os.path.basename(source_path)
+    fieldnames = [
+        "file", "page", "label", "ocr_profile",
+        "x0_norm", "y0_norm", "x1_norm", "y1_norm",
+        "x0_px", "y0_px", "w_px", "h_px",
+        "image_w_px", "image_h_px",
+    ]
 
-    if not is_pdf:
+    if hasattr(stored_norm, "page_array"):
+        # AnnotationStore: linhas calculadas por página, vetorizadas
+        _export_store(out_path, fieldnames, base, is_pdf, pdf_doc, pdf_page_count, pdf_render_zoom,
+                      stored_norm, image_w_px, image_h_px, profile_name, image_doc)
+        return
+
+    rows: List[Dict[str, Union[str, int]]] = []
+    if not is_pdf and image_doc is not None and image_doc.page_count > 1:
+        # TIFF multipágina: page 1-based como no PDF; tamanho lido do cabeçalho do quadro
+        for frame in range(image_doc.page_count):
+            rects = stored_norm.get(frame, [])
+            if not rects:
+                continue
+            img_w, img_h = image_doc.frame_size(frame)
+            for sr in rects:
+                rows.append(_row_for_rect(base, frame + 1, sr, img_w, img_h, profile_name))
+    elif not is_pdf:
         img_w, img_h = int(image_w_px), int(image_h_px)
         rects = stored_norm.get(0, [])
         for sr in rects:
@@ -35,24 +61,56 @@ def export_csv_file(
         if pdf_doc is None:
             raise RuntimeError("PDF doc não carregado.")
         for page_index in range(pdf_page_count):
-            img_w, img_h = get_rendered_size(pdf_doc, page_index, pdf_render_zoom)
             rects = stored_norm.get(page_index, [])
+            if not rects:
+                continue  # sem retângulos: não precisa medir (renderizar) a página
+            img_w, img_h = get_rendered_size(pdf_doc, page_index, pdf_render_zoom)
             for sr in rects:
                 # page no CSV: 1-based
                 rows.append(_row_for_rect(base, page_index + 1, sr, img_w, img_h, profile_name))
 
-    fieldnames = [
-        "file", "page", "label", "ocr_profile",
-        "x0_norm", "y0_norm", "x1_norm", "y1_norm",
-        "x0_px", "y0_px", "w_px", "h_px",
-        "image_w_px", "image_h_px",
-    ]
     with open(out_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(rows)
 
 
+def _export_store(
+    out_path: str,
+    fieldnames: List[str],
+    base: str,
+    is_pdf: bool,
+    pdf_doc: fitz.Document | None,
+    pdf_page_count: int,
+    pdf_render_zoom: float,
+    store: AnnotationStore,
+    image_w_px: int,
+    image_h_px: int,
+    profile_name: str,
+    image_doc: Optional[ImageDocument],
+) -> None:
+    from .annotation_store import rows_for_page
+
+    if is_pdf and pdf_doc is None:
+        raise RuntimeError("PDF doc não carregado.")
+
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        if not is_pdf and (image_doc is None or image_doc.page_count <= 1):
+            writer.writerows(rows_for_page(store, 0, 0, base, int(image_w_px), int(image_h_px), profile_name))
+            return
+        page_count = pdf_page_count if is_pdf else image_doc.page_count
+        for page_index in range(page_count):
+            if not store.count(page_index):
+                continue
+            if is_pdf:
+                img_w, img_h = get_rendered_size(pdf_doc, page_index, pdf_render_zoom)
+            else:
+                img_w, img_h = image_doc.frame_size(page_index)
+            writer.writerows(rows_for_page(store, page_index, page_index + 1, base, img_w, img_h, profile_name))
+
+
 def _row_for_rect(
         base_file: str,
         page_value: int,
@@ -73,7 +131,7 @@ def _row_for_rect(
         "file": base_file,
         "page": page_value,
         "label": sr.label,
-        "ocr_profile": profile_name or "",
+        "ocr_profile": sr.profile or profile_name or "",
         "x0_norm": f"{sr.x0n:.6f}",
         "y0_norm": f"{sr.y0n:.6f}",
         "x1_norm": f"{sr.x1n:.6f}",
@@ -0,0 +1,87 @@
+"""
+Imagens raster como documento paginado (TIFF multipágina dos scanners).
+
+Cada quadro é uma página: a contagem vem do cabeçalho e um quadro só é
+decodificado quando pedido, então abrir um TIFF de 200 páginas não lê
+nenhum pixel e a memória fica proporcional a uma página. Quando o codec
+permite (JPEG, TIFF via plugin Qt), read_frame decodifica já reduzido.
+"""
+from __future__ import annotations
+
+import os
+from typing import Dict, Tuple
+
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QImage, QImageIOHandler, QImageReader
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def wants_pyramid(width: int, height: int) -> bool:
+    """Imagem grande o bastante para ser exibida via pirâmide (app/pyramid.py); OCR_PYRAMID_MIN_MP=0 desativa."""
+    try:
+        min_mp = float(os.environ.get("OCR_PYRAMID_MIN_MP", "36"))
+    except ValueError:
+        min_mp = 36.0
+    return min_mp > 0 and width * height >= min_mp * 1_000_000
+
+
+def is_image_path(path: str) -> bool:
+    return str(path).lower().endswith(IMAGE_EXTENSIONS)
+
+
+class ImageDocument:
+    def __init__(self, path: str):
+        self.path = path
+        reader = self._reader()
+        if not reader.canRead():
+            raise OSError(reader.errorString() or f"Formato não suportado: {path}")
+        # imageCount() = 0 para formatos sem quadros (PNG/JPEG): uma página
+        self.page_count = max(1, reader.imageCount())
+        self._sizes: Dict[int, Tuple[int, int]] = {}
+        size = reader.size()
+        if size.isValid():
+            self._sizes[0] = (size.width(), size.height())
+
+    def _reader(self, frame: int = 0) -> QImageReader:
+        # leitor novo a cada quadro: alguns codecs só avançam, nunca voltam
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        if frame and not reader.jumpToImage(frame):
+            raise OSError(f"Quadro {frame + 1} indisponível em {self.path}")
+        return reader
+
+    def frame_size(self, frame: int) -> Tuple[int, int]:
+        """(largura, altura) do quadro lendo só o cabeçalho."""
+        size = self._sizes.get(frame)
+        if size is None:
+            s = self._reader(frame).size()
+            if not s.isValid():
+                img = self.read_frame(frame)
+                s = img.size()
+            size = self._sizes[frame] = (s.width(), s.height())
+        return size
+
+    def read_frame(self, frame: int, max_side: int = 0) -> QImage:
+        """Decodifica um quadro; max_side > 0 pede decodificação reduzida ao codec."""
+        if not 0 <= frame < self.page_count:
+            raise IndexError(frame)
+        reader = self._reader(frame)
+        if max_side > 0:
+            size = reader.size()
+            if size.isValid() and max(size.width(), size.height()) > max_side:
+                scaled = size.scaled(QSize(max_side, max_side), Qt.KeepAspectRatio)
+                if reader.supportsOption(QImageIOHandler.ScaledSize):
+                    reader.setScaledSize(scaled)
+        img = reader.read()
+        if img.isNull():
+            raise OSError(reader.errorString() or f"Falha ao decodificar {self.path}")
+        if max_side > 0 and max(img.width(), img.height()) > max_side:
+            # codec sem decodificação reduzida: reduz depois (só o quadro pedido)
+            img = img.scaled(max_side, max_side, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if frame not in self._sizes and max_side <= 0:
+            self._sizes[frame] = (img.width(), img.height())
+        return img
+
+    def close(self) -> None:
+        self._sizes.clear()
@@ -14,11 +14,12 @@ class AnnotRectItem(QGraphicsRectItem):
     Retângulo anotável: selecionável, movível e com clamp nos limites da imagem.
     Desenha label no canto superior esquerdo.
     """
-    def __init__(self, rect: QRectF, label: str, image_bounds: QRectF):
+    def __init__(self, rect: QRectF, label: str, image_bounds: QRectF, profile: str = ""):
         super().__init__(rect)
         self.signals = RectSignals()
 
         self._label = label
+        self._profile = profile
         self._image_bounds = image_bounds
 
         self.setFlags(
@@ -42,9 +43,31 @@ class AnnotRectItem(QGraphicsRectItem):
     def label(self) -> str:
         return self._label
 
+    def set_profile(self, profile: str):
+        self._profile = profile
+        self.signals.changed.emit(self)
+
+    def profile(self) -> str:
+        return self._profile
+
     def set_image_bounds(self, bounds: QRectF):
         self._image_bounds = bounds
 
+    def retarget(self, rect: QRectF, label: str, profile: str, image_bounds: QRectF):
+        """Reaproveita o item para outro retângulo (troca de página) sem emitir changed."""
+        blocked = self.signals.blockSignals(True)
+        try:
+            self._image_bounds = image_bounds
+            self.setSelected(False)
+            self.setRect(rect)
+            self.setPos(0, 0)  # depois do setRect: o clamp da posição já vê o retângulo novo
+            if label != self._label:
+                self._label = label
+                self._text.setText(label)
+            self._profile = profile
+        finally:
+            self.signals.blockSignals(blocked)
+
     def _clamp_rect_to_bounds(self, rect: QRectF) -> QRectF:
         r = QRectF(rect).normalized()
 
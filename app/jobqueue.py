@@ -0,0 +1,359 @@
+"""
+Fila de trabalho em arquivo SQLite para dividir o lote entre vários
+processos e máquinas que montam o mesmo armazenamento, sem broker externo.
+
+Cada job é um (documento, faixa de páginas). Workers alugam jobs com
+prazo (lease), renovam o prazo por heartbeat e gravam um CSV por job;
+leases vencidos voltam para a fila até o limite de tentativas.
+
+Uso:
+    python -m app.jobqueue enqueue fila.db doc1.pdf doc2.pdf [--pages-per-job 20]
+    python -m app.jobqueue work fila.db projeto.json saida/ [--processes 4]
+    python -m app.jobqueue status fila.db
+    python -m app.jobqueue collect fila.db resultado.csv
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import fitz  # PyMuPDF
+
+from .batch import (
+    RESULT_FIELDS, PageRef, is_pdf_path, iter_document_pages,
+    load_batch_project, ocr_page, template_page_loader,
+)
+from .registration import PageRegistrar
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    document      TEXT    NOT NULL,
+    page_start    INTEGER NOT NULL,
+    page_end      INTEGER NOT NULL,
+    status        TEXT    NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    result_path   TEXT,
+    error         TEXT,
+    updated       REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, lease_expires);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    document: str
+    page_start: int  # inclusive, 0-based
+    page_end: int    # exclusivo
+    attempts: int
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobQueue:
+    def __init__(self, path: str, *, lease_seconds: float = 120.0, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = int(max_attempts)
+        with self._session() as con:
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _session(self) -> Iterator[sqlite3.Connection]:
+        # autocommit; transações explícitas só no lease
+        con = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+        try:
+            # WAL exige memória compartilhada no mesmo host; em storage de rede usa o journal clássico
+            con.execute("PRAGMA journal_mode=DELETE")
+            con.execute("PRAGMA busy_timeout=60000")
+            yield con
+        finally:
+            con.close()
+
+    def enqueue(self, document: str, page_start: int, page_end: int) -> None:
+        with self._session() as con:
+            con.execute(
+                "INSERT INTO jobs(document, page_start, page_end, updated) VALUES (?, ?, ?, ?)",
+                (document, int(page_start), int(page_end), time.time()),
+            )
+
+    def enqueue_document(self, document: str, pages_per_job: int = 20) -> int:
+        document = os.path.abspath(document)
+        if is_pdf_path(document):
+            with fitz.open(document) as doc:
+                n_pages = doc.page_count
+        else:
+            n_pages = 1
+        step = max(1, int(pages_per_job))
+        n_jobs = 0
+        for start in range(0, n_pages, step):
+            self.enqueue(document, start, min(n_pages, start + step))
+            n_jobs += 1
+        return n_jobs
+
+    def lease(self, owner: str) -> Optional[Job]:
+        now = time.time()
+        with self._session() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._lease_locked(con, owner, now)
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
+            return job
+
+    def _lease_locked(self, con: sqlite3.Connection, owner: str, now: float) -> Optional[Job]:
+        # leases vencidos sem tentativas restantes viram falha
+        con.execute(
+            "UPDATE jobs SET status='failed', error=COALESCE(error, 'lease expirado'), updated=? "
+            "WHERE status='leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        row = con.execute(
+            "SELECT id, document, page_start, page_end, attempts FROM jobs "
+            "WHERE (status='pending' OR (status='leased' AND lease_expires < ?)) AND attempts < ? "
+            "ORDER BY id LIMIT 1",
+            (now, self.max_attempts),
+        ).fetchone()
+        if row is None:
+            return None
+        con.execute(
+            "UPDATE jobs SET status='leased', lease_owner=?, lease_expires=?, attempts=attempts+1, updated=? "
+            "WHERE id=?",
+            (owner, now + self.lease_seconds, now, row[0]),
+        )
+        return Job(row[0], row[1], row[2], row[3], row[4] + 1)
+
+    def heartbeat(self, job_id: int, owner: str) -> bool:
+        """Renova o lease; False se o job não pertence mais a este worker."""
+        with self._session() as con:
+            cur = con.execute(
+                "UPDATE jobs SET lease_expires=?, updated=? WHERE id=? AND lease_owner=? AND status='leased'",
+                (time.time() + self.lease_seconds, time.time(), job_id, owner),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result_path: str) -> bool:
+        with self._session() as con:
+            cur = con.execute(
+                "UPDATE jobs SET status='done', result_path=?, error=NULL, updated=? "
+                "WHERE id=? AND lease_owner=? AND status='leased'",
+                (result_path, time.time(), job_id, owner),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str) -> None:
+        with self._session() as con:
+            con.execute(
+                "UPDATE jobs SET status=CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner=NULL, lease_expires=NULL, error=?, updated=? "
+                "WHERE id=? AND lease_owner=? AND status='leased'",
+                (self.max_attempts, error[:2000], time.time(), job_id, owner),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._session() as con:
+            rows = con.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def has_open_jobs(self) -> bool:
+        c = self.counts()
+        return bool(c.get("pending", 0) or c.get("leased", 0))
+
+    def done_results(self) -> List[str]:
+        with self._session() as con:
+            rows = con.execute(
+                "SELECT result_path FROM jobs WHERE status='done' ORDER BY id"
+            ).fetchall()
+        return [r[0] for r in rows if r[0]]
+
+
+class _Heartbeat:
+    """Renova o lease em segundo plano enquanto o job roda."""
+    def __init__(self, queue: JobQueue, job: Job, owner: str):
+        self._queue = queue
+        self._job = job
+        self._owner = owner
+        self._stop = threading.Event()
+        self.lost = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        interval = max(1.0, self._queue.lease_seconds / 3.0)
+        while not self._stop.wait(interval):
+            if not self._queue.heartbeat(self._job.id, self._owner):
+                self.lost = True
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def process_job(job: Job, project_path: str, out_dir: str, *, register: bool = False) -> str:
+    """Roda as regiões do projeto nas páginas do job e grava <out_dir>/job_<id>.csv."""
+    project = load_batch_project(project_path)
+    registrar = PageRegistrar(template_page_loader(project)) if register else None
+
+    in_range = lambda i: job.page_start <= i < job.page_end and bool(project.rects_for_page(i))
+    out_path = os.path.join(out_dir, f"job_{job.id:06d}.csv")
+    tmp = f"{out_path}.{uuid.uuid4().hex[:6]}.tmp"
+
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for page_index, page_bgr in iter_document_pages(job.document, project.render_zoom, in_range):
+                rects = project.rects_for_page(page_index)
+                if registrar is not None:
+                    rects, _ = registrar.register_rects(page_index, page_bgr, rects)
+                writer.writerows(ocr_page(page_bgr, rects, project, page=PageRef(job.document, page_index)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, out_path)
+    except BaseException:
+        # falha no meio do job: o .tmp não fica para trás na pasta compartilhada a cada nova tentativa
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return out_path
+
+
+def run_worker(
+    queue_path: str,
+    project_path: str,
+    out_dir: str,
+    *,
+    register: bool = False,
+    wait: bool = False,
+    poll_interval: float = 2.0,
+    lease_seconds: float = 120.0,
+    max_attempts: int = 3,
+) -> int:
+    """Aluga e processa jobs até a fila esvaziar (ou para sempre com wait=True)."""
+    os.makedirs(out_dir, exist_ok=True)
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    owner = worker_id()
+    n_done = 0
+
+    while True:
+        job = queue.lease(owner)
+        if job is None:
+            if not wait and not queue.has_open_jobs():
+                return n_done
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            with _Heartbeat(queue, job, owner) as hb:
+                result = process_job(job, project_path, out_dir, register=register)
+            if not hb.lost and queue.complete(job.id, owner, result):
+                n_done += 1
+        except Exception as e:
+            queue.fail(job.id, owner, f"{type(e).__name__}: {e}")
+
+
+def collect(queue_path: str, out_path: str) -> int:
+    """Junta os CSVs dos jobs concluídos (ordem dos jobs) num único CSV."""
+    queue = JobQueue(queue_path)
+    n_rows = 0
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for path in queue.done_results():
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    writer.writerow(row)
+                    n_rows += 1
+    os.replace(tmp, out_path)
+    return n_rows
+
+
+def _worker_entry(args: tuple) -> int:
+    queue_path, project_path, out_dir, kwargs = args
+    return run_worker(queue_path, project_path, out_dir, **kwargs)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.jobqueue", description="Fila de jobs OCR em SQLite.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    sp = sub.add_parser("enqueue", help="Cria jobs (documento, faixa de páginas)")
+    sp.add_argument("queue")
+    sp.add_argument("documents", nargs="+")
+    sp.add_argument("--pages-per-job", type=int, default=20)
+
+    sp = sub.add_parser("work", help="Processa jobs da fila")
+    sp.add_argument("queue")
+    sp.add_argument("project", help="Projeto JSON (retângulos + perfis OCR)")
+    sp.add_argument("out_dir", help="Pasta (compartilhada) para os CSVs por job")
+    sp.add_argument("--processes", type=int, default=1, help="Workers locais")
+    sp.add_argument("--register", action="store_true")
+    sp.add_argument("--wait", action="store_true", help="Continua esperando novos jobs")
+    sp.add_argument("--lease-seconds", type=float, default=120.0)
+    sp.add_argument("--max-attempts", type=int, default=3)
+
+    sp = sub.add_parser("status", help="Contagem de jobs por status")
+    sp.add_argument("queue")
+
+    sp = sub.add_parser("collect", help="Junta os CSVs dos jobs concluídos")
+    sp.add_argument("queue")
+    sp.add_argument("output")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "enqueue":
+        q = JobQueue(args.queue)
+        n = sum(q.enqueue_document(d, args.pages_per_job) for d in args.documents)
+        print(f"{n} jobs criados em {args.queue}")
+        return 0
+
+    if args.cmd == "work":
+        kwargs = dict(
+            register=args.register, wait=args.wait,
+            lease_seconds=args.lease_seconds, max_attempts=args.max_attempts,
+        )
+        t0 = time.perf_counter()
+        if args.processes <= 1:
+            n = run_worker(args.queue, args.project, args.out_dir, **kwargs)
+        else:
+            with multiprocessing.Pool(args.processes) as pool:
+                n = sum(pool.map(_worker_entry, [(args.queue, args.project, args.out_dir, kwargs)] * args.processes))
+        print(f"{n} jobs concluídos em {time.perf_counter() - t0:.1f}s")
+        return 0
+
+    if args.cmd == "status":
+        for status, n in sorted(JobQueue(args.queue).counts().items()):
+            print(f"{status}: {n}")
+        return 0
+
+    n = collect(args.queue, args.output)
+    print(f"{n} linhas -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""
+Diário append-only de resultados do lote (JSONL), para retomar execuções
+interrompidas (crash, OOM, deploy) sem refazer o que já terminou.
+
+Cada linha registra uma região concluída, com a chave
+(sha256 do arquivo, página, região, label, perfil); como a chave é o
+conteúdo, arquivos idênticos em caminhos diferentes compartilham os
+resultados (o CSV repete as linhas para cada caminho). Gravações são
+agrupadas e sincronizadas com fsync a cada N registros ou T segundos; uma
+linha final incompleta (queda no meio da escrita) é descartada ao reabrir.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+JournalKey = Tuple[str, int, int, str, str]
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultJournal:
+    def __init__(
+        self,
+        path: str,
+        *,
+        resume: bool = True,
+        fsync_every: int = 64,
+        fsync_interval: float = 2.0,
+    ):
+        self.path = path
+        self._fsync_every = max(1, int(fsync_every))
+        self._fsync_interval = float(fsync_interval)
+        self._lock = threading.Lock()
+        self._done: Dict[JournalKey, Dict[str, Any]] = {}
+        self._digests: Dict[str, str] = {}
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        if resume and os.path.exists(path):
+            self._load()
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        # descarta a linha final incompleta para que novos registros comecem limpos
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+            data = data[:end]
+
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+                key = tuple(rec["k"])
+            except Exception:
+                continue
+            self._done[(str(key[0]), int(key[1]), int(key[2]), str(key[3]), str(key[4]))] = rec.get("row", {})
+
+    def digest(self, path: str) -> str:
+        path = os.path.abspath(path)
+        if path not in self._digests:
+            self._digests[path] = file_sha256(path)
+        return self._digests[path]
+
+    def __contains__(self, key: JournalKey) -> bool:
+        return key in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def append(self, key: JournalKey, row: Dict[str, Any]) -> None:
+        public = {k: v for k, v in row.items() if not k.startswith("_")}
+        line = json.dumps({"k": list(key), "row": public}, ensure_ascii=False)
+        with self._lock:
+            if key in self._done:
+                return
+            self._f.write(line + "\n")
+            self._done[key] = public
+            self._unsynced += 1
+            if (
+                self._unsynced >= self._fsync_every
+                or time.monotonic() - self._last_sync >= self._fsync_interval
+            ):
+                self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_locked()
+
+    def items(self) -> Iterator[Tuple[JournalKey, Dict[str, Any]]]:
+        with self._lock:
+            entries: List[Tuple[JournalKey, Dict[str, Any]]] = list(self._done.items())
+        return iter(entries)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f.closed:
+                return
+            self._sync_locked()
+            self._f.close()
+
+    def __enter__(self) -> "ResultJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def default_journal_path(out_path: str) -> str:
+    return out_path + ".journal.jsonl"
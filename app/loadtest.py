@@ -0,0 +1,121 @@
+"""
+Teste de carga do serviço OCR (app.service): mede vazão e latência
+(p50/p95/p99) em diferentes níveis de concorrência, com conexões keep-alive.
+
+Uso:
+    python -m app.loadtest amostra.png --profile padrao [--url http://127.0.0.1:8765 | --unix /tmp/ocr.sock]
+        [--requests 200] [--concurrency 1,4,16,64]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+
+async def _open(url: str, unix_path: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    u = urlsplit(url)
+    return await asyncio.open_connection(u.hostname or "127.0.0.1", u.port or 80)
+
+
+async def _request(reader, writer, host: str, path: str, body: bytes) -> int:
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Type: application/octet-stream\r\nContent-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = h.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, math.ceil(p / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+async def run_level(
+    url: str, unix_path: str, profile: str, body: bytes, n_requests: int, concurrency: int
+) -> Tuple[float, List[float], int]:
+    host = urlsplit(url).netloc or "localhost"
+    path = f"/ocr?profile={quote(profile)}" if profile else "/ocr"
+    latencies: List[float] = []
+    errors = 0
+    remaining = [n_requests]
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await _open(url, unix_path)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                t0 = time.perf_counter()
+                try:
+                    status = await _request(reader, writer, host, path, body)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    errors += 1
+                    writer.close()
+                    reader, writer = await _open(url, unix_path)
+                    continue
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - t0, sorted(latencies), errors
+
+
+async def _main_async(args) -> None:
+    with open(args.image, "rb") as f:
+        body = f.read()
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    # aquece os workers antes de medir
+    await run_level(args.url, args.unix, args.profile, body, max(levels), max(levels))
+
+    print(f"{'conc':>5} {'req':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6}")
+    for c in levels:
+        wall, lat, errors = await run_level(args.url, args.unix, args.profile, body, args.requests, c)
+        print(
+            f"{c:>5} {len(lat):>6} {len(lat) / wall:>8.1f} {percentile(lat, 50):>8.1f} "
+            f"{percentile(lat, 95):>8.1f} {percentile(lat, 99):>8.1f} {errors:>6}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.loadtest", description="Teste de carga do serviço OCR.")
+    ap.add_argument("image", help="Imagem enviada em cada requisição")
+    ap.add_argument("--profile", default="", help="Perfil OCR (padrão: perfil ativo do projeto)")
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--unix", default="", help="Socket Unix do serviço (ignora --url)")
+    ap.add_argument("--requests", type=int, default=200, help="Requisições por nível")
+    ap.add_argument("--concurrency", default="1,4,16,64", help="Níveis de concorrência, separados por vírgula")
+    args = ap.parse_args(argv)
+    asyncio.run(_main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
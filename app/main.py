@@ -1,12 +1,35 @@
+import argparse
+import os
+import sys
+
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
+from .startup import PROBE_ENV, PROBE_LINE, preload_heavy_modules
 from .window import MainWindow
 
 
 def main():
-    app = QApplication([])
+    ap = argparse.ArgumentParser(prog="python -m app.main")
+    ap.add_argument("--perf-profile", metavar="PASTA", nargs="?", const="", default=None,
+                    help="Perfila a sessão inteira (pstats + pilhas) e grava na pasta ao fechar")
+    args, qt_args = ap.parse_known_args()
+
+    app = QApplication([sys.argv[0]] + qt_args)
     w = MainWindow()
+    if args.perf_profile is not None:
+        w.start_profiling(args.perf_profile)
     w.resize(1200, 800)
     w.show()
+
+    if os.environ.get(PROBE_ENV):
+        # python -m app.startup check: avisa que a janela apareceu e sai
+        def probe():
+            print(PROBE_LINE, flush=True)
+            app.quit()
+        QTimer.singleShot(0, probe)
+    else:
+        # numpy/OpenCV/PyMuPDF carregam em segundo plano, com a janela já visível
+        QTimer.singleShot(0, preload_heavy_modules)
     app.exec()
 
 
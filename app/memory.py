@@ -0,0 +1,217 @@
+"""
+Orçamento global de memória para rasters (páginas, recortes, previews, caches).
+
+Cada componente registra um MemoryPool no MemoryAccountant com uma
+prioridade. O pool guarda entradas descartáveis (cache) e/ou uso fixo
+("pinned": pixmap da página atual, segmentos em uso). Quando o total passa
+do orçamento, o contador remove entradas de cache de qualquer pool — menor
+prioridade primeiro e, dentro dela, a menos usada recentemente.
+
+Orçamento padrão: variável OCR_MEMORY_BUDGET_MB (ou 1024 MB).
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .metrics import REGISTRY
+
+MB = 1024 * 1024
+
+MEMORY_BYTES = REGISTRY.gauge("ocr_memory_bytes", "Memória contabilizada por componente", ("component",))
+EVICTIONS = REGISTRY.counter("ocr_memory_evictions_total", "Entradas removidas pelo orçamento", ("component",))
+
+
+def nbytes_of(value: Any) -> int:
+    """Bytes de um ndarray (nbytes) ou QPixmap/QImage (largura x altura x profundidade)."""
+    n = getattr(value, "nbytes", None)
+    if isinstance(n, int):
+        return n
+    if all(hasattr(value, a) for a in ("width", "height", "depth")):
+        return int(value.width()) * int(value.height()) * max(1, int(value.depth())) // 8
+    return 0
+
+
+def default_budget_bytes() -> int:
+    try:
+        return int(float(os.environ.get("OCR_MEMORY_BUDGET_MB", "1024")) * MB)
+    except ValueError:
+        return 1024 * MB
+
+
+@dataclass
+class _Entry:
+    value: Any
+    nbytes: int
+    tick: int
+    on_evict: Optional[Callable[[Hashable, Any], None]]
+
+
+class MemoryPool:
+    """Visão de um componente: entradas de cache (LRU) + uso fixo."""
+    def __init__(self, accountant: "MemoryAccountant", name: str, priority: int):
+        self.accountant = accountant
+        self.name = name
+        self.priority = priority
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._pinned: Dict[Hashable, int] = {}
+        self.cache_bytes = 0
+        self.pinned_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.cache_bytes + self.pinned_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.accountant._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        acc = self.accountant
+        with acc._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            entry.tick = acc._next_tick()
+            self.hits += 1
+            return entry.value
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        nbytes: Optional[int] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ) -> bool:
+        """Guarda no cache. Retorna False se a entrada não coube no orçamento."""
+        n = nbytes_of(value) if nbytes is None else int(nbytes)
+        acc = self.accountant
+        with acc._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.cache_bytes -= old.nbytes
+            self._entries[key] = _Entry(value, n, acc._next_tick(), on_evict)
+            self.cache_bytes += n
+            evicted = acc._enforce_locked()
+        acc._after_change(evicted)
+        return not any(p is self and k == key for p, k, _ in evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.accountant._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.cache_bytes -= entry.nbytes
+        self.accountant._after_change([])
+        return entry.value
+
+    def set_pinned(self, tag: Hashable, nbytes: int) -> None:
+        """Uso fixo (não descartável) do componente; 0 remove."""
+        acc = self.accountant
+        with acc._lock:
+            self.pinned_bytes -= self._pinned.pop(tag, 0)
+            if nbytes > 0:
+                self._pinned[tag] = int(nbytes)
+                self.pinned_bytes += int(nbytes)
+            evicted = acc._enforce_locked()
+        acc._after_change(evicted)
+
+    def clear(self) -> None:
+        with self.accountant._lock:
+            self._entries.clear()
+            self.cache_bytes = 0
+        self.accountant._after_change([])
+
+
+class MemoryAccountant:
+    def __init__(self, budget_bytes: Optional[int] = None):
+        self.budget_bytes = default_budget_bytes() if budget_bytes is None else int(budget_bytes)
+        self._pools: Dict[str, MemoryPool] = {}
+        self._lock = threading.RLock()
+        self._tick = 0
+
+    def _next_tick(self) -> int:
+        self._tick += 1
+        return self._tick
+
+    def pool(self, name: str, priority: int = 50) -> MemoryPool:
+        """Registra (ou devolve) o pool do componente. Maior prioridade = descartado por último."""
+        with self._lock:
+            p = self._pools.get(name)
+            if p is None:
+                p = self._pools[name] = MemoryPool(self, name, priority)
+            return p
+
+    def set_budget(self, budget_bytes: int) -> None:
+        with self._lock:
+            self.budget_bytes = int(budget_bytes)
+            evicted = self._enforce_locked()
+        self._after_change(evicted)
+
+    @property
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(p.nbytes for p in self._pools.values())
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                name: {"cache": p.cache_bytes, "pinned": p.pinned_bytes, "entries": len(p._entries),
+                       "priority": p.priority, "hits": p.hits, "misses": p.misses}
+                for name, p in self._pools.items()
+            }
+
+    def format_usage(self) -> str:
+        parts = [
+            f"{name} {(u['cache'] + u['pinned']) / MB:.1f} MB"
+            for name, u in sorted(self.usage().items(), key=lambda kv: -(kv[1]["cache"] + kv[1]["pinned"]))
+        ]
+        return f"memória {self.used_bytes / MB:.1f}/{self.budget_bytes / MB:.0f} MB: " + ", ".join(parts)
+
+    def _enforce_locked(self) -> List[Tuple[MemoryPool, Hashable, _Entry]]:
+        evicted: List[Tuple[MemoryPool, Hashable, _Entry]] = []
+        total = sum(p.nbytes for p in self._pools.values())
+        while total > self.budget_bytes:
+            # candidato de cada pool = sua entrada LRU; vítima = (menor prioridade, mais antiga)
+            victim: Optional[MemoryPool] = None
+            for p in self._pools.values():
+                if not p._entries:
+                    continue
+                if victim is None:
+                    victim = p
+                    continue
+                head = next(iter(p._entries.values()))
+                vhead = next(iter(victim._entries.values()))
+                if (p.priority, head.tick) < (victim.priority, vhead.tick):
+                    victim = p
+            if victim is None:
+                break  # só uso fixo: nada a descartar
+            key, entry = victim._entries.popitem(last=False)
+            victim.cache_bytes -= entry.nbytes
+            total -= entry.nbytes
+            evicted.append((victim, key, entry))
+        return evicted
+
+    def _after_change(self, evicted: List[Tuple[MemoryPool, Hashable, _Entry]]) -> None:
+        # callbacks e métricas fora do lock
+        for pool, key, entry in evicted:
+            EVICTIONS.inc(component=pool.name)
+            if entry.on_evict is not None:
+                entry.on_evict(key, entry.value)
+        with self._lock:
+            sizes = [(p.name, p.nbytes) for p in self._pools.values()]
+        for name, n in sizes:
+            MEMORY_BYTES.set(n, component=name)
+
+
+ACCOUNTANT = MemoryAccountant()
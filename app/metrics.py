@@ -0,0 +1,410 @@
+"""
+Registro de métricas do processamento (contadores, gauges e histogramas de
+latência), exportável no formato texto do Prometheus e como snapshots JSON.
+
+As métricas são globais ao processo (REGISTRY). Com REGISTRY.enabled = False
+toda instrumentação vira no-op, o que permite medir o custo dela:
+
+    python -m app.metrics bench [projeto.json doc.pdf ...]
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# segundos; cobre de recorte/pré-processamento (ms) a render de página grande (s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _label_str(self, key: LabelValues, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, n: float = 1.0, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + n
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + self._label_str(k), v) for k, v in sorted(items)]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(k): v for k, v in self._values.items()}
+
+    def take(self) -> Dict[LabelValues, float]:
+        """Devolve e zera os valores (ex.: worker em outro processo enviando o acumulado)."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, float]) -> None:
+        """Soma valores vindos de take() em outro processo."""
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            for key, v in values.items():
+                self._values[key] = self._values.get(key, 0.0) + v
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, v: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(v)
+
+    def dec(self, n: float = 1.0, **labels: str) -> None:
+        self.inc(-n, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # por label: (contagens por bucket + overflow, soma, total)
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, v: float, **labels: str) -> None:
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += v
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        if not self._registry.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            items = [(k, (list(e[0]), e[1], e[2])) for k, e in self._values.items()]
+        out = []
+        for key, (counts, total_sum, count) in sorted(items):
+            acc = 0
+            for le, c in zip(self.buckets + (math.inf,), counts):
+                acc += c
+                out.append((self.name + "_bucket" + self._label_str(key, f'le="{_fmt(le)}"'), acc))
+            out.append((self.name + "_sum" + self._label_str(key), total_sum))
+            out.append((self.name + "_count" + self._label_str(key), count))
+        return out
+
+    def take(self) -> Dict[LabelValues, List]:
+        """Devolve e zera as observações (ex.: worker em outro processo enviando o acumulado)."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelValues, List]) -> None:
+        """Soma observações vindas de take() em outro processo (mesmos buckets)."""
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            for key, (counts, total_sum, count) in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total_sum
+                entry[2] += count
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return {
+            ",".join(k): {"count": e[2], "sum": e[1], "mean": e[1] / e[2] if e[2] else 0.0}
+            for k, e in items
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kw) -> _Metric:
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(self, name, help_text, labelnames, **kw)
+            elif not isinstance(m, cls):
+                raise ValueError(f"Métrica {name} já registrada como {m.kind}.")
+            return m
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines += [f"{name} {_fmt(v)}" for name, v in m.samples()]
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {"ts": time.time(), "metrics": {m.name: m.snapshot() for m in metrics}}
+
+    def write_prometheus(self, path: str) -> None:
+        # escrita atômica: o coletor (node_exporter textfile) nunca lê arquivo pela metade
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Thread que grava periodicamente o .prom e/ou anexa snapshots JSON (JSONL)."""
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        *,
+        prom_path: str = "",
+        json_path: str = "",
+        interval: float = 10.0,
+    ):
+        self.registry = registry
+        self.prom_path = prom_path
+        self.json_path = json_path
+        self.interval = max(0.1, float(interval))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-export", daemon=True)
+
+    def export(self) -> None:
+        if self.prom_path:
+            self.registry.write_prometheus(self.prom_path)
+        if self.json_path:
+            with open(self.json_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.registry.snapshot(), ensure_ascii=False) + "\n")
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def __enter__(self) -> "MetricsExporter":
+        if self.prom_path or self.json_path:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if self.prom_path or self.json_path:
+            self.export()
+
+
+def _fmt_eta(seconds: float) -> str:
+    if not math.isfinite(seconds):
+        return "--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m{s:02d}s"
+
+
+class ProgressLine:
+    """Linha de progresso ao vivo (pág/s e ETA), redesenhada no lugar com \\r."""
+    def __init__(
+        self,
+        total_pages: int,
+        pages_done: Callable[[], float],
+        regions_done: Optional[Callable[[], float]] = None,
+        *,
+        stream: TextIO = sys.stderr,
+        interval: float = 0.5,
+    ):
+        self.total = max(0, int(total_pages))
+        self._pages = pages_done
+        self._regions = regions_done
+        self._stream = stream
+        self._interval = interval
+        self._t0 = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="progress", daemon=True)
+
+    def line(self) -> str:
+        done = self._pages()
+        elapsed = max(1e-9, time.perf_counter() - self._t0)
+        rate = done / elapsed
+        eta = (self.total - done) / rate if rate > 0 else math.inf
+        pct = 100.0 * done / self.total if self.total else 0.0
+        text = f"páginas {int(done)}/{self.total} ({pct:.0f}%) | {rate:.2f} pág/s | ETA {_fmt_eta(eta)}"
+        if self._regions is not None:
+            text += f" | regiões {int(self._regions())}"
+        return text
+
+    def _draw(self) -> None:
+        self._stream.write("\r\x1b[K" + self.line())
+        self._stream.flush()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._draw()
+
+    def __enter__(self) -> "ProgressLine":
+        self._t0 = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._draw()
+        self._stream.write("\n")
+
+
+# ---------------- benchmark: custo da instrumentação ----------------
+
+def _micro_bench(n: int = 200_000) -> Dict[str, float]:
+    reg = MetricsRegistry()
+    c = reg.counter("bench_total", "", ("stage",))
+    h = reg.histogram("bench_seconds", "", ("stage",))
+    out = {}
+    for enabled in (True, False):
+        reg.enabled = enabled
+        t0 = time.perf_counter()
+        for _ in range(n):
+            c.inc(stage="ocr")
+            h.observe(0.01, stage="ocr")
+        out["on" if enabled else "off"] = (time.perf_counter() - t0) / n * 1e9
+    return out
+
+
+def _batch_bench(project_path: str, docs: List[str], repeat: int) -> Dict[str, float]:
+    import tempfile
+    from .batch import load_batch_project, run_batch
+
+    project = load_batch_project(project_path)
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "bench.csv")
+        run_batch(project, docs, out)  # aquecimento (cache de disco, modelos)
+        for _ in range(repeat):
+            # alterna on/off para não favorecer um lado por aquecimento ou ruído
+            for enabled in (True, False):
+                REGISTRY.enabled = enabled
+                t0 = time.perf_counter()
+                run_batch(project, docs, out)
+                wall = time.perf_counter() - t0
+                key = "on" if enabled else "off"
+                best[key] = min(best.get(key, math.inf), wall)
+    REGISTRY.enabled = True
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.metrics", description="Ferramentas de métricas.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench", help="Mede o custo da instrumentação (métricas ligadas x desligadas)")
+    b.add_argument("project", nargs="?", default="", help="Projeto JSON (opcional: roda o lote real)")
+    b.add_argument("documents", nargs="*", help="PDFs/imagens para o lote")
+    b.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    micro = _micro_bench()
+    print(f"por operação (inc + observe): ligado {micro['on']:.0f} ns | desligado {micro['off']:.0f} ns")
+
+    if args.project and args.documents:
+        best = _batch_bench(args.project, args.documents, max(1, args.repeat))
+        overhead = 100.0 * (best["on"] - best["off"]) / best["off"] if best["off"] > 0 else 0.0
+        print(f"lote (melhor de {args.repeat}): ligado {best['on']:.2f}s | desligado {best['off']:.2f}s | "
+              f"custo {overhead:+.2f}% (meta < 1%)")
+        return 0 if overhead < 1.0 else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
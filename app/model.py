@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Any
+from typing import Any, Dict, List
 
 
 @dataclass
@@ -11,36 +11,49 @@ class StoredRectNorm:
     y0n: float
     x1n: float
     y1n: float
+    profile: str = ""  # perfil OCR vinculado à região ("" = perfil ativo)
+
+
+def _rects_from_json(items: Any) -> List[StoredRectNorm]:
+    rects: List[StoredRectNorm] = []
+    for it in items or []:
+        rects.append(
+            StoredRectNorm(
+                label=str(it.get("label", "Campo")),
+                x0n=float(it.get("x0_norm", 0.0)),
+                y0n=float(it.get("y0_norm", 0.0)),
+                x1n=float(it.get("x1_norm", 0.0)),
+                y1n=float(it.get("y1_norm", 0.0)),
+                profile=str(it.get("profile", "") or ""),
+            )
+        )
+    return rects
 
 
-def annotations_to_json(stored: Dict[int, List[StoredRectNorm]]) -> Dict[str, Any]:
+def _rect_to_json(r: StoredRectNorm) -> Dict[str, Any]:
     return {
-        str(k): [
-            {"label": r.label, "x0_norm": r.x0n, "y0_norm": r.y0n, "x1_norm": r.x1n, "y1_norm": r.y1n}
-            for r in v
-        ]
-        for k, v in stored.items()
+        "label": r.label, "x0_norm": r.x0n, "y0_norm": r.y0n, "x1_norm": r.x1n, "y1_norm": r.y1n,
+        "profile": r.profile,
     }
 
 
-def annotations_from_json(data: Dict[str, Any]) -> Dict[int, List[StoredRectNorm]]:
-    out: Dict[int, List[StoredRectNorm]] = {}
+def annotations_to_json(stored: Dict[int, List[StoredRectNorm]]) -> Dict[str, Any]:
+    if hasattr(stored, "to_json"):  # AnnotationStore (app/annotation_store.py)
+        return stored.to_json()
+    return {str(k): [_rect_to_json(r) for r in v] for k, v in stored.items()}
+
+
+def annotations_from_json(data: Dict[str, Any], lazy: bool = False) -> Dict[int, List[StoredRectNorm]]:
+    """lazy=True devolve um AnnotationStore (arrays por página, convertidos no primeiro acesso)."""
+    raw: Dict[int, Any] = {}
     for k, items in (data or {}).items():
         try:
             page_k = int(k)
         except Exception:
             continue
+        raw[page_k] = items or []
+    if lazy:
+        from .annotation_store import AnnotationStore
 
-        rects: List[StoredRectNorm] = []
-        for it in items or []:
-            rects.append(
-                StoredRectNorm(
-                    label=str(it.get("label", "Campo")),
-                    x0n=float(it.get("x0_norm", 0.0)),
-                    y0n=float(it.get("y0_norm", 0.0)),
-                    x1n=float(it.get("x1_norm", 0.0)),
-                    y1n=float(it.get("y1_norm", 0.0)),
-                )
-            )
-        out[page_k] = rects
-    return out
+        return AnnotationStore.from_json(raw)
+    return {k: _rects_from_json(items) for k, items in raw.items()}
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+import numpy as np
+import cv2
 import fitz  # PyMuPDF
-from PySide6.QtGui import QImage, QPixmap
+
+# Qt só nas funções que devolvem QPixmap: o lote/CLI usa este módulo sem carregar o PySide6
+if TYPE_CHECKING:
+    from PySide6.QtGui import QPixmap
 
 
 def render_pdf_page(doc: fitz.Document, page_index: int, zoom: float) -> QPixmap:
+    from PySide6.QtGui import QImage, QPixmap
+
     page = doc.load_page(page_index)
     mat = fitz.Matrix(zoom, zoom)
     pix = page.get_pixmap(matrix=mat, alpha=False)  # RGB
@@ -13,6 +22,27 @@ def render_pdf_page(doc: fitz.Document, page_index: int, zoom: float) -> QPixmap
     return QPixmap.fromImage(qimg)
 
 
+def render_pdf_page_bgr(doc: fitz.Document, page_index: int, zoom: float) -> np.ndarray:
+    """Renderiza a página direto para um array BGR (uso sem GUI / lote)."""
+    page = doc.load_page(page_index)
+    mat = fitz.Matrix(zoom, zoom)
+    pix = page.get_pixmap(matrix=mat, alpha=False)  # RGB
+
+    buf = np.frombuffer(pix.samples, dtype=np.uint8).reshape((pix.height, pix.stride))
+    rgb = buf[:, : pix.width * 3].reshape((pix.height, pix.width, 3))
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+def bgr_to_qpixmap(bgr: np.ndarray) -> QPixmap:
+    """QPixmap a partir de BGR (inclusive array somente leitura/mmap do cache em disco)."""
+    from PySide6.QtGui import QImage, QPixmap
+
+    h, w = bgr.shape[:2]
+    data = np.ascontiguousarray(bgr).tobytes()
+    qimg = QImage(data, w, h, 3 * w, QImage.Format_BGR888)
+    return QPixmap.fromImage(qimg)  # fromImage copia; data só precisa viver até aqui
+
+
 def get_rendered_size(doc: fitz.Document, page_index: int, zoom: float) -> tuple[int, int]:
     page = doc.load_page(page_index)
     mat = fitz.Matrix(zoom, zoom)
@@ -0,0 +1,229 @@
+"""
+Pipeline em estágios ligados por filas limitadas.
+
+Cada estágio tem seu próprio nº de workers (threads), tamanho de fila e
+teto de bytes na fila de entrada: quando um estágio fica para trás, a fila
+enche e o estágio anterior bloqueia (backpressure). Profundidade das filas,
+itens processados e utilização de cada estágio ficam disponíveis em stats().
+"""
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+_END = object()
+
+
+class PipelineAborted(RuntimeError):
+    pass
+
+
+def estimate_nbytes(item: Any) -> int:
+    """Bytes de arrays NumPy carregados pelo item (dataclass, tupla/lista ou array)."""
+    if isinstance(item, np.ndarray):
+        return int(item.nbytes)
+    if dataclasses.is_dataclass(item) and not isinstance(item, type):
+        return sum(estimate_nbytes(getattr(item, f.name)) for f in dataclasses.fields(item))
+    if isinstance(item, (tuple, list)):
+        return sum(estimate_nbytes(x) for x in item)
+    return 0
+
+
+class BoundedQueue:
+    """Fila limitada por nº de itens e (opcionalmente) por bytes."""
+    def __init__(self, maxsize: int, max_bytes: int = 0):
+        self.maxsize = max(1, int(maxsize))
+        self.max_bytes = max(0, int(max_bytes))
+        self._items: deque = deque()
+        self._bytes = 0
+        self._cond = threading.Condition()
+
+    def put(self, item: Any, nbytes: int, abort: threading.Event) -> None:
+        with self._cond:
+            # fila vazia sempre aceita (item maior que o teto não trava o pipeline)
+            while self._items and (
+                len(self._items) >= self.maxsize
+                or (self.max_bytes and self._bytes + nbytes > self.max_bytes)
+            ):
+                if abort.is_set():
+                    raise PipelineAborted()
+                self._cond.wait(0.1)
+            self._items.append((item, nbytes))
+            self._bytes += nbytes
+            self._cond.notify_all()
+
+    def put_end(self) -> None:
+        with self._cond:
+            self._items.append((_END, 0))
+            self._cond.notify_all()
+
+    def get(self, abort: threading.Event) -> Any:
+        with self._cond:
+            while not self._items:
+                if abort.is_set():
+                    raise PipelineAborted()
+                self._cond.wait(0.1)
+            item, nbytes = self._items.popleft()
+            self._bytes -= nbytes
+            self._cond.notify_all()
+            return item
+
+    def depth(self) -> int:
+        with self._cond:
+            return sum(1 for it, _ in self._items if it is not _END)
+
+    def nbytes(self) -> int:
+        with self._cond:
+            return self._bytes
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 8
+    max_bytes: int = 0    # teto de bytes na fila de entrada (0 = sem teto)
+    expand: bool = False  # fn devolve um iterável de itens (ex.: documento -> páginas)
+
+    processed: int = field(default=0, init=False)
+    busy_s: float = field(default=0.0, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage], size_of: Callable[[Any], int] = estimate_nbytes):
+        if not stages:
+            raise ValueError("Pipeline sem estágios.")
+        self.stages = stages
+        self._size_of = size_of
+        self._queues = [BoundedQueue(s.queue_size, s.max_bytes) for s in stages]
+        self._abort = threading.Event()
+        self._errors: List[BaseException] = []
+        self._t0 = 0.0
+
+    def _emit(self, index: int, item: Any) -> None:
+        if index < len(self.stages):
+            self._queues[index].put(item, self._size_of(item), self._abort)
+
+    def _run_expand(self, index: int, stage: Stage, item: Any) -> None:
+        """Repassa cada item gerado assim que sai (ex.: página renderizada), sem materializar o documento."""
+        t0 = time.perf_counter()
+        busy = 0.0
+        try:
+            for o in stage.fn(item):
+                busy += time.perf_counter() - t0
+                if o is not None:
+                    self._emit(index + 1, o)  # pode bloquear: não conta como ocupado
+                t0 = time.perf_counter()
+            busy += time.perf_counter() - t0
+        finally:
+            with stage._lock:
+                stage.processed += 1
+                stage.busy_s += busy
+
+    def _worker(self, index: int, done: List[int], done_lock: threading.Lock) -> None:
+        stage = self.stages[index]
+        q = self._queues[index]
+        try:
+            while True:
+                item = q.get(self._abort)
+                if item is _END:
+                    break
+                if stage.expand:
+                    self._run_expand(index, stage, item)
+                    continue
+                t0 = time.perf_counter()
+                out = stage.fn(item)
+                busy = time.perf_counter() - t0
+                with stage._lock:
+                    stage.processed += 1
+                    stage.busy_s += busy
+                if out is not None:
+                    self._emit(index + 1, out)
+        except PipelineAborted:
+            return
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+            return
+        finally:
+            with done_lock:
+                done[index] += 1
+                last = done[index] == stage.workers
+            # último worker do estágio encerra o próximo
+            if last and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].workers):
+                    self._queues[index + 1].put_end()
+
+    def _feed(self, source: Iterable[Any]) -> None:
+        try:
+            for item in source:
+                self._emit(0, item)
+        except PipelineAborted:
+            return
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put_end()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        wall = max(1e-9, time.perf_counter() - self._t0) if self._t0 else 1e-9
+        out = []
+        for stage, q in zip(self.stages, self._queues):
+            with stage._lock:
+                processed, busy = stage.processed, stage.busy_s
+            out.append({
+                "stage": stage.name,
+                "workers": stage.workers,
+                "queue_depth": q.depth(),
+                "queue_bytes": q.nbytes(),
+                "processed": processed,
+                "busy_s": busy,
+                "utilization": busy / (wall * stage.workers),
+            })
+        return out
+
+    def run(
+        self,
+        source: Iterable[Any],
+        *,
+        on_stats: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        stats_interval: float = 1.0,
+    ) -> None:
+        self._t0 = time.perf_counter()
+        done = [0] * len(self.stages)
+        done_lock = threading.Lock()
+
+        threads = [threading.Thread(target=self._feed, args=(source,), name="pipeline-source", daemon=True)]
+        for i, stage in enumerate(self.stages):
+            for w in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._worker, args=(i, done, done_lock),
+                    name=f"pipeline-{stage.name}-{w}", daemon=True,
+                ))
+        for t in threads:
+            t.start()
+
+        last = threads[1:]
+        while any(t.is_alive() for t in last):
+            for t in last:
+                t.join(stats_interval if on_stats else None)
+                if on_stats and t.is_alive():
+                    on_stats(self.stats())
+                    break
+        threads[0].join()
+
+        if on_stats:
+            on_stats(self.stats())
+        if self._errors:
+            raise self._errors[0]
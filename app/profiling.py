@@ -0,0 +1,142 @@
+"""
+Captura de perfil de desempenho (GUI e lote) para anexar em chamados.
+
+Combina cProfile (tempo por função, na thread que iniciou a captura) com um
+amostrador de pilhas de todas as threads. Cada captura gera, com o mesmo
+prefixo <data>_<documento>_<perfil>:
+
+- .prof       estatísticas pstats (snakeviz, `python -m pstats`)
+- .collapsed  pilhas no formato "collapsed" (flamegraph.pl, speedscope),
+              com o documento e o perfil OCR como raiz
+- .txt        resumo das funções mais caras (tempo acumulado)
+- .json       metadados: documento, perfil, duração, plataforma
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+
+def default_output_dir() -> str:
+    return os.environ.get("OCR_PROFILE_DIR") or os.path.join(os.path.expanduser("~"), "marcador_perfis")
+
+
+def _slug(text: str, max_len: int = 40) -> str:
+    text = re.sub(r"[^\w.-]+", "-", text, flags=re.UNICODE).strip("-")
+    return text[:max_len] or "sem-nome"
+
+
+def _frame_label(code) -> str:
+    # ';' separa frames no formato collapsed e não pode aparecer no nome
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfileSession:
+    def __init__(self, document: str = "", profile: str = "", *, sample_interval: float = 0.005):
+        self.document = document or ""
+        self.profile = profile or ""
+        self.sample_interval = max(0.001, float(sample_interval))
+        self._prof = cProfile.Profile()
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._t0 = 0.0
+        self._started_at = 0.0
+        self.duration = 0.0
+        self.running = False
+
+    # ---------------- captura ----------------
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="perf-sampler", daemon=True)
+        self._sampler.start()
+        self._prof.enable()
+        self.running = True
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._prof.disable()
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self._t0
+        self.running = False
+
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self) -> "ProfileSession":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---------------- saída ----------------
+
+    def collapsed(self) -> str:
+        # etiqueta resolvida na gravação: o documento pode ter sido aberto durante a captura
+        doc = os.path.basename(self.document) if self.document else "-"
+        root = f"doc={_slug(doc)};perfil={_slug(self.profile or '-')}"
+        return "".join(f"{root};{stack} {n}\n" for stack, n in self._stacks.most_common())
+
+    def summary(self, limit: int = 40) -> str:
+        buf = io.StringIO()
+        stats = pstats.Stats(self._prof, stream=buf)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return buf.getvalue()
+
+    def write(self, out_dir: str = "") -> Dict[str, str]:
+        """Grava .prof/.collapsed/.txt/.json e devolve os caminhos por extensão."""
+        if self.running:
+            self.stop()
+        out_dir = out_dir or default_output_dir()
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._started_at))
+        doc = os.path.splitext(os.path.basename(self.document))[0] if self.document else "sem-documento"
+        base = os.path.join(out_dir, f"{stamp}_{_slug(doc)}_{_slug(self.profile or 'padrao')}")
+
+        paths = {ext: base + ext for ext in (".prof", ".collapsed", ".txt", ".json")}
+        self._prof.dump_stats(paths[".prof"])
+        with open(paths[".collapsed"], "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        with open(paths[".txt"], "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        with open(paths[".json"], "w", encoding="utf-8") as f:
+            json.dump({
+                "document": self.document,
+                "profile": self.profile,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._started_at)),
+                "duration_s": round(self.duration, 3),
+                "samples": sum(self._stacks.values()),
+                "sample_interval_s": self.sample_interval,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+            }, f, ensure_ascii=False, indent=2)
+        return paths
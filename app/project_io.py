@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, Optional
-
-from PySide6.QtGui import QTransform
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from .model import annotations_to_json, annotations_from_json, StoredRectNorm
 
+# load_project_json devolve view_transform como lista; só a janela chama parse_transform
+# (que importa o PySide6), então o lote e os demais CLIs leem projetos sem o Qt
+if TYPE_CHECKING:
+    from PySide6.QtGui import QTransform
+
+# a partir deste total de retângulos o projeto grava o formato colunar compacto
+COMPACT_MIN_RECTS = 5000
+
 
 def save_project_json(
     out_path: str,
@@ -18,11 +24,13 @@ def save_project_json(
     view_transform: QTransform,
     stored_norm: dict[int, list[StoredRectNorm]],
     ocr_profiles: dict,
-    active_profile_name: str
+    active_profile_name: str,
+    ocr_cascade: list | None = None,
 ) -> None:
     tr = view_transform
+    compact = hasattr(stored_norm, "to_columnar_json") and stored_norm.total >= COMPACT_MIN_RECTS
     data: Dict[str, Any] = {
-        "version": 1,
+        "version": 2 if compact else 1,
         "source_path": source_path,
         "is_pdf": is_pdf,
         "pdf_page_index": pdf_page_index,
@@ -32,33 +40,46 @@ def save_project_json(
             tr.m21(), tr.m22(), tr.m23(),
             tr.m31(), tr.m32(), tr.m33(),
         ],
-        "annotations": annotations_to_json(stored_norm),
+        "annotations": {} if compact else annotations_to_json(stored_norm),
         "ocr_profiles": ocr_profiles or {},
         "active_profile_name": active_profile_name or "",
+        "ocr_cascade": ocr_cascade or [],
     }
+    if compact:
+        data["annotations_columnar"] = stored_norm.to_columnar_json()
 
     with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=2)
 
 
-def load_project_json(path: str) -> Dict[str, Any]:
+def load_project_json(path: str, lazy_annotations: bool = False) -> Dict[str, Any]:
+    """lazy_annotations: retângulos convertidos por página só quando a página é visitada."""
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
     # Normaliza campos básicos e converte annotations
-    data["annotations_parsed"] = annotations_from_json(data.get("annotations", {}))
+    if data.get("annotations_columnar"):
+        from .annotation_store import AnnotationStore
 
-    tr_list = data.get("view_transform")
-    data["view_transform_parsed"] = parse_transform(tr_list)
+        store = AnnotationStore.from_columnar_json(data["annotations_columnar"])
+        data["annotations_parsed"] = store if lazy_annotations else {page: store[page] for page in store}
+    else:
+        data["annotations_parsed"] = annotations_from_json(data.get("annotations", {}), lazy=lazy_annotations)
 
     data["ocr_profiles"] = data.get("ocr_profiles", {})
     data["active_profile_name"] = data.get("active_profile_name", "")
+    data["ocr_cascade"] = data.get("ocr_cascade", []) or []
 
     return data
 
 
 def parse_transform(tr_list: Any) -> Optional[QTransform]:
     if isinstance(tr_list, list) and len(tr_list) == 9:
+        from PySide6.QtGui import QTransform
+
         try:
             vals = [float(x) for x in tr_list]
             return QTransform(*vals)
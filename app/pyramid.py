@@ -0,0 +1,272 @@
+"""
+Pirâmide multirresolução para imagens gigantes (scans costurados, plantas).
+
+A imagem é decodificada uma única vez e gravada em disco como níveis .npy
+(BGR): nível 0 = resolução total, cada nível seguinte com metade da largura
+e da altura, até caber em MIN_LEVEL_SIDE. As aberturas seguintes só mapeiam
+os arquivos (mmap). PyramidItem desenha, a cada paint, apenas os ladrilhos
+expostos do nível compatível com o zoom atual; os ladrilhos convertidos para
+QImage ficam no orçamento global de memória ("piramide"). Recortes para OCR
+saem sempre do nível 0.
+
+Usada para imagens de um quadro acima de OCR_PYRAMID_MIN_MP megapixels
+(image_source.wants_pyramid). O disco é limitado como no cache de páginas
+(app/raster_cache.py): LRU por mtime (niveis.json é tocado a cada abertura)
+com teto OCR_PYRAMID_CACHE_MB, e pirâmides de versões anteriores do mesmo
+arquivo são apagadas ao construir a nova. A construção roda fora da thread
+da interface (PyramidBuilder), com progresso por etapa.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import shutil
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import cv2
+from PySide6.QtCore import QObject, QRectF, Signal
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+
+from .memory import ACCOUNTANT, MB
+from .thumbnails import document_key
+
+TILE = 512
+MIN_LEVEL_SIDE = 1024
+DEFAULT_CACHE_MB = 4096
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "marcador", "piramides")
+
+
+def cache_max_bytes() -> int:
+    """OCR_PYRAMID_CACHE_MB (padrão 4096; 0 = sem teto)."""
+    try:
+        return int(float(os.environ.get("OCR_PYRAMID_CACHE_MB", str(DEFAULT_CACHE_MB))) * MB)
+    except ValueError:
+        return DEFAULT_CACHE_MB * MB
+
+
+def _folder_size(folder: str) -> int:
+    total = 0
+    for name in os.listdir(folder):
+        try:
+            total += os.path.getsize(os.path.join(folder, name))
+        except OSError:
+            pass
+    return total
+
+
+def prune_cache(root: str, max_bytes: int, keep: str = "", source: str = "") -> None:
+    """
+    Remove pirâmides inteiras, das menos usadas (mtime de niveis.json) para as
+    mais usadas, até caber em max_bytes (alvo de 90%, como o cache de páginas).
+    source: pirâmides antigas desse arquivo (outro tamanho/mtime) saem sempre.
+    """
+    entries = []
+    for key in os.listdir(root) if os.path.isdir(root) else ():
+        folder = os.path.join(root, key)
+        if folder == keep or not os.path.isdir(folder):
+            continue
+        meta = os.path.join(folder, "niveis.json")
+        try:
+            mtime = os.path.getmtime(meta)
+            with open(meta, "r", encoding="utf-8") as f:
+                stale = bool(source) and json.load(f).get("source") == source
+        except (OSError, ValueError):
+            mtime, stale = 0.0, False  # construção interrompida: primeira a sair
+        if stale:
+            shutil.rmtree(folder, ignore_errors=True)
+            continue
+        entries.append((mtime, _folder_size(folder), folder))
+    if max_bytes <= 0:
+        return
+
+    total = sum(size for _, size, _ in entries) + (_folder_size(keep) if keep and os.path.isdir(keep) else 0)
+    target = int(max_bytes * 0.9)
+    for _mtime, size, folder in sorted(entries):
+        if total <= target:
+            break
+        shutil.rmtree(folder, ignore_errors=True)
+        total -= size
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp, np.ascontiguousarray(arr))
+    os.replace(tmp, path)
+
+
+class ImagePyramid:
+    def __init__(self, levels: List[np.ndarray], key: str = ""):
+        if not levels:
+            raise ValueError("pirâmide sem níveis")
+        self.levels = levels
+        self.key = key
+
+    @property
+    def width(self) -> int:
+        return int(self.levels[0].shape[1])
+
+    @property
+    def height(self) -> int:
+        return int(self.levels[0].shape[0])
+
+    @classmethod
+    def cached(cls, path: str, cache_dir: str = "") -> Optional["ImagePyramid"]:
+        """Pirâmide já construída (só mapeia os níveis), ou None."""
+        key = document_key(path)
+        folder = os.path.join(cache_dir or default_cache_dir(), key)
+        meta_path = os.path.join(folder, "niveis.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                count = int(json.load(f)["levels"])
+            levels = [np.load(os.path.join(folder, f"L{i}.npy"), mmap_mode="r") for i in range(count)]
+            os.utime(meta_path)  # recência para o LRU
+            return cls(levels, key)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def open_or_build(
+        cls,
+        path: str,
+        cache_dir: str = "",
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> "ImagePyramid":
+        """
+        Mapeia a pirâmide do cache ou a constrói (uma decodificação completa).
+        progress(etapa, total): etapa 0 = decodificação, depois um nível por etapa.
+        """
+        pyramid = cls.cached(path, cache_dir)
+        if pyramid is not None:
+            return pyramid
+
+        root = cache_dir or default_cache_dir()
+        key = document_key(path)
+        folder = os.path.join(root, key)
+        meta_path = os.path.join(folder, "niveis.json")
+        os.makedirs(folder, exist_ok=True)
+        source = os.path.abspath(path)
+
+        level = cv2.imread(path, cv2.IMREAD_COLOR)
+        if level is None:
+            raise OSError(f"Não foi possível decodificar {path}")
+        h, w = level.shape[:2]
+        total = 2 + max(0, math.ceil(math.log2(max(w, h) / MIN_LEVEL_SIDE)))
+        if progress is not None:
+            progress(1, total)
+        count = 0
+        while True:
+            _save_npy(os.path.join(folder, f"L{count}.npy"), level)
+            count += 1
+            if progress is not None:
+                progress(min(count + 1, total), total)
+            h, w = level.shape[:2]
+            if max(w, h) <= MIN_LEVEL_SIDE:
+                break
+            level = cv2.resize(level, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
+
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"levels": count, "source": source}, f)
+        os.replace(tmp, meta_path)
+        # versões antigas deste arquivo e as menos usadas, até caber no teto
+        prune_cache(root, cache_max_bytes(), keep=folder, source=source)
+        levels = [np.load(os.path.join(folder, f"L{i}.npy"), mmap_mode="r") for i in range(count)]
+        return cls(levels, key)
+
+    def level_for_scale(self, screen_per_scene: float) -> int:
+        """Nível mais grosso que ainda tem ao menos 1 pixel por pixel de tela."""
+        if screen_per_scene <= 0:
+            return len(self.levels) - 1
+        level = int(math.floor(math.log2(1.0 / screen_per_scene))) if screen_per_scene < 1.0 else 0
+        return max(0, min(len(self.levels) - 1, level))
+
+    def level_factor(self, level: int) -> Tuple[float, float]:
+        """Pixels do nível 0 por pixel do nível (x, y)."""
+        arr = self.levels[level]
+        return self.width / arr.shape[1], self.height / arr.shape[0]
+
+    def tile_bgr(self, level: int, tx: int, ty: int) -> np.ndarray:
+        arr = self.levels[level]
+        return arr[ty * TILE:(ty + 1) * TILE, tx * TILE:(tx + 1) * TILE]
+
+    def crop_bgr(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        """Recorte em resolução total (cópia; só as páginas do arquivo tocadas são lidas)."""
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width, x + w), min(self.height, y + h)
+        return np.ascontiguousarray(self.levels[0][y0:y1, x0:x1])
+
+
+class PyramidBuilder(QObject):
+    """Constrói (ou mapeia) a pirâmide numa thread; resultado e progresso chegam por sinal."""
+    progress = Signal(int, int)  # etapa, total
+    finished = Signal(object)    # ImagePyramid
+    failed = Signal(str)
+
+    def start(self, path: str, cache_dir: str = "") -> None:
+        threading.Thread(target=self._run, args=(path, cache_dir), name="piramide", daemon=True).start()
+
+    def _run(self, path: str, cache_dir: str) -> None:
+        # qualquer erro precisa chegar como sinal: a janela espera num loop modal sem cancelar
+        try:
+            pyramid = ImagePyramid.open_or_build(path, cache_dir, progress=self.progress.emit)
+        except Exception as e:
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        self.finished.emit(pyramid)
+
+
+class PyramidItem(QGraphicsItem):
+    """Item de cena que desenha a pirâmide no nível do zoom atual, ladrilho a ladrilho."""
+
+    def __init__(self, pyramid: ImagePyramid):
+        super().__init__()
+        self.pyramid = pyramid
+        self._bounds = QRectF(0, 0, pyramid.width, pyramid.height)
+        self._tiles = ACCOUNTANT.pool("piramide", priority=35)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)  # exposedRect por paint
+
+    def boundingRect(self) -> QRectF:
+        return self._bounds
+
+    def _tile_image(self, level: int, tx: int, ty: int) -> QImage:
+        key = (self.pyramid.key, level, tx, ty)
+        img = self._tiles.get(key)
+        if img is None:
+            tile = np.ascontiguousarray(self.pyramid.tile_bgr(level, tx, ty))
+            h, w = tile.shape[:2]
+            img = QImage(tile.data, w, h, 3 * w, QImage.Format_BGR888).copy()
+            self._tiles.put(key, img)
+        return img
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None) -> None:
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.pyramid.level_for_scale(lod)
+        fx, fy = self.pyramid.level_factor(level)
+        arr = self.pyramid.levels[level]
+        lh, lw = arr.shape[:2]
+
+        exposed = option.exposedRect.intersected(self._bounds)
+        if exposed.isEmpty():
+            return
+        tx0 = max(0, int(exposed.left() / fx) // TILE)
+        ty0 = max(0, int(exposed.top() / fy) // TILE)
+        tx1 = min((lw - 1) // TILE, int(exposed.right() / fx) // TILE)
+        ty1 = min((lh - 1) // TILE, int(exposed.bottom() / fy) // TILE)
+
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, lod < 1.0)
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                img = self._tile_image(level, tx, ty)
+                target = QRectF(tx * TILE * fx, ty * TILE * fy, img.width() * fx, img.height() * fy)
+                painter.drawImage(target, img)
+
+    def clear_tiles(self) -> None:
+        self._tiles.clear()
@@ -0,0 +1,139 @@
+"""
+Rasters de página em memória compartilhada para workers OCR em processos.
+
+A página é renderizada uma única vez direto num segmento de
+multiprocessing.shared_memory; os workers recebem só um descritor leve
+(nome, shape, strides) e mapeiam o mesmo buffer, sem serializar pixels.
+Cada segmento é liberado quando todas as regiões da página terminam.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import cv2
+import fitz  # PyMuPDF
+
+from .memory import ACCOUNTANT
+
+try:
+    import resource  # indisponível no Windows
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+@dataclass(frozen=True)
+class RasterDescriptor:
+    shm_name: str
+    shape: Tuple[int, ...]
+    strides: Tuple[int, ...]
+    dtype: str = "uint8"
+
+
+def open_segment(name: str) -> SharedMemory:
+    # Python >= 3.13: track=False evita que o worker registre (e remova) o segmento no resource_tracker
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+def attach(desc: RasterDescriptor) -> Tuple[SharedMemory, np.ndarray]:
+    """
+    Mapeia o raster no processo atual. O chamador deve descartar o array
+    (e views dele) antes de chamar shm.close().
+    """
+    shm = open_segment(desc.shm_name)
+    arr = np.ndarray(desc.shape, dtype=np.dtype(desc.dtype), buffer=shm.buf, strides=desc.strides)
+    return shm, arr
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de memória residente do processo atual (None se indisponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KiB; macOS em bytes
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+class RasterBroker:
+    """Dono dos segmentos compartilhados: cria, conta referências e libera."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segments: Dict[str, Tuple[SharedMemory, int]] = {}  # nome -> (shm, pendentes)
+        self.current_bytes = 0
+        self.peak_bytes = 0
+        self._mem = ACCOUNTANT.pool("shared_rasters", priority=100)
+
+    def _allocate(self, shape: Tuple[int, ...]) -> Tuple[SharedMemory, np.ndarray]:
+        nbytes = int(np.prod(shape))
+        shm = SharedMemory(create=True, size=max(1, nbytes))
+        arr = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        with self._lock:
+            self._segments[shm.name] = (shm, 0)
+            self.current_bytes += shm.size
+            self.peak_bytes = max(self.peak_bytes, self.current_bytes)
+        self._mem.set_pinned(shm.name, shm.size)
+        return shm, arr
+
+    def render_pdf_page(self, doc: fitz.Document, page_index: int, zoom: float) -> RasterDescriptor:
+        page = doc.load_page(page_index)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)  # RGB
+
+        buf = np.frombuffer(pix.samples, dtype=np.uint8).reshape((pix.height, pix.stride))
+        rgb = buf[:, : pix.width * 3].reshape((pix.height, pix.width, 3))
+
+        shm, arr = self._allocate((pix.height, pix.width, 3))
+        cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=arr)
+        desc = RasterDescriptor(shm.name, arr.shape, arr.strides)
+        del arr
+        return desc
+
+    def publish(self, bgr: np.ndarray) -> RasterDescriptor:
+        shm, arr = self._allocate(bgr.shape)
+        arr[...] = bgr
+        desc = RasterDescriptor(shm.name, arr.shape, arr.strides)
+        del arr
+        return desc
+
+    def retain(self, desc: RasterDescriptor, n: int = 1) -> None:
+        with self._lock:
+            shm, pending = self._segments[desc.shm_name]
+            self._segments[desc.shm_name] = (shm, pending + n)
+
+    def release(self, desc: RasterDescriptor) -> None:
+        with self._lock:
+            entry = self._segments.get(desc.shm_name)
+            if entry is None:
+                return
+            shm, pending = entry
+            pending -= 1
+            if pending > 0:
+                self._segments[desc.shm_name] = (shm, pending)
+                return
+            del self._segments[desc.shm_name]
+            self.current_bytes -= shm.size
+        self._mem.set_pinned(desc.shm_name, 0)
+        shm.close()
+        shm.unlink()
+
+    def close(self) -> None:
+        with self._lock:
+            segments = list(self._segments.values())
+            self._segments.clear()
+            self.current_bytes = 0
+        for shm, _ in segments:
+            self._mem.set_pinned(shm.name, 0)
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self) -> "RasterBroker":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,237 @@
+"""
+Cache persistente em disco de páginas renderizadas (BGR uint8).
+
+Chave: (sha256 do conteúdo do documento, página, zoom, versão do MuPDF),
+então o cache vale entre sessões, para cópias do mesmo arquivo e é
+invalidado sozinho quando o PyMuPDF muda. Entradas .npy são lidas com
+mmap (sem decodificar nem copiar para a heap); com compress=True as
+entradas viram .npz compactado (menos disco, leitura com descompressão).
+
+Tamanho limitado por LRU: cada leitura atualiza o mtime do arquivo e, ao
+passar do teto, os arquivos mais antigos são removidos.
+
+Na GUI o cache é opcional (OCR_RASTER_CACHE_MB) e nada de disco roda na
+thread da interface: known_hash() só consulta o memo (caminho, tamanho,
+mtime) e put_later() calcula o sha256 e grava numa thread de fundo.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import fitz  # PyMuPDF
+
+from .journal import file_sha256
+from .memory import MB
+from .metrics import REGISTRY
+from .pdf_render import render_pdf_page_bgr
+
+_CACHE_HITS = REGISTRY.counter("ocr_cache_hits_total", "Acertos de cache", ("cache",))
+
+DEFAULT_MAX_MB = 1024
+PENDING_WRITES = 4  # páginas à espera de gravação em segundo plano (além disso, descarta)
+
+
+def mupdf_version() -> str:
+    return str(getattr(fitz, "VersionBind", "") or fitz.version[1])
+
+
+def default_cache_root() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "marcador", "rasters")
+
+
+class DiskRasterCache:
+    def __init__(self, root: str = "", max_bytes: int = DEFAULT_MAX_MB * MB, *, compress: bool = False):
+        self.root = os.path.abspath(root or default_cache_root())
+        self.max_bytes = int(max_bytes)
+        self.compress = compress
+        self._version = mupdf_version()
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, str] = {}
+        self._hashes_path = os.path.join(self.root, "hashes.json")
+        self._total: Optional[int] = None
+        self._writes: Optional[queue.Queue] = None  # fila de put_later, criada no primeiro uso
+        os.makedirs(self.root, exist_ok=True)
+        self._load_hashes()
+
+    @classmethod
+    def from_env(cls) -> Optional["DiskRasterCache"]:
+        """Cache da GUI, opcional: OCR_RASTER_CACHE_MB (teto; ausente ou 0 = desativado) e OCR_RASTER_CACHE_DIR."""
+        try:
+            max_mb = float(os.environ.get("OCR_RASTER_CACHE_MB", "0"))
+        except ValueError:
+            max_mb = 0
+        if max_mb <= 0:
+            return None
+        try:
+            return cls(os.environ.get("OCR_RASTER_CACHE_DIR", ""), int(max_mb * MB))
+        except OSError:
+            return None
+
+    # ---------------- hash do documento ----------------
+
+    def _load_hashes(self) -> None:
+        try:
+            with open(self._hashes_path, "r", encoding="utf-8") as f:
+                self._hashes = dict(json.load(f))
+        except (OSError, ValueError):
+            self._hashes = {}
+
+    @staticmethod
+    def _stamp(path: str) -> str:
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def known_hash(self, path: str) -> str:
+        """sha256 já memorizado para (caminho, tamanho, mtime), ou "" (sem ler o arquivo)."""
+        try:
+            stamp = self._stamp(path)
+        except OSError:
+            return ""
+        with self._lock:
+            return self._hashes.get(stamp, "")
+
+    def document_hash(self, path: str) -> str:
+        """sha256 do conteúdo, memorizado por (caminho, tamanho, mtime) para não reler o arquivo."""
+        stamp = self._stamp(path)
+        with self._lock:
+            digest = self._hashes.get(stamp)
+        if digest:
+            return digest
+        digest = file_sha256(path)
+        with self._lock:
+            self._hashes[stamp] = digest
+            tmp = f"{self._hashes_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._hashes, f)
+                os.replace(tmp, self._hashes_path)
+            except OSError:
+                pass
+        return digest
+
+    # ---------------- entradas ----------------
+
+    def _entry_base(self, doc_hash: str, page_index: int, zoom: float) -> str:
+        return os.path.join(self.root, doc_hash[:2], doc_hash, f"p{page_index}_z{zoom:.4f}_mu{self._version}")
+
+    def get(self, doc_hash: str, page_index: int, zoom: float) -> Optional[np.ndarray]:
+        base = self._entry_base(doc_hash, page_index, zoom)
+        for ext in (".npy", ".npz"):
+            path = base + ext
+            try:
+                if ext == ".npy":
+                    arr = np.load(path, mmap_mode="r")
+                else:
+                    with np.load(path) as z:
+                        arr = z["bgr"]
+                os.utime(path)  # recência para o LRU
+            except (OSError, ValueError, KeyError):
+                continue
+            _CACHE_HITS.inc(cache="raster_disk")
+            return arr
+        return None
+
+    def put(self, doc_hash: str, page_index: int, zoom: float, bgr: np.ndarray) -> None:
+        base = self._entry_base(doc_hash, page_index, zoom)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        ext = ".npz" if self.compress else ".npy"
+        tmp = f"{base}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+        try:
+            if self.compress:
+                np.savez_compressed(tmp, bgr=bgr)
+            else:
+                np.save(tmp, np.ascontiguousarray(bgr))
+            size = os.path.getsize(tmp)
+            os.replace(tmp, base + ext)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+        self._enforce()
+
+    def put_later(self, path: str, page_index: int, zoom: float, bgr: np.ndarray) -> None:
+        """
+        Grava em segundo plano (hash do documento + .npy fora da thread
+        chamadora). Com a fila cheia a página não é gravada: é só cache.
+        """
+        if self._writes is None:
+            self._writes = queue.Queue(maxsize=PENDING_WRITES)
+            threading.Thread(target=self._write_loop, name="raster-cache", daemon=True).start()
+        try:
+            self._writes.put_nowait((path, page_index, zoom, bgr))
+        except queue.Full:
+            pass
+
+    def _write_loop(self) -> None:
+        while True:
+            path, page_index, zoom, bgr = self._writes.get()
+            try:
+                self.put(self.document_hash(path), page_index, zoom, bgr)
+            except OSError:
+                pass
+
+    def render_pdf_page_bgr(self, doc: fitz.Document, doc_hash: str, page_index: int, zoom: float) -> np.ndarray:
+        """Página do cache (mmap, somente leitura) ou renderizada e gravada."""
+        arr = self.get(doc_hash, page_index, zoom)
+        if arr is None:
+            arr = render_pdf_page_bgr(doc, page_index, zoom)
+            self.put(doc_hash, page_index, zoom, arr)
+        return arr
+
+    # ---------------- limite de tamanho (LRU por mtime) ----------------
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        out = []
+        for dirpath, _dirs, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith((".npy", ".npz")) or ".tmp" in name:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._scan())
+            return self._total
+
+    def _enforce(self) -> None:
+        if self.size_bytes() <= self.max_bytes:
+            return
+        with self._lock:
+            # reescaneia: outros processos podem ter gravado/removido entradas
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)  # folga para não remover a cada gravação
+            for _mtime, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)  # POSIX: quem já mapeou o arquivo continua lendo
+                except OSError:
+                    continue
+                total -= size
+            self._total = total
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, _, path in self._scan():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total = 0
@@ -0,0 +1,177 @@
+"""
+Modelo da tabela de retângulos (QTableView) da página atual.
+
+Linha <-> item em O(1) (lista + dict); as células são calculadas sob
+demanda em data(), então a view só consulta as linhas visíveis. Mudanças
+de geometria durante um arrasto (um sinal por movimento do mouse) são
+marcadas como sujas e notificadas uma vez por quadro (~16 ms), junto com
+o callback on_flush (a janela grava a página nesse momento). A coluna
+Perfil é editada por ProfileDelegate (combo com os perfis existentes).
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+from PySide6.QtWidgets import QComboBox, QStyledItemDelegate
+
+from .items import AnnotRectItem
+
+HEADERS = ["Label", "x0", "y0", "x1", "y1", "w×h(px)", "Perfil"]
+COL_LABEL = 0
+COL_PROFILE = 6
+FRAME_MS = 16
+
+
+class RectTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[AnnotRectItem] = []
+        self._row_of: Dict[AnnotRectItem, int] = {}
+        self._dirty: Set[AnnotRectItem] = set()
+
+        # on_edit(item, coluna, texto) -> aceito?; on_flush() após as mudanças de um quadro
+        self.on_edit: Callable[[AnnotRectItem, int, str], bool] = lambda item, col, text: False
+        self.on_flush: Callable[[], None] = lambda: None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(FRAME_MS)
+        self._timer.timeout.connect(self.flush)
+
+    # ---------------- linhas <-> itens ----------------
+
+    @property
+    def items(self) -> List[AnnotRectItem]:
+        return self._items
+
+    def row_of(self, item: AnnotRectItem) -> Optional[int]:
+        return self._row_of.get(item)
+
+    def item_at(self, row: int) -> Optional[AnnotRectItem]:
+        return self._items[row] if 0 <= row < len(self._items) else None
+
+    def set_items(self, items: Iterable[AnnotRectItem]) -> None:
+        self.beginResetModel()
+        self._items = list(items)
+        self._row_of = {item: row for row, item in enumerate(self._items)}
+        self._dirty.clear()
+        self._timer.stop()
+        self.endResetModel()
+
+    def clear(self) -> None:
+        self.set_items(())
+
+    def append(self, item: AnnotRectItem) -> int:
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.append(item)
+        self._row_of[item] = row
+        self.endInsertRows()
+        return row
+
+    def remove_items(self, items: Iterable[AnnotRectItem]) -> None:
+        """Remove vários itens com uma única reindexação (faixas contíguas de trás para frente)."""
+        rows = sorted({self._row_of[it] for it in items if it in self._row_of}, reverse=True)
+        if not rows:
+            return
+        start = end = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == start - 1:
+                start = row
+                continue
+            self.beginRemoveRows(QModelIndex(), start, end)
+            for it in self._items[start:end + 1]:
+                self._row_of.pop(it, None)
+                self._dirty.discard(it)
+            del self._items[start:end + 1]
+            self.endRemoveRows()
+            if row is not None:
+                start = end = row
+        low = rows[-1]
+        for r in range(low, len(self._items)):
+            self._row_of[self._items[r]] = r
+
+    # ---------------- notificações agrupadas ----------------
+
+    def mark_changed(self, item: AnnotRectItem) -> None:
+        if item in self._row_of:
+            self._dirty.add(item)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Emite um dataChanged cobrindo as linhas sujas e chama on_flush."""
+        self._timer.stop()
+        rows = [self._row_of[it] for it in self._dirty if it in self._row_of]
+        self._dirty.clear()
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), len(HEADERS) - 1))
+        self.on_flush()
+
+    # ---------------- QAbstractTableModel ----------------
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._items)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self._items[index.row()]
+        col = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if col == COL_LABEL:
+                return item.label()
+            if col == COL_PROFILE:
+                return item.profile()
+            r = item.sceneBoundingRect()
+            if col == 5:
+                return f"{r.width():.0f}×{r.height():.0f}"
+            return f"{(r.left(), r.top(), r.right(), r.bottom())[col - 1]:.2f}"
+        if role == Qt.ToolTipRole and col == COL_PROFILE:
+            return "Perfil OCR da região (vazio = perfil ativo)"
+        return None
+
+    def flags(self, index: QModelIndex):
+        f = super().flags(index)
+        if index.isValid() and index.column() in (COL_LABEL, COL_PROFILE):
+            f |= Qt.ItemIsEditable
+        return f
+
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        return bool(self.on_edit(self._items[index.row()], index.column(), str(value or "")))
+
+
+class ProfileDelegate(QStyledItemDelegate):
+    """Editor da coluna Perfil: combo com "" (perfil ativo) + os perfis OCR existentes."""
+
+    def __init__(self, get_names: Callable[[], Iterable[str]], parent=None):
+        super().__init__(parent)
+        self._get_names = get_names
+
+    def createEditor(self, parent, option, index):
+        cb = QComboBox(parent)
+        cb.addItem("")
+        cb.addItems(sorted(self._get_names()))
+        cb.activated.connect(lambda _i, cb=cb: self.commitData.emit(cb))  # grava ao escolher
+        return cb
+
+    def setEditorData(self, editor: QComboBox, index: QModelIndex) -> None:
+        current = str(index.data(Qt.EditRole) or "")
+        if editor.findText(current) < 0:
+            editor.addItem(current)  # perfil vinculado que não existe mais: mostra em vez de trocar
+        editor.setCurrentText(current)
+
+    def setModelData(self, editor: QComboBox, model, index: QModelIndex) -> None:
+        if editor.currentText() != str(index.data(Qt.EditRole) or ""):
+            model.setData(index, editor.currentText(), Qt.EditRole)
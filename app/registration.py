@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+from .metrics import REGISTRY
+from .model import StoredRectNorm
+
+_CACHE_HITS = REGISTRY.counter("ocr_cache_hits_total", "Acertos de cache", ("cache",))
+_STAGE_SECONDS = REGISTRY.histogram("ocr_stage_seconds", "Tempo por estágio", ("stage",))
+
+
+@dataclass
+class PageFeatures:
+    keypoints: np.ndarray    # (N, 2) float32, em pixels da imagem reduzida
+    descriptors: np.ndarray  # (N, 32) uint8 (ORB)
+    width: int               # tamanho da imagem reduzida
+    height: int
+
+
+def _downsample_gray(bgr: np.ndarray, max_side: int) -> np.ndarray:
+    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+    h, w = gray.shape[:2]
+    s = float(max_side) / max(h, w)
+    if s < 1.0:
+        size = (max(1, int(round(w * s))), max(1, int(round(h * s))))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def compute_features(bgr: np.ndarray, *, max_side: int = 1000, n_features: int = 1500) -> PageFeatures:
+    gray = _downsample_gray(bgr, max_side)
+    h, w = gray.shape[:2]
+
+    orb = cv2.ORB_create(nfeatures=n_features)
+    kps, desc = orb.detectAndCompute(gray, None)
+    if desc is None or not kps:
+        return PageFeatures(np.zeros((0, 2), np.float32), np.zeros((0, 32), np.uint8), w, h)
+
+    pts = np.array([kp.pt for kp in kps], dtype=np.float32)
+    return PageFeatures(pts, desc, w, h)
+
+
+def estimate_norm_transform(
+    template: PageFeatures,
+    page: PageFeatures,
+    *,
+    ratio: float = 0.75,
+    min_inliers: int = 12,
+    full_affine: bool = False,
+) -> Optional[np.ndarray]:
+    """
+    Estima a transformação template -> página.
+    Retorna matriz 3x3 em coordenadas normalizadas (0–1), ou None se o
+    casamento de features não for confiável.
+    """
+    if len(template.descriptors) < min_inliers or len(page.descriptors) < min_inliers:
+        return None
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    knn = matcher.knnMatch(template.descriptors, page.descriptors, k=2)
+
+    src, dst = [], []
+    for pair in knn:
+        if len(pair) < 2:
+            continue
+        m, n = pair
+        if m.distance < ratio * n.distance:
+            src.append(template.keypoints[m.queryIdx])
+            dst.append(page.keypoints[m.trainIdx])
+
+    if len(src) < min_inliers:
+        return None
+
+    src_pts = np.asarray(src, dtype=np.float32)
+    dst_pts = np.asarray(dst, dtype=np.float32)
+
+    # Similaridade (rotação + escala uniforme + translação) em pixels; afim completa é opcional
+    estimate = cv2.estimateAffine2D if full_affine else cv2.estimateAffinePartial2D
+    m_px, inliers = estimate(src_pts, dst_pts, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+    if m_px is None or inliers is None or int(inliers.sum()) < min_inliers:
+        return None
+
+    # norm_página = D_p^-1 · M_px · D_t · norm_template
+    d_t = np.diag([float(template.width), float(template.height), 1.0])
+    d_p_inv = np.diag([1.0 / page.width, 1.0 / page.height, 1.0])
+    m3 = np.vstack([m_px.astype(np.float64), [0.0, 0.0, 1.0]])
+    return d_p_inv @ m3 @ d_t
+
+
+def map_rects_norm(rects: List[StoredRectNorm], m_norm: Optional[np.ndarray]) -> List[StoredRectNorm]:
+    """Aplica a transformação (3x3, normalizada) aos retângulos; usa a bbox dos 4 cantos."""
+    if m_norm is None or not rects:
+        return list(rects)
+
+    n = len(rects)
+    corners = np.empty((n, 4, 3), dtype=np.float64)
+    for i, sr in enumerate(rects):
+        corners[i] = [
+            [sr.x0n, sr.y0n, 1.0],
+            [sr.x1n, sr.y0n, 1.0],
+            [sr.x1n, sr.y1n, 1.0],
+            [sr.x0n, sr.y1n, 1.0],
+        ]
+
+    mapped = corners @ m_norm.T
+    xy = np.clip(mapped[..., :2], 0.0, 1.0)
+    mins = xy.min(axis=1)
+    maxs = xy.max(axis=1)
+
+    return [
+        replace(sr, x0n=float(mins[i, 0]), y0n=float(mins[i, 1]), x1n=float(maxs[i, 0]), y1n=float(maxs[i, 1]))
+        for i, sr in enumerate(rects)
+    ]
+
+
+class PageRegistrar:
+    """
+    Registro de páginas recebidas contra as páginas-template do projeto.
+    Os descritores do template são calculados uma única vez por página e
+    mantidos em cache; cada página recebida custa só detecção + matching
+    na imagem reduzida.
+    """
+    def __init__(
+        self,
+        get_template_bgr: Callable[[int], Optional[np.ndarray]],
+        *,
+        max_side: int = 1000,
+        n_features: int = 1500,
+        min_inliers: int = 12,
+        full_affine: bool = False,
+    ):
+        self._get_template_bgr = get_template_bgr
+        self._max_side = max_side
+        self._n_features = n_features
+        self._min_inliers = min_inliers
+        self._full_affine = full_affine
+        self._cache: Dict[int, Optional[PageFeatures]] = {}
+
+    def template_features(self, page_index: int) -> Optional[PageFeatures]:
+        if page_index in self._cache:
+            _CACHE_HITS.inc(cache="template_features")
+        else:
+            bgr = self._get_template_bgr(page_index)
+            self._cache[page_index] = (
+                None if bgr is None
+                else compute_features(bgr, max_side=self._max_side, n_features=self._n_features)
+            )
+        return self._cache[page_index]
+
+    def estimate(self, page_index: int, page_bgr: np.ndarray) -> Optional[np.ndarray]:
+        tmpl = self.template_features(page_index)
+        if tmpl is None:
+            return None
+        feats = compute_features(page_bgr, max_side=self._max_side, n_features=self._n_features)
+        return estimate_norm_transform(
+            tmpl, feats, min_inliers=self._min_inliers, full_affine=self._full_affine
+        )
+
+    def register_rects(
+        self, page_index: int, page_bgr: np.ndarray, rects: List[StoredRectNorm]
+    ) -> Tuple[List[StoredRectNorm], Optional[np.ndarray]]:
+        if not rects:
+            return [], None
+        with _STAGE_SECONDS.time(stage="register"):
+            m_norm = self.estimate(page_index, page_bgr)
+        return map_rects_norm(rects, m_norm), m_norm
@@ -0,0 +1,477 @@
+"""
+Serviço OCR local (asyncio, sem dependências externas) para outros
+processos usarem os perfis de um projeto sem chamar o Tesseract direto.
+
+Transporte: HTTP/1.1 em TCP (--port) ou socket Unix (--unix), keep-alive.
+
+    GET  /health                      -> {"status": "ok", "profiles": [...]}
+    GET  /metrics                     -> métricas no formato texto do Prometheus
+    POST /ocr?profile=NOME            corpo = bytes da imagem (PNG/JPEG/...)
+                                      -> {"text", "conf", "profile", "ms"}
+    POST /ocr  (application/json)     {"profile": "NOME", "pdf": "doc.pdf",
+                                       "page_index": 0, "rects": [[x0n, y0n, x1n, y1n], ...]}
+                                      -> NDJSON em streaming, uma linha por rect
+                                         na ordem de conclusão: {"index", "text", "conf", ...}
+
+Requisições simultâneas do mesmo perfil são agrupadas numa janela curta
+(micro-batch) e despachadas juntas para um pool de processos que mantém o
+projeto, os parâmetros resolvidos e os modelos carregados ("aquecidos").
+Dentro de um lote, cada página de PDF é renderizada uma única vez.
+
+Uso:
+    python -m app.service projeto.json [--port 8765 | --unix /tmp/ocr.sock] [--workers N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import cv2
+import fitz  # PyMuPDF
+
+from ocr.digits import load_model
+from ocr.preprocess import OCRParams, apply_preprocess
+from ocr.tesseract_engine import configure_tesseract, run_ocr, use_digit_recognizer
+
+from .batch import BatchProject, crop_norm, load_batch_project
+from .memory import ACCOUNTANT, MB
+from .metrics import REGISTRY
+from .model import StoredRectNorm
+from .pdf_render import render_pdf_page_bgr
+
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+_STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+REQUEST_SECONDS = REGISTRY.histogram("ocr_service_request_seconds", "Latência das requisições", ("route",))
+BATCH_SIZE = REGISTRY.histogram("ocr_service_batch_items", "Itens por micro-lote", ("profile",),
+                                buckets=(1, 2, 4, 8, 16, 32, 64))
+SERVICE_ERRORS = REGISTRY.counter("ocr_failures_total", "Falhas", ("stage",))
+
+
+# ---------------- lado do worker (processo) ----------------
+
+_W_PROJECT: Optional[BatchProject] = None
+_W_PARAMS: Dict[str, OCRParams] = {}
+_W_DOCS: "OrderedDict[str, fitz.Document]" = OrderedDict()
+_W_PAGES = ACCOUNTANT.pool("service_pages", priority=20)  # LRU limitado pelo orçamento do processo
+_W_MAX_DOCS = 4
+
+
+def _init_service_worker(project: BatchProject, memory_bytes: int = 0) -> None:
+    """Resolve todos os perfis e carrega os modelos uma vez por processo."""
+    global _W_PROJECT
+    _W_PROJECT = project
+    if memory_bytes > 0:
+        ACCOUNTANT.set_budget(memory_bytes)
+    _W_PARAMS.clear()
+    for name in project.ocr_profiles:
+        params = project.params_for(name)
+        _W_PARAMS[name] = params
+        configure_tesseract(params)
+        if use_digit_recognizer(params):
+            try:
+                load_model(params.digits_model)
+            except Exception:
+                pass  # erro aparece na primeira requisição, não derruba o worker
+
+
+def _worker_params(profile: str) -> OCRParams:
+    if profile not in _W_PARAMS:
+        _W_PARAMS[profile] = _W_PROJECT.params_for(profile)
+    return _W_PARAMS[profile]
+
+
+def _worker_page(path: str, page_index: int, zoom: float) -> np.ndarray:
+    key = (os.path.abspath(path), page_index, zoom)
+    page = _W_PAGES.get(key)
+    if page is not None:
+        return page
+
+    doc = _W_DOCS.get(key[0])
+    if doc is None:
+        doc = fitz.open(key[0])
+        _W_DOCS[key[0]] = doc
+        if len(_W_DOCS) > _W_MAX_DOCS:
+            _W_DOCS.popitem(last=False)[1].close()
+    else:
+        _W_DOCS.move_to_end(key[0])
+    if not 0 <= page_index < doc.page_count:
+        raise ValueError(f"page_index fora do documento: {page_index}")
+
+    page = render_pdf_page_bgr(doc, page_index, zoom)
+    _W_PAGES.put(key, page)
+    return page
+
+
+def _crop_for(item: Dict[str, Any]) -> Optional[np.ndarray]:
+    if "image" in item:
+        img = cv2.imdecode(np.frombuffer(item["image"], dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Imagem inválida ou formato não suportado.")
+        return img
+    zoom = float(item.get("zoom") or _W_PROJECT.render_zoom)
+    page = _worker_page(item["pdf"], int(item["page_index"]), zoom)
+    x0, y0, x1, y1 = item["rect"]
+    return crop_norm(page, StoredRectNorm(label="", x0n=x0, y0n=y0, x1n=x1, y1n=y1))
+
+
+def _serve_batch(profile: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """OCR de um micro-lote do mesmo perfil. Itens de PDF são ordenados por página."""
+    params = _worker_params(profile)
+    order = sorted(range(len(items)), key=lambda i: (
+        items[i].get("pdf", ""), items[i].get("page_index", -1),
+    ))
+    out: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    for i in order:
+        try:
+            crop = _crop_for(items[i])
+            text, conf = "", None
+            if crop is not None:
+                img_ocr, _ = apply_preprocess(crop, params)
+                text, conf, _ = run_ocr(img_ocr, params)
+            out[i] = {"text": text, "conf": None if conf is None else round(conf, 1)}
+        except Exception as e:
+            out[i] = {"error": f"{type(e).__name__}: {e}"}
+    return out
+
+
+# ---------------- micro-batching ----------------
+
+class _ProfileBatcher:
+    def __init__(self, service: "OCRService", profile: str):
+        self.service = service
+        self.profile = profile
+        self.queue: "asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future]]" = asyncio.Queue()
+        self._inflight: set = set()  # referência forte às tarefas de despacho
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.service.batch_window
+            while len(batch) < self.service.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # limita lotes em voo (= backpressure para a fila do perfil)
+            await self.service._slots.acquire()
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.service.pool, _serve_batch, self.profile, [item for item, _ in batch]
+            )
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_result({"error": f"{type(e).__name__}: {e}"})
+        finally:
+            self.service._slots.release()
+            self.service.batches += 1
+            self.service.batched_items += len(batch)
+            BATCH_SIZE.observe(len(batch), profile=self.profile)
+
+
+# ---------------- HTTP ----------------
+
+async def _readline(reader: asyncio.StreamReader) -> bytes:
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):  # linha maior que o limite do StreamReader
+        raise _HttpError(400, "Linha de requisição ou cabeçalho longa demais.")
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, Dict[str, List[str]], Dict[str, str], bytes]]:
+    line = await _readline(reader)
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise _HttpError(400, "Linha de requisição inválida.")
+
+    headers: Dict[str, str] = {}
+    while True:
+        h = await _readline(reader)
+        if h in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = h.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise _HttpError(400, "Content-Length inválido.")
+    if length < 0:
+        raise _HttpError(400, "Content-Length inválido.")
+    if length > MAX_BODY_BYTES:
+        raise _HttpError(413, "Corpo excede o limite.")
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    return method.upper(), url.path, parse_qs(url.query), headers, body
+
+
+class _HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, obj: Any, keep_alive: bool) -> None:
+    body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    writer.write(_head(status, {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+    }) + body)
+    await writer.drain()
+
+
+class OCRService:
+    def __init__(
+        self,
+        project: BatchProject,
+        *,
+        workers: int = 0,
+        batch_window_ms: float = 5.0,
+        max_batch: int = 16,
+        pdf_root: str = "",
+        worker_memory_mb: float = 0.0,
+    ):
+        self.project = project
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.pdf_root = os.path.abspath(pdf_root) if pdf_root else ""
+        self.worker_memory_bytes = int(worker_memory_mb * MB)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._batchers: Dict[str, _ProfileBatcher] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.batches = 0
+        self.batched_items = 0
+
+    # ---------------- jobs ----------------
+
+    def _resolve_profile(self, name: str) -> str:
+        name = name or self.project.active_profile_name
+        if name not in self.project.ocr_profiles:
+            raise _HttpError(404, f"Perfil não encontrado: {name!r}")
+        return name
+
+    def _check_pdf(self, path: str) -> str:
+        full = os.path.abspath(path)
+        if self.pdf_root and os.path.commonpath([full, self.pdf_root]) != self.pdf_root:
+            raise _HttpError(400, "Caminho fora de --pdf-root.")
+        if not os.path.isfile(full):
+            raise _HttpError(404, f"PDF não encontrado: {path}")
+        return full
+
+    def submit(self, profile: str, item: Dict[str, Any]) -> asyncio.Future:
+        batcher = self._batchers.get(profile)
+        if batcher is None:
+            batcher = self._batchers[profile] = _ProfileBatcher(self, profile)
+        fut = asyncio.get_running_loop().create_future()
+        batcher.queue.put_nowait((item, fut))
+        return fut
+
+    # ---------------- rotas ----------------
+
+    async def _handle_image(self, writer, query, body: bytes, keep_alive: bool) -> None:
+        if not body:
+            raise _HttpError(400, "Corpo vazio: envie os bytes da imagem.")
+        profile = self._resolve_profile((query.get("profile") or [""])[0])
+        t0 = time.perf_counter()
+        res = await self.submit(profile, {"image": body})
+        elapsed = time.perf_counter() - t0
+        REQUEST_SECONDS.observe(elapsed, route="image")
+        if "error" in res:
+            SERVICE_ERRORS.inc(stage="service")
+        res.update(profile=profile, ms=round(elapsed * 1000, 1))
+        await _send_json(writer, 500 if "error" in res else 200, res, keep_alive)
+
+    async def _handle_job(self, writer, body: bytes, keep_alive: bool) -> None:
+        try:
+            job = json.loads(body.decode("utf-8"))
+            rects = job.get("rects") or ([job["rect"]] if "rect" in job else [])
+            rects = [[float(v) for v in r] for r in rects]
+            if not rects or any(len(r) != 4 for r in rects):
+                raise ValueError
+            page_index = int(job.get("page_index", 0))
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+            raise _HttpError(400, "JSON inválido: esperado {profile, pdf, page_index, rects}.")
+        profile = self._resolve_profile(str(job.get("profile") or ""))
+        pdf = self._check_pdf(str(job.get("pdf") or ""))
+
+        t0 = time.perf_counter()
+        futures = [
+            self.submit(profile, {"pdf": pdf, "page_index": page_index, "rect": r, "zoom": job.get("zoom")})
+            for r in rects
+        ]
+
+        async def tagged(i: int, fut: asyncio.Future) -> Tuple[int, Dict[str, Any]]:
+            return i, await fut
+
+        # NDJSON em chunked: cada resultado sai assim que fica pronto
+        writer.write(_head(200, {
+            "Content-Type": "application/x-ndjson; charset=utf-8",
+            "Transfer-Encoding": "chunked",
+            "Connection": "keep-alive" if keep_alive else "close",
+        }))
+        for next_done in asyncio.as_completed([tagged(i, f) for i, f in enumerate(futures)]):
+            i, res = await next_done
+            res.update(index=i, profile=profile, ms=round((time.perf_counter() - t0) * 1000, 1))
+            chunk = (json.dumps(res, ensure_ascii=False) + "\n").encode("utf-8")
+            writer.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        REQUEST_SECONDS.observe(time.perf_counter() - t0, route="job")
+
+    async def _route(self, writer, method: str, path: str, query, headers, body, keep_alive) -> None:
+        if path == "/health":
+            if method != "GET":
+                raise _HttpError(405, "Use GET.")
+            await _send_json(writer, 200, {
+                "status": "ok",
+                "profiles": sorted(self.project.ocr_profiles),
+                "active_profile": self.project.active_profile_name,
+                "workers": self.workers,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            }, keep_alive)
+            return
+        if path == "/metrics":
+            body = REGISTRY.to_prometheus().encode("utf-8")
+            writer.write(_head(200, {
+                "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+                "Content-Length": str(len(body)),
+                "Connection": "keep-alive" if keep_alive else "close",
+            }) + body)
+            await writer.drain()
+            return
+        if path == "/ocr":
+            if method != "POST":
+                raise _HttpError(405, "Use POST.")
+            self.requests += 1
+            if headers.get("content-type", "").startswith("application/json"):
+                await self._handle_job(writer, body, keep_alive)
+            else:
+                await self._handle_image(writer, query, body, keep_alive)
+            return
+        raise _HttpError(404, f"Rota desconhecida: {path}")
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    req = await _read_request(reader)
+                    if req is None:
+                        break
+                    method, path, query, headers, body = req
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    await self._route(writer, method, path, query, headers, body, keep_alive)
+                except _HttpError as e:
+                    await _send_json(writer, e.status, {"error": str(e)}, False)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    SERVICE_ERRORS.inc(stage="service")
+                    await _send_json(writer, 500, {"error": f"Erro interno: {e}"}, False)
+                    break
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ---------------- ciclo ----------------
+
+    async def serve(self, *, host: str = "127.0.0.1", port: int = 8765, unix_path: str = "") -> None:
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_service_worker,
+            initargs=(self.project, self.worker_memory_bytes),
+        ) as pool:
+            self.pool = pool
+            if unix_path:
+                if os.path.exists(unix_path):
+                    os.remove(unix_path)
+                server = await asyncio.start_unix_server(self._handle_conn, path=unix_path)
+                where = unix_path
+            else:
+                server = await asyncio.start_server(self._handle_conn, host=host, port=port)
+                where = f"http://{host}:{port}"
+            print(f"Serviço OCR em {where} ({self.workers} workers, janela {self.batch_window * 1000:.0f} ms)")
+            async with server:
+                await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.service", description="Serviço OCR local com os perfis de um projeto.")
+    ap.add_argument("project", help="Projeto JSON (perfis OCR)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix", default="", help="Escuta num socket Unix em vez de TCP")
+    ap.add_argument("--workers", type=int, default=0, help="Processos OCR (padrão: nº de CPUs)")
+    ap.add_argument("--batch-window-ms", type=float, default=5.0, help="Janela de agrupamento por perfil")
+    ap.add_argument("--max-batch", type=int, default=16, help="Máximo de itens por lote")
+    ap.add_argument("--pdf-root", default="", help="Só aceita PDFs dentro desta pasta")
+    ap.add_argument("--worker-memory-mb", type=float, default=0.0,
+                    help="Orçamento de memória do cache de páginas de cada worker (padrão: OCR_MEMORY_BUDGET_MB)")
+    args = ap.parse_args(argv)
+
+    service = OCRService(
+        load_batch_project(args.project),
+        workers=args.workers,
+        batch_window_ms=args.batch_window_ms,
+        max_batch=args.max_batch,
+        pdf_root=args.pdf_root,
+        worker_memory_mb=args.worker_memory_mb,
+    )
+    try:
+        asyncio.run(service.serve(host=args.host, port=args.port, unix_path=args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+"""
+Índice espacial por página (grade uniforme sobre coordenadas normalizadas).
+
+Responde "quais retângulos contêm este ponto / cruzam esta caixa / estão
+mais perto daqui" olhando só as células tocadas, em vez de varrer a página.
+A grade tem ~sqrt(N) células por eixo e é montada de forma vetorizada
+(arrays CSR: ids ordenados por célula + início de cada célula).
+AnnotationStore.spatial_index(página) guarda o índice e o descarta quando
+a página muda.
+
+Relatório de sobreposições/duplicatas de um projeto:
+    python -m app.spatial_index projeto.json [--min-iou 0.0] [--dup-iou 0.9]
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import math
+import sys
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAX_CELLS_PER_AXIS = 256
+DUPLICATE_IOU = 0.9
+
+
+@dataclass
+class Overlap:
+    page: int
+    i: int
+    j: int
+    iou: float
+    duplicate: bool
+
+
+class GridIndex:
+    def __init__(self, boxes: np.ndarray, cells: int = 0):
+        """boxes: (N, 4) x0, y0, x1, y1 normalizados (0–1)."""
+        b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.boxes = np.column_stack([
+            np.minimum(b[:, 0], b[:, 2]), np.minimum(b[:, 1], b[:, 3]),
+            np.maximum(b[:, 0], b[:, 2]), np.maximum(b[:, 1], b[:, 3]),
+        ]) if len(b) else np.zeros((0, 4))
+        n = len(self.boxes)
+        self.g = cells or max(1, min(MAX_CELLS_PER_AXIS, int(math.ceil(math.sqrt(n)))))
+
+        g = self.g
+        if n == 0:
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._start = np.zeros(g * g + 1, dtype=np.int64)
+            return
+
+        cx0, cy0 = self._cell(self.boxes[:, 0]), self._cell(self.boxes[:, 1])
+        cx1, cy1 = self._cell(self.boxes[:, 2]), self._cell(self.boxes[:, 3])
+        w = cx1 - cx0 + 1
+        spans = w * (cy1 - cy0 + 1)
+        ids = np.repeat(np.arange(n), spans)
+        k = np.arange(int(spans.sum())) - np.repeat(np.cumsum(spans) - spans, spans)
+        wr = np.repeat(w, spans)
+        cell = (np.repeat(cy0, spans) + k // wr) * g + np.repeat(cx0, spans) + k % wr
+
+        order = np.argsort(cell, kind="stable")
+        self._ids = ids[order]
+        self._start = np.searchsorted(cell[order], np.arange(g * g + 1))
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _cell(self, v) -> np.ndarray:
+        return np.clip((np.asarray(v) * self.g).astype(np.int64), 0, self.g - 1)
+
+    def _candidates(self, cx0: int, cy0: int, cx1: int, cy1: int) -> np.ndarray:
+        g, start, ids = self.g, self._start, self._ids
+        parts = [ids[start[cy * g + cx0]:start[cy * g + cx1 + 1]] for cy in range(cy0, cy1 + 1)]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    # ---------------- consultas ----------------
+
+    def query_point(self, x: float, y: float) -> np.ndarray:
+        """Índices dos retângulos que contêm (x, y)."""
+        cx, cy = int(self._cell(x)), int(self._cell(y))
+        c = self._ids[self._start[cy * self.g + cx]:self._start[cy * self.g + cx + 1]]
+        b = self.boxes[c]
+        hit = (b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3])
+        return np.sort(c[hit])
+
+    def query_box(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """Índices dos retângulos que cruzam a caixa."""
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        c = self._candidates(int(self._cell(x0)), int(self._cell(y0)), int(self._cell(x1)), int(self._cell(y1)))
+        b = self.boxes[c]
+        hit = (b[:, 0] <= x1) & (x0 <= b[:, 2]) & (b[:, 1] <= y1) & (y0 <= b[:, 3])
+        return c[hit]
+
+    def nearest(self, x: float, y: float, k: int = 1) -> List[Tuple[int, float]]:
+        """k retângulos mais próximos do ponto: [(índice, distância)], distância 0 = contém o ponto."""
+        n = len(self.boxes)
+        if n == 0 or k <= 0:
+            return []
+        k = min(k, n)
+        g = self.g
+        cx, cy = int(self._cell(x)), int(self._cell(y))
+        seen = np.zeros(n, dtype=bool)
+        best: List[Tuple[float, int]] = []  # heap de máximo (distância negativa)
+        ring = 0
+        while True:
+            lo_x, hi_x = max(0, cx - ring), min(g - 1, cx + ring)
+            lo_y, hi_y = max(0, cy - ring), min(g - 1, cy + ring)
+            c = self._candidates(lo_x, lo_y, hi_x, hi_y)
+            c = c[~seen[c]]
+            if len(c):
+                seen[c] = True
+                b = self.boxes[c]
+                dx = np.maximum(np.maximum(b[:, 0] - x, 0.0), x - b[:, 2])
+                dy = np.maximum(np.maximum(b[:, 1] - y, 0.0), y - b[:, 3])
+                for d, i in zip(np.hypot(dx, dy).tolist(), c.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, i))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, i))
+            covered = lo_x == 0 and lo_y == 0 and hi_x == g - 1 and hi_y == g - 1
+            # tudo fora do anel atual está a pelo menos ring/g do ponto
+            if covered or (len(best) == k and -best[0][0] <= ring / g):
+                break
+            ring += 1
+        return sorted(((i, -nd) for nd, i in best), key=lambda t: t[1])
+
+    def overlaps(self, min_iou: float = 0.0) -> Iterator[Tuple[int, int, float]]:
+        """Pares (i, j, IoU) com i < j que se sobrepõem (área de interseção > 0 e IoU >= min_iou)."""
+        start, ids, b = self._start, self._ids, self.boxes
+        area = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+        done = set()
+        for cell in np.flatnonzero(np.diff(start) > 1).tolist():
+            c = ids[start[cell]:start[cell + 1]]
+            ii, jj = np.triu_indices(len(c), k=1)
+            i, j = np.minimum(c[ii], c[jj]), np.maximum(c[ii], c[jj])
+            iw = np.minimum(b[i, 2], b[j, 2]) - np.maximum(b[i, 0], b[j, 0])
+            ih = np.minimum(b[i, 3], b[j, 3]) - np.maximum(b[i, 1], b[j, 1])
+            inter = np.where((iw > 0) & (ih > 0), iw * ih, 0.0)
+            union = area[i] + area[j] - inter
+            iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+            keep = (inter > 0) & (iou >= min_iou)
+            for a, bb, v in zip(i[keep].tolist(), j[keep].tolist(), iou[keep].tolist()):
+                if (a, bb) not in done:  # par presente em várias células
+                    done.add((a, bb))
+                    yield a, bb, v
+
+
+def overlap_report(
+    store,
+    pages: Optional[Sequence[int]] = None,
+    min_iou: float = 0.0,
+    dup_iou: float = DUPLICATE_IOU,
+) -> List[Overlap]:
+    """Sobreposições de todas as páginas (ou das indicadas) do AnnotationStore."""
+    out: List[Overlap] = []
+    for page in sorted(store) if pages is None else pages:
+        for i, j, iou in store.spatial_index(page).overlaps(min_iou):
+            out.append(Overlap(page, i, j, iou, iou >= dup_iou))
+    return out
+
+
+def format_report(store, overlaps: List[Overlap], max_lines: int = 0) -> str:
+    """Resumo + uma linha por par (max_lines > 0 corta a listagem)."""
+    dups = sum(1 for o in overlaps if o.duplicate)
+    lines = [f"{len(overlaps)} sobreposições ({dups} prováveis duplicatas)"]
+    labels_cache = {}
+    shown = overlaps[:max_lines] if max_lines else overlaps
+    for o in shown:
+        labels = labels_cache.get(o.page)
+        if labels is None:
+            labels = labels_cache[o.page] = store.labels(o.page)
+        tag = "DUPLICATA" if o.duplicate else "sobrepõe"
+        lines.append(f"pág. {o.page + 1}: {labels[o.i]!r} #{o.i} {tag} {labels[o.j]!r} #{o.j} (IoU {o.iou:.2f})")
+    if len(overlaps) > len(shown):
+        lines.append(f"... (+{len(overlaps) - len(shown)} pares)")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.spatial_index")
+    ap.add_argument("project", help="Projeto .json")
+    ap.add_argument("--min-iou", type=float, default=0.0, help="Ignora sobreposições com IoU menor")
+    ap.add_argument("--dup-iou", type=float, default=DUPLICATE_IOU, help="IoU a partir do qual é duplicata")
+    args = ap.parse_args(argv)
+
+    from .project_io import load_project_json
+
+    store = load_project_json(args.project, lazy_annotations=True)["annotations_parsed"]
+    overlaps = overlap_report(store, min_iou=args.min_iou, dup_iou=args.dup_iou)
+    print(format_report(store, overlaps))
+    return 1 if any(o.duplicate for o in overlaps) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
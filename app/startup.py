@@ -0,0 +1,171 @@
+"""
+Tempo de partida da GUI e dos CLIs.
+
+- preload_heavy_modules: importa numpy/OpenCV/PyMuPDF/Tesseract numa thread
+  de fundo depois que a janela aparece, para o primeiro PDF/OCR não pagar
+  o import.
+- importtime: relatório no estilo "python -X importtime" (módulos mais caros,
+  tempo próprio e acumulado).
+- check: mede o tempo até a primeira janela (e o import do CLI de lote) em
+  processos novos e falha (código 1) se passar do limite — serve de teste de
+  regressão da partida.
+
+Uso:
+    python -m app.startup importtime [--module app.main] [--top 25]
+    python -m app.startup check [--runs 3] [--max-window-ms 1500] [--max-cli-ms 1500]
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+HEAVY_MODULES = (
+    "numpy",
+    "cv2",
+    "fitz",
+    "app.pdf_render",
+    "app.raster_cache",
+    "ocr.preprocess",
+    "ocr.tesseract_engine",
+    "ocr.cascade",
+)
+
+PROBE_ENV = "OCR_STARTUP_PROBE"
+PROBE_LINE = "janela-pronta"
+
+
+def preload_heavy_modules(modules: Sequence[str] = HEAVY_MODULES) -> Optional[threading.Thread]:
+    """Aquece os imports pesados em segundo plano (OCR_PRELOAD=0 desativa)."""
+    if os.environ.get("OCR_PRELOAD", "1") == "0":
+        return None
+
+    def run() -> None:
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                pass  # o erro real aparece (com mensagem) no primeiro uso
+
+    t = threading.Thread(target=run, name="preload", daemon=True)
+    t.start()
+    return t
+
+
+# ---------------- relatório de import ----------------
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, str]]:
+    """Linhas "import time: self | cumulative | módulo" -> [(self_us, cumulative_us, módulo)]."""
+    out: List[Tuple[int, int, str]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # cabeçalho
+        out.append((self_us, cum_us, parts[2].rstrip()))
+    return out
+
+
+def importtime_report(module: str = "app.main", top: int = 25) -> str:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=_repo_root(),
+    )
+    rows = parse_importtime(proc.stderr)
+    if proc.returncode != 0 and not rows:
+        return f"falha ao importar {module}:\n{proc.stderr.strip()}"
+
+    total_us = sum(self_us for self_us, _, _ in rows)
+    lines = [f"import {module}: {total_us / 1000:.1f} ms em {len(rows)} módulos", ""]
+    lines.append(f"{'acumulado':>11} {'próprio':>9}  módulo")
+    for self_us, cum_us, name in sorted(rows, key=lambda r: -r[1])[:top]:
+        lines.append(f"{cum_us / 1000:9.1f}ms {self_us / 1000:7.1f}ms  {name}")
+
+    lines.append("")
+    lines.append("maiores tempos próprios:")
+    for self_us, _, name in sorted(rows, key=lambda r: -r[0])[:top // 2 or 1]:
+        lines.append(f"{self_us / 1000:9.1f}ms  {name.strip()}")
+    return "\n".join(lines)
+
+
+# ---------------- tempo até a primeira janela ----------------
+
+def _repo_root() -> str:
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_first_window(timeout: float = 60.0) -> float:
+    """Segundos de um processo novo até a janela estar visível (app.main com OCR_STARTUP_PROBE)."""
+    env = dict(os.environ)
+    env[PROBE_ENV] = "1"
+    env.setdefault("OCR_PRELOAD", "0")  # mede só a partida
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.main"], stdout=subprocess.PIPE, text=True, env=env, cwd=_repo_root(),
+    )
+    try:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            if line.strip() == PROBE_LINE:
+                return time.perf_counter() - t0
+        raise RuntimeError(f"app.main terminou (código {proc.wait()}) sem abrir a janela")
+    finally:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def time_import(module: str) -> float:
+    """Segundos de um processo novo para importar o módulo (partida dos CLIs)."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, cwd=_repo_root())
+    return time.perf_counter() - t0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.startup")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_imp = sub.add_parser("importtime", help="Relatório de tempo de import (-X importtime)")
+    p_imp.add_argument("--module", default="app.main")
+    p_imp.add_argument("--top", type=int, default=25)
+
+    p_chk = sub.add_parser("check", help="Falha se a partida passar do limite")
+    p_chk.add_argument("--runs", type=int, default=3)
+    p_chk.add_argument("--max-window-ms", type=float, default=1500.0)
+    p_chk.add_argument("--max-cli-ms", type=float, default=1500.0)
+    p_chk.add_argument("--cli-module", default="app.batch")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "importtime":
+        print(importtime_report(args.module, args.top))
+        return 0
+
+    runs = max(1, args.runs)
+    window = statistics.median(time_first_window() for _ in range(runs)) * 1000
+    cli = statistics.median(time_import(args.cli_module) for _ in range(runs)) * 1000
+    ok = window <= args.max_window_ms and cli <= args.max_cli_ms
+    print(f"primeira janela: {window:.0f} ms (limite {args.max_window_ms:.0f})")
+    print(f"import {args.cli_module}: {cli:.0f} ms (limite {args.max_cli_ms:.0f})")
+    print("OK" if ok else "ACIMA DO LIMITE")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
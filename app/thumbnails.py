@@ -0,0 +1,301 @@
+"""
+Painel de miniaturas das páginas (virtualizado).
+
+O QListView só pede dados das linhas visíveis; cada pedido entra numa fila
+servida por uma thread de fundo, que renderiza a página em baixa resolução
+com um fitz.Document próprio (o da janela continua exclusivo da GUI thread)
+ou, em TIFF multipágina, decodifica o quadro já reduzido.
+As miniaturas ficam no cache de memória (orçamento global) e em disco, em
+PNG, chaveadas por (caminho, tamanho, mtime) do documento.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Optional
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, QSize, Qt, QTimer, Signal
+from PySide6.QtGui import QBrush, QColor, QFont, QImage
+from PySide6.QtWidgets import QAbstractItemView, QDockWidget, QListView
+
+from .image_source import ImageDocument
+from .memory import ACCOUNTANT
+
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF (importado só na thread de miniaturas)
+
+THUMB_WIDTH = 120
+PREFETCH_ROWS = 6
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "marcador", "miniaturas")
+
+
+def document_key(path: str) -> str:
+    """Chave barata do documento: caminho absoluto + tamanho + mtime."""
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def render_pdf_thumbnail(doc: fitz.Document, page_index: int, width: int) -> QImage:
+    import fitz
+
+    page = doc.load_page(page_index)
+    scale = width / max(1.0, page.rect.width)
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    img = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+    return img.copy()  # desacopla do buffer do pixmap
+
+
+def render_image_thumbnail(doc: ImageDocument, frame: int, width: int) -> QImage:
+    # decodificação reduzida quando o codec permite; nunca o quadro inteiro em 600 DPI
+    img = doc.read_frame(frame, max_side=width * 2)
+    return img.scaledToWidth(width, Qt.SmoothTransformation).convertToFormat(QImage.Format_RGB888)
+
+
+class _ThumbnailWorker(QObject):
+    """Thread de fundo: atende primeiro os pedidos mais recentes (linhas visíveis)."""
+    ready = Signal(str, int, QImage)  # doc_key, page_index, imagem
+
+    def __init__(self, cache_dir: str, width: int = THUMB_WIDTH):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.width = width
+        self._cond = threading.Condition()
+        self._pending: Deque[int] = deque()
+        self._path = ""
+        self._doc_key = ""
+        self._is_pdf = True
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+        self._thread.start()
+
+    def set_document(self, path: str, doc_key: str, is_pdf: bool = True) -> None:
+        with self._cond:
+            self._path = path
+            self._doc_key = doc_key
+            self._is_pdf = is_pdf
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def request(self, rows) -> None:
+        """Substitui a fila: os pedidos anteriores (fora da tela) perdem a vez."""
+        with self._cond:
+            self._pending = deque(dict.fromkeys(rows))
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+
+    def _disk_path(self, doc_key: str, page_index: int) -> str:
+        return os.path.join(self.cache_dir, doc_key, f"{page_index}_{self.width}.png")
+
+    def _run(self) -> None:
+        import fitz
+
+        doc: Optional[fitz.Document] = None
+        image_doc: Optional[ImageDocument] = None
+        doc_path = ""
+        while True:
+            with self._cond:
+                while not self._stop and not self._pending:
+                    self._cond.wait()
+                if self._stop:
+                    break
+                page_index = self._pending.popleft()
+                path, doc_key, is_pdf = self._path, self._doc_key, self._is_pdf
+
+            try:
+                disk = self._disk_path(doc_key, page_index)
+                img = QImage(disk) if os.path.exists(disk) else QImage()
+                if img.isNull():
+                    if doc_path != path:
+                        if doc is not None:
+                            doc.close()
+                        doc = image_doc = None
+                        doc_path = path
+                    if is_pdf:
+                        if doc is None:
+                            doc = fitz.open(path)
+                        if not 0 <= page_index < doc.page_count:
+                            continue
+                        img = render_pdf_thumbnail(doc, page_index, self.width)
+                    else:
+                        if image_doc is None:
+                            image_doc = ImageDocument(path)
+                        if not 0 <= page_index < image_doc.page_count:
+                            continue
+                        img = render_image_thumbnail(image_doc, page_index, self.width)
+                    os.makedirs(os.path.dirname(disk), exist_ok=True)
+                    tmp = f"{disk}.{os.getpid()}.tmp.png"
+                    if img.save(tmp, "PNG"):
+                        os.replace(tmp, disk)
+                self.ready.emit(doc_key, page_index, img)
+            except Exception:
+                continue  # miniatura fica no placeholder; a página abre normalmente
+        if doc is not None:
+            doc.close()
+
+
+class ThumbnailModel(QAbstractListModel):
+    def __init__(self, is_annotated: Callable[[int], bool], parent=None):
+        super().__init__(parent)
+        self._is_annotated = is_annotated
+        self._count = 0
+        self._doc_key = ""
+        self._marks: Dict[int, bool] = {}
+        self._mem = ACCOUNTANT.pool("miniaturas", priority=40)
+        self.on_missing: Callable[[int], None] = lambda row: None
+
+    def set_document(self, doc_key: str, page_count: int) -> None:
+        self.beginResetModel()
+        self._doc_key = doc_key
+        self._count = page_count
+        self._marks.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        annotated = self._marks.get(row)
+        if annotated is None:
+            annotated = self._marks[row] = bool(self._is_annotated(row))
+
+        if role == Qt.DisplayRole:
+            return f"● {row + 1}" if annotated else str(row + 1)
+        if role == Qt.DecorationRole:
+            img = self._mem.get((self._doc_key, row))
+            if img is None:
+                self.on_missing(row)
+            return img
+        if role == Qt.FontRole and annotated:
+            f = QFont()
+            f.setBold(True)
+            return f
+        if role == Qt.ForegroundRole and annotated:
+            return QBrush(QColor(0, 120, 215))
+        if role == Qt.ToolTipRole:
+            return f"Página {row + 1}" + (" (com retângulos)" if annotated else "")
+        return None
+
+    def has_thumbnail(self, row: int) -> bool:
+        return (self._doc_key, row) in self._mem
+
+    def set_thumbnail(self, doc_key: str, row: int, img: QImage) -> None:
+        if doc_key != self._doc_key or not 0 <= row < self._count:
+            return
+        self._mem.put((doc_key, row), img)
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+    def mark_page(self, row: int) -> None:
+        """Reavalia a marca de anotação da página (só notifica se mudou)."""
+        if not 0 <= row < self._count:
+            return
+        now = bool(self._is_annotated(row))
+        if self._marks.get(row) != now:
+            self._marks[row] = now
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx)
+
+    def refresh_marks(self) -> None:
+        self._marks.clear()
+        if self._count:
+            self.dataChanged.emit(self.index(0), self.index(self._count - 1))
+
+
+class ThumbnailDock(QDockWidget):
+    def __init__(
+        self,
+        parent=None,
+        *,
+        is_annotated: Callable[[int], bool],
+        on_page_clicked: Callable[[int], None],
+        cache_dir: str = "",
+        width: int = THUMB_WIDTH,
+    ):
+        super().__init__("Páginas", parent)
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+
+        self.model = ThumbnailModel(is_annotated, self)
+        self.view = QListView(self)
+        self.view.setModel(self.model)
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setFlow(QListView.TopToBottom)
+        self.view.setWrapping(False)
+        self.view.setMovement(QListView.Static)
+        self.view.setUniformItemSizes(True)  # sem medir todas as linhas
+        self.view.setIconSize(QSize(width, int(width * 1.42)))
+        self.view.setGridSize(QSize(width + 16, int(width * 1.42) + 28))
+        self.view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.view.clicked.connect(lambda idx: on_page_clicked(idx.row()))
+        self.setWidget(self.view)
+
+        self._worker = _ThumbnailWorker(cache_dir or default_cache_dir(), width)
+        self._worker.ready.connect(self.model.set_thumbnail)
+
+        # pedidos agrupados: várias linhas pintadas no mesmo ciclo viram um só pedido
+        self._flush = QTimer(self)
+        self._flush.setSingleShot(True)
+        self._flush.setInterval(30)
+        self._flush.timeout.connect(self._request_visible)
+        self.model.on_missing = self._on_missing
+        self.view.verticalScrollBar().valueChanged.connect(lambda _v: self._flush.start())
+
+    def set_document(self, path: str, page_count: int, is_pdf: bool = True) -> None:
+        """PDF ou imagem multipágina aberta na janela; page_count = 0 limpa o painel."""
+        doc_key = document_key(path) if path and page_count > 0 else ""
+        self._worker.set_document(path, doc_key, is_pdf)
+        self.model.set_document(doc_key, page_count)
+
+    def set_current_page(self, page_index: int) -> None:
+        if 0 <= page_index < self.model.rowCount():
+            idx = self.model.index(page_index)
+            self.view.setCurrentIndex(idx)
+            self.view.scrollTo(idx, QAbstractItemView.EnsureVisible)
+
+    def mark_page(self, page_index: int) -> None:
+        self.model.mark_page(page_index)
+
+    def refresh_marks(self) -> None:
+        self.model.refresh_marks()
+
+    def _on_missing(self, row: int) -> None:
+        if not self._flush.isActive():
+            self._flush.start()
+
+    def _visible_rows(self) -> range:
+        n = self.model.rowCount()
+        if n == 0:
+            return range(0)
+        vp = self.view.viewport().rect()
+        first = self.view.indexAt(vp.topLeft())
+        last = self.view.indexAt(vp.bottomLeft())
+        lo = first.row() if first.isValid() else 0
+        hi = last.row() if last.isValid() else min(n - 1, lo + PREFETCH_ROWS)
+        return range(lo, hi + 1)
+
+    def _request_visible(self) -> None:
+        n = self.model.rowCount()
+        visible = self._visible_rows()
+        if not visible:
+            return
+        # visíveis primeiro, depois as que estão para entrar na tela (abaixo e acima)
+        ahead = range(visible.stop, min(n, visible.stop + PREFETCH_ROWS))
+        behind = range(max(0, visible.start - PREFETCH_ROWS), visible.start)
+        self._worker.request([r for r in (*visible, *ahead, *reversed(behind)) if not self.model.has_thumbnail(r)])
+
+    def shutdown(self) -> None:
+        self._worker.stop()
@@ -0,0 +1,249 @@
+"""
+Daemon de pasta monitorada: aplica um projeto (retângulos + perfis OCR) a
+cada PDF/imagem que chega na pasta e grava o CSV de resultado.
+
+- detecção por eventos do sistema (watchdog, se instalado) ou polling
+- debounce: só processa arquivos com tamanho/mtime estáveis (e PDF completo)
+- concorrência limitada; escrita atômica do resultado
+- falhas vão para uma pasta de dead-letter junto com o erro
+
+Uso:
+    python -m app.watch projeto.json entrada/ [--output-dir saida/] [--workers 2]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+
+from .batch import FAILURES, BatchProject, is_pdf_path, load_batch_project, run_batch
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # polling puro
+    Observer = None
+    FileSystemEventHandler = object
+
+
+SUPPORTED_EXTS = {".pdf", ".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+def _pdf_complete(path: str) -> bool:
+    """PDF termina com %%EOF (nos últimos bytes) quando acabou de ser escrito."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 2048))
+            return b"%%EOF" in f.read()
+    except OSError:
+        return False
+
+
+class _WakeHandler(FileSystemEventHandler):
+    def __init__(self, wake: threading.Event):
+        super().__init__()
+        self._wake = wake
+
+    def on_any_event(self, event):
+        self._wake.set()
+
+
+class FolderWatcher:
+    def __init__(
+        self,
+        project: BatchProject,
+        watch_dir: str,
+        *,
+        output_dir: str = "",
+        dead_letter_dir: str = "",
+        workers: int = 2,
+        settle_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        register: bool = False,
+    ):
+        self.project = project
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = os.path.abspath(output_dir) if output_dir else ""
+        self.dead_letter_dir = os.path.abspath(dead_letter_dir or os.path.join(self.watch_dir, "_falhas"))
+        self.settle_seconds = float(settle_seconds)
+        self.poll_interval = float(poll_interval)
+        self.register = register
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="watch")
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._seen: Dict[str, Tuple[int, float, float]] = {}  # path -> (size, mtime, desde)
+        self._inflight: Set[str] = set()
+        self._lock = threading.Lock()
+
+    # ---------------- caminhos ----------------
+
+    def result_path(self, src: str) -> str:
+        stem = os.path.splitext(os.path.basename(src))[0]
+        folder = self.output_dir or os.path.dirname(src)
+        return os.path.join(folder, f"{stem}_ocr.csv")
+
+    def _is_candidate(self, path: str) -> bool:
+        name = os.path.basename(path)
+        if name.startswith(".") or name.startswith("~"):
+            return False
+        return os.path.splitext(name)[1].lower() in SUPPORTED_EXTS
+
+    def _already_done(self, src: str, mtime: float) -> bool:
+        out = self.result_path(src)
+        try:
+            return os.path.getmtime(out) >= mtime
+        except OSError:
+            return False
+
+    # ---------------- varredura / debounce ----------------
+
+    def _scan(self) -> None:
+        now = time.monotonic()
+        present: Set[str] = set()
+        try:
+            entries = list(os.scandir(self.watch_dir))
+        except OSError:
+            return
+
+        for entry in entries:
+            if not entry.is_file() or not self._is_candidate(entry.path):
+                continue
+            path = entry.path
+            present.add(path)
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            with self._lock:
+                if path in self._inflight:
+                    continue
+            if self._already_done(path, st.st_mtime):
+                continue
+
+            prev = self._seen.get(path)
+            if prev is None or prev[0] != st.st_size or prev[1] != st.st_mtime:
+                self._seen[path] = (st.st_size, st.st_mtime, now)
+                continue
+            if now - prev[2] < self.settle_seconds:
+                continue
+            if is_pdf_path(path) and not _pdf_complete(path):
+                continue
+
+            # concorrência limitada: sem vaga, tenta na próxima varredura
+            if not self._slots.acquire(blocking=False):
+                break
+            with self._lock:
+                self._inflight.add(path)
+            del self._seen[path]
+            fut = self._pool.submit(self._process, path)
+            fut.add_done_callback(self._on_done(path))
+
+        for gone in set(self._seen) - present:
+            del self._seen[gone]
+
+    def _on_done(self, path: str):
+        def done(_fut: Future) -> None:
+            with self._lock:
+                self._inflight.discard(path)
+            self._slots.release()
+            self._wake.set()
+        return done
+
+    # ---------------- processamento ----------------
+
+    def _process(self, src: str) -> None:
+        out = self.result_path(src)
+        tmp = f"{out}.{os.getpid()}.{threading.get_ident()}.tmp"
+        t0 = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            n = run_batch(self.project, [src], tmp, register=self.register)
+            os.replace(tmp, out)
+            print(f"[ok] {os.path.basename(src)}: {n} regiões em {time.perf_counter() - t0:.1f}s -> {out}")
+        except Exception:
+            err = traceback.format_exc()
+            FAILURES.inc(stage="watch")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            self._dead_letter(src, err)
+            print(f"[falha] {os.path.basename(src)} -> {self.dead_letter_dir}")
+
+    def _dead_letter(self, src: str, error: str) -> None:
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        dst = os.path.join(self.dead_letter_dir, os.path.basename(src))
+        try:
+            shutil.move(src, dst)
+        except OSError:
+            dst = src
+        with open(dst + ".error.txt", "w", encoding="utf-8") as f:
+            f.write(error)
+
+    # ---------------- ciclo ----------------
+
+    def run(self) -> None:
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_WakeHandler(self._wake), self.watch_dir, recursive=False)
+            observer.start()
+        mode = "eventos (watchdog)" if observer is not None else "polling"
+        print(f"Monitorando {self.watch_dir} [{mode}]")
+
+        try:
+            while not self._stop.is_set():
+                self._scan()
+                # arquivos ainda estabilizando: reavalia no fim da janela de debounce
+                timeout = min(self.poll_interval, self.settle_seconds) if self._seen else self.poll_interval
+                self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self._pool.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+
+def main(argv: Optional[list] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.watch", description="OCR automático de uma pasta monitorada.")
+    ap.add_argument("project", help="Projeto JSON (retângulos + perfis OCR)")
+    ap.add_argument("watch_dir", help="Pasta onde os documentos chegam")
+    ap.add_argument("--output-dir", default="", help="Pasta dos CSVs (padrão: ao lado do documento)")
+    ap.add_argument("--dead-letter-dir", default="", help="Pasta para falhas (padrão: <pasta>/_falhas)")
+    ap.add_argument("--workers", type=int, default=2, help="Documentos processados ao mesmo tempo")
+    ap.add_argument("--settle", type=float, default=2.0, help="Segundos sem mudança antes de processar")
+    ap.add_argument("--poll", type=float, default=1.0, help="Intervalo de varredura (s)")
+    ap.add_argument("--register", action="store_true", help="Alinha cada página ao template do projeto")
+    args = ap.parse_args(argv)
+
+    watcher = FolderWatcher(
+        load_batch_project(args.project),
+        args.watch_dir,
+        output_dir=args.output_dir,
+        dead_letter_dir=args.dead_letter_dir,
+        workers=args.workers,
+        settle_seconds=args.settle,
+        poll_interval=args.poll,
+        register=args.register,
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
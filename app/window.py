@@ -1,11 +1,10 @@
 from __future__ import annotations
 from ocr.dock import OCRDock
-import numpy as np
-import cv2
 from PySide6.QtGui import QImage
 import os
-import fitz  # PyMuPDF
-from PySide6.QtCore import Qt, QRectF, QPointF
+import time
+from typing import TYPE_CHECKING
+from PySide6.QtCore import Qt, QEventLoop, QRect, QRectF, QPointF
 from PySide6.QtGui import QPixmap, QAction, QKeySequence, QShortcut, QTransform
 from PySide6.QtWidgets import (
     QMainWindow,
@@ -19,20 +18,36 @@ from PySide6.QtWidgets import (
     QHBoxLayout,
     QPushButton,
     QLabel,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QAbstractItemView,
     QInputDialog,
     QSlider,
     QSizePolicy,
+    QProgressDialog,
 )
 
 from .view import AnnotView
 from .items import AnnotRectItem
 from .model import StoredRectNorm
-from .pdf_render import render_pdf_page
-from .project_io import save_project_json, load_project_json
-from .export_csv import export_csv_file
+from .project_io import save_project_json, load_project_json, parse_transform
+from .image_source import ImageDocument, wants_pyramid
+from .memory import ACCOUNTANT, nbytes_of
+from .metrics import REGISTRY
+from .profiling import ProfileSession
+from .rect_table import COL_LABEL, COL_PROFILE, ProfileDelegate, RectTableModel
+from .thumbnails import ThumbnailDock
+
+# numpy/OpenCV/PyMuPDF (e o cache de páginas, que depende deles) são importados
+# no primeiro uso; app.startup.preload_heavy_modules os aquece após a janela abrir.
+if TYPE_CHECKING:
+    import fitz  # PyMuPDF
+    from .annotation_store import AnnotationStore
+    from .pyramid import ImagePyramid, PyramidItem
+    from .raster_cache import DiskRasterCache
+
+PAGE_RENDERS = REGISTRY.counter("ocr_gui_page_renders_total", "Páginas rasterizadas pela janela")
+RECT_ITEMS_CREATED = REGISTRY.counter("ocr_gui_rect_items_created_total", "AnnotRectItem criados (os demais são reaproveitados entre páginas)")
+PROJECT_OPEN_SECONDS = REGISTRY.histogram("ocr_project_open_seconds", "Tempo para abrir um projeto na janela")
 
 
 class MainWindow(QMainWindow):
@@ -50,21 +65,39 @@ class MainWindow(QMainWindow):
 
         # PDF
         self._pdf_doc: fitz.Document | None = None
-        self._pdf_page_index: int = 0
-        self._pdf_page_count: int = 0
         self._pdf_render_zoom: float = 2.5
 
+        # Imagem (cada quadro de um TIFF multipágina é uma página)
+        self._image_doc: ImageDocument | None = None
+        self._pyramid: ImagePyramid | None = None  # imagem gigante: níveis em disco, desenho por ladrilho
+
+        # Página/quadro atual (PDF ou imagem)
+        self._page_index: int = 0
+        self._page_count: int = 0
+
+        # Cache em disco das páginas renderizadas (opcional: OCR_RASTER_CACHE_MB > 0)
+        self._raster_cache: DiskRasterCache | None = None  # criado na primeira página
+        self._raster_cache_checked = False
+
         # Render atual
-        self._pixmap_item: QGraphicsPixmapItem | None = None
+        self._pixmap_item: QGraphicsPixmapItem | PyramidItem | None = None
         self._image_bounds = QRectF(0, 0, 0, 0)
 
-        # Itens (apenas página atual)
-        self._items: list[AnnotRectItem] = []
-        self._item_to_row: dict[AnnotRectItem, int] = {}
+        # Orçamento de memória: pixmap da página (fixo) e recortes BGR (cache descartável)
+        self._mem_page = ACCOUNTANT.pool("pagina", priority=100)
+        self._mem_crops = ACCOUNTANT.pool("recortes", priority=30)
+
+        # Itens da página atual: lista e linha<->item ficam no modelo da tabela
+        self.rect_model = RectTableModel(self)
+        self.rect_model.on_edit = self._on_table_edit
+        self.rect_model.on_flush = self._save_current_page_rects_norm
         self._suppress_table_events = False
+        # Retângulos fora da cena, prontos para a próxima página (reaproveitados, não recriados)
+        self._rect_spares: list[AnnotRectItem] = []
 
         # Armazenamento por página (normalizado 0–1)
-        self._stored_norm: dict[int, list[StoredRectNorm]] = {}
+        # AnnotationStore (colunar) a partir do primeiro documento aberto
+        self._stored_norm: AnnotationStore | dict[int, list[StoredRectNorm]] = {}
 
         # Zoom persistente entre páginas
         self._keep_view_transform_on_page_change = True
@@ -75,7 +108,11 @@ class MainWindow(QMainWindow):
         # OCR
         self._ocr_profiles: dict[str, dict] = {}
         self._active_profile_name: str = ""
+        self._ocr_cascade: list[dict] = []  # [{"profile", "min_conf", "pattern"}, ...]
 
+        # Captura de perfil de desempenho (toolbar / Ctrl+Shift+P)
+        self._perf_session: ProfileSession | None = None
+        self._perf_out_dir: str = ""
 
         self._build_toolbar()
         self._build_dock()
@@ -93,11 +130,20 @@ class MainWindow(QMainWindow):
             set_profiles=self._set_ocr_profiles,
             get_active_profile=lambda: self._active_profile_name,
             set_active_profile=self._set_active_profile_name,
+            get_cascade=lambda: self._ocr_cascade,
+            memory_pool=ACCOUNTANT.pool("ocr_preview", priority=90),
         )
         self.addDockWidget(Qt.RightDockWidgetArea, self.ocr_dock)
         self.tabifyDockWidget(self.rect_dock, self.ocr_dock)
         self.ocr_dock.raise_()  # opcional: abre na aba OCR
 
+        self.thumb_dock = ThumbnailDock(
+            self,
+            is_annotated=self._page_has_rects,
+            on_page_clicked=self._on_thumbnail_clicked,
+        )
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.thumb_dock)
+
     def _set_ocr_profiles(self, profiles: dict):
         self._ocr_profiles = profiles or {}
 
@@ -115,6 +161,9 @@ class MainWindow(QMainWindow):
         item = selected[0]
         r = item.sceneBoundingRect().toRect()
 
+        if self._pyramid is not None:
+            return self._get_pyramid_crop_bgr(r)
+
         pix = self._pixmap_item.pixmap()
         if pix.isNull():
             return None
@@ -123,6 +172,15 @@ class MainWindow(QMainWindow):
         if r.width() <= 1 or r.height() <= 1:
             return None
 
+        # previews recalculam a cada ajuste de parâmetro: reaproveita o recorte
+        key = (self._file_path, self._current_page_key(), pix.cacheKey(), r.x(), r.y(), r.width(), r.height())
+        cached = self._mem_crops.get(key)
+        if cached is not None:
+            return cached
+
+        import numpy as np
+        import cv2
+
         crop = pix.copy(r)
         qimg = crop.toImage().convertToFormat(QImage.Format_RGB888)
 
@@ -134,6 +192,23 @@ class MainWindow(QMainWindow):
 
         rgb = buf[:, : w * 3].reshape((h, w, 3))
         bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        bgr.setflags(write=False)  # compartilhado pelo cache
+        self._mem_crops.put(key, bgr)
+        return bgr
+
+    def _get_pyramid_crop_bgr(self, r):
+        # recorte do nível 0 (resolução total), nunca do nível exibido
+        pyr = self._pyramid
+        r = r.intersected(QRect(0, 0, pyr.width, pyr.height))
+        if r.width() <= 1 or r.height() <= 1:
+            return None
+        key = (self._file_path, "piramide", r.x(), r.y(), r.width(), r.height())
+        cached = self._mem_crops.get(key)
+        if cached is not None:
+            return cached
+        bgr = pyr.crop_bgr(r.x(), r.y(), r.width(), r.height())
+        bgr.setflags(write=False)
+        self._mem_crops.put(key, bgr)
         return bgr
     # ---------------- UI ----------------
 
@@ -218,6 +293,59 @@ class MainWindow(QMainWindow):
         act_zoom_out.triggered.connect(lambda: self.view.zoom_out())
         tb.addAction(act_zoom_out)
 
+        tb.addSeparator()
+
+        self.act_profile = QAction("Perfilar", self)
+        self.act_profile.setCheckable(True)
+        self.act_profile.setShortcut(QKeySequence("Ctrl+Shift+P"))
+        self.act_profile.setToolTip("Grava um perfil de desempenho (pstats + pilhas) até desligar")
+        self.act_profile.triggered.connect(self.toggle_profiling)
+        self.addAction(self.act_profile)
+        tb.addAction(self.act_profile)
+
+    # ---------------- Perfil de desempenho ----------------
+
+    def toggle_profiling(self, checked: bool):
+        if checked:
+            self.start_profiling()
+        else:
+            self.stop_profiling()
+
+    def start_profiling(self, out_dir: str = ""):
+        if self._perf_session is not None:
+            return
+        self._perf_out_dir = out_dir
+        self._perf_session = ProfileSession(self._file_path or "", self._active_profile_name)
+        self._perf_session.start()
+        self.act_profile.setChecked(True)
+
+    def stop_profiling(self, show_message: bool = True) -> dict | None:
+        session, self._perf_session = self._perf_session, None
+        self.act_profile.setChecked(False)
+        if session is None:
+            return None
+        session.stop()
+        # documento/perfil abertos durante a captura também servem de etiqueta
+        session.document = session.document or (self._file_path or "")
+        session.profile = session.profile or self._active_profile_name
+        try:
+            paths = session.write(self._perf_out_dir)
+        except OSError as e:
+            QMessageBox.critical(self, "Erro", f"Falha ao gravar o perfil:\n{e}")
+            return None
+        if show_message:
+            QMessageBox.information(
+                self, "Perfil de desempenho",
+                f"Captura de {session.duration:.1f}s gravada em:\n{paths['.prof']}\n{paths['.collapsed']}",
+            )
+        return paths
+
+    def closeEvent(self, event):
+        if self._perf_session is not None:
+            self.stop_profiling(show_message=False)
+        self.thumb_dock.shutdown()
+        super().closeEvent(event)
+
     def _build_dock(self):
         self.rect_dock = QDockWidget("Retângulos", self)
         self.rect_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
@@ -234,15 +362,21 @@ class MainWindow(QMainWindow):
         self.btn_rename.clicked.connect(self.rename_selected)
         btn_row.addWidget(self.btn_rename)
 
+        self.btn_overlaps = QPushButton("Sobreposições")
+        self.btn_overlaps.setToolTip("Lista retângulos sobrepostos/duplicados e seleciona os da página atual")
+        self.btn_overlaps.clicked.connect(self.check_overlaps)
+        btn_row.addWidget(self.btn_overlaps)
+
         layout.addLayout(btn_row)
 
-        self.table = QTableWidget(0, 6)
-        self.table.setHorizontalHeaderLabels(["Label", "x0", "y0", "x1", "y1", "w×h(px)"])
+        self.table = QTableView()
+        self.table.setModel(self.rect_model)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
+        self.table.verticalHeader().setDefaultSectionSize(22)  # altura fixa: sem medir linhas
+        self.table.setItemDelegateForColumn(COL_PROFILE, ProfileDelegate(lambda: self._ocr_profiles, self.table))
 
-        self.table.itemSelectionChanged.connect(self._on_table_selection_changed)
-        self.table.itemChanged.connect(self._on_table_item_changed)
+        self.table.selectionModel().selectionChanged.connect(self._on_table_selection_changed)
         layout.addWidget(self.table)
 
         self.rect_dock.setWidget(root)
@@ -265,12 +399,17 @@ class MainWindow(QMainWindow):
         self.act_draw.setEnabled(has)
         self.btn_delete.setEnabled(has)
         self.btn_rename.setEnabled(has)
-        self.act_prev.setEnabled(has and self._is_pdf)
-        self.act_next.setEnabled(has and self._is_pdf)
-        self.page_slider.setEnabled(has and self._is_pdf)
+        self.btn_overlaps.setEnabled(has)
+        paged = has and self._page_count > 1
+        self.act_prev.setEnabled(paged)
+        self.act_next.setEnabled(paged)
+        self.page_slider.setEnabled(paged)
+
+    def _has_pages(self) -> bool:
+        return self._pdf_doc is not None or self._image_doc is not None
 
     def _update_page_widgets(self):
-        if not self._is_pdf:
+        if not self._is_pdf and self._page_count <= 1:
             self.lbl_page.setText("Imagem")
             self._suppress_slider = True
             try:
@@ -280,29 +419,37 @@ class MainWindow(QMainWindow):
                 self._suppress_slider = False
             return
 
-        self.lbl_page.setText(f"{self._pdf_page_index + 1}/{self._pdf_page_count}")
+        self.lbl_page.setText(f"{self._page_index + 1}/{self._page_count}")
         self._suppress_slider = True
         try:
-            self.page_slider.setRange(1, self._pdf_page_count)
-            self.page_slider.setValue(self._pdf_page_index + 1)
+            self.page_slider.setRange(1, self._page_count)
+            self.page_slider.setValue(self._page_index + 1)
         finally:
             self._suppress_slider = False
+        self.thumb_dock.set_current_page(self._page_index)
 
     # ---------------- Load / Render ----------------
 
-    def _clear_scene_all(self):
-        self.scene.clear()
-        self._items.clear()
-        self._item_to_row.clear()
-        self.table.setRowCount(0)
-        self._pixmap_item = None
-
     def _set_pixmap(self, pix: QPixmap):
-        self._pixmap_item = QGraphicsPixmapItem(pix)
-        self._pixmap_item.setPos(0, 0)
-        self.scene.addItem(self._pixmap_item)
+        if isinstance(self._pixmap_item, QGraphicsPixmapItem):
+            # mesmo item de fundo em todas as páginas: só o pixmap é trocado
+            self._pixmap_item.setPixmap(pix)
+            self._set_page_item(self._pixmap_item, pix.width(), pix.height(), nbytes_of(pix))
+        else:
+            self._set_page_item(QGraphicsPixmapItem(pix), pix.width(), pix.height(), nbytes_of(pix))
+
+    def _set_page_item(self, item, w: int, h: int, nbytes: int):
+        """Item de fundo da página (QGraphicsPixmapItem ou PyramidItem)."""
+        if item is not self._pixmap_item:
+            if self._pixmap_item is not None:
+                self.scene.removeItem(self._pixmap_item)
+            self._pixmap_item = item
+            self._pixmap_item.setPos(0, 0)
+            self._pixmap_item.setZValue(-1)  # sempre abaixo dos retângulos
+            self.scene.addItem(self._pixmap_item)
+
+        self._mem_page.set_pinned("pixmap", nbytes)
 
-        w, h = pix.width(), pix.height()
         self._image_bounds = QRectF(0, 0, w, h)
         self.scene.setSceneRect(self._image_bounds)
         self.view.set_image_bounds(self._image_bounds)
@@ -314,150 +461,313 @@ class MainWindow(QMainWindow):
         )
         if not path:
             return
-
-        pix = QPixmap(path)
-        if pix.isNull():
-            QMessageBox.critical(self, "Erro", "Não foi possível carregar a imagem.")
-            return
+        self._open_image_path(path)
+
+    def _open_image_path(
+        self,
+        path: str,
+        store: AnnotationStore | None = None,
+        restore_transform: QTransform | None = None,
+        page_index: int = 0,
+    ) -> bool:
+        """
+        Abre a imagem como documento paginado: só o cabeçalho é lido aqui e
+        apenas o quadro page_index é decodificado. store=None começa um
+        armazenamento vazio. Estado da janela (página, anotações) só muda
+        se a abertura der certo.
+        """
+        pyramid = None
+        first = None
+        try:
+            doc = ImageDocument(path)
+            w, h = doc.frame_size(0)
+            start = min(max(0, page_index), doc.page_count - 1)
+            if doc.page_count == 1 and wants_pyramid(w, h):
+                # imagem gigante: pirâmide construída uma vez e mapeada do cache nas próximas
+                pyramid = self._open_pyramid(path)
+            else:
+                first = doc.read_frame(start)
+        except (OSError, IndexError) as e:
+            QMessageBox.critical(self, "Erro", f"Não foi possível carregar a imagem.\n{e}")
+            return False
 
         self._file_path = path
         self._is_pdf = False
         self._pdf_doc = None
-        self._pdf_page_index = 0
-        self._pdf_page_count = 0
+        self._image_doc = doc
+        self._pyramid = pyramid
+        self._page_index = start
+        self._page_count = doc.page_count
 
-        self._stored_norm = {0: []}
+        self._stored_norm = store if store is not None else self._new_annotation_store()
+        self.thumb_dock.set_document(path, doc.page_count if doc.page_count > 1 else 0, is_pdf=False)
 
-        self._clear_scene_all()
-        self._set_pixmap(pix)
-        self._load_stored_rects_for_page(0)
+        if pyramid is not None:
+            self._show_page_pixmap(0, None, restore_transform)
+        else:
+            self._show_page_pixmap(self._page_index, QPixmap.fromImage(first), restore_transform)
 
         self._set_has_doc(True)
         self._update_page_widgets()
-        self.zoom_fit_width()
+        if restore_transform is None:
+            self.zoom_fit_width()
+        return True
+
+    def _open_pyramid(self, path: str) -> ImagePyramid:
+        """Mapeia a pirâmide do cache ou a constrói numa thread, com diálogo de progresso (OSError se falhar)."""
+        from .pyramid import ImagePyramid, PyramidBuilder
+
+        cached = ImagePyramid.cached(path)
+        if cached is not None:
+            return cached
+
+        dlg = QProgressDialog("Preparando imagem grande (decodificação)…", "", 0, 0, self)
+        dlg.setWindowTitle("Imagem grande")
+        dlg.setCancelButton(None)  # a decodificação do OpenCV não é interrompível
+        dlg.setWindowModality(Qt.WindowModal)
+        dlg.setMinimumDuration(0)
+
+        result: dict = {}
+        loop = QEventLoop(self)
+        builder = PyramidBuilder()
+
+        def on_progress(step: int, total: int):
+            dlg.setRange(0, total)
+            dlg.setValue(step)
+            dlg.setLabelText(f"Gravando níveis da pirâmide ({step}/{total})…")
+
+        def on_done(key: str, value):
+            result[key] = value
+            loop.quit()
+
+        # funções soltas não têm thread própria: fila explícita para rodarem na thread da interface
+        builder.progress.connect(on_progress, Qt.QueuedConnection)
+        builder.finished.connect(lambda p: on_done("ok", p), Qt.QueuedConnection)
+        builder.failed.connect(lambda msg: on_done("erro", msg), Qt.QueuedConnection)
+        dlg.show()
+        builder.start(path)
+        loop.exec()  # interface continua desenhando; o diálogo modal bloqueia outras ações
+        dlg.close()
+
+        if "erro" in result:
+            raise OSError(result["erro"])
+        return result["ok"]
 
     def open_pdf(self):
         path, _ = QFileDialog.getOpenFileName(self, "Abrir PDF", "", "PDF (*.pdf)")
         if not path:
             return
-        self._open_pdf_path(path, reset_storage=True)
+        self._open_pdf_path(path)
+
+    def _open_pdf_path(
+        self,
+        path: str,
+        store: AnnotationStore | None = None,
+        restore_transform: QTransform | None = None,
+        page_index: int = 0,
+    ) -> bool:
+        """
+        Abre o PDF e renderiza uma única vez a página page_index, já com
+        restore_transform (projeto) ou ajustada à largura. store=None começa
+        um armazenamento vazio; se a abertura falhar nada muda na janela.
+        """
+        import fitz
 
-    def _open_pdf_path(self, path: str, reset_storage: bool):
         try:
             doc = fitz.open(path)
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Falha ao abrir PDF:\n{e}")
-            return
+            return False
 
         if doc.page_count <= 0:
             QMessageBox.warning(self, "Aviso", "PDF sem páginas.")
             doc.close()
-            return
+            return False
 
         self._file_path = path
         self._is_pdf = True
         self._pdf_doc = doc
-        self._pdf_page_index = min(self._pdf_page_index, doc.page_count - 1)
-        self._pdf_page_count = doc.page_count
+        self._image_doc = None
+        self._pyramid = None
+        self._page_index = min(max(0, page_index), doc.page_count - 1)
+        self._page_count = doc.page_count
 
-        if reset_storage:
-            self._stored_norm = {}
+        self._stored_norm = store if store is not None else self._new_annotation_store()
+        self.thumb_dock.set_document(path, doc.page_count, is_pdf=True)
 
-        self._clear_scene_all()
-        self._render_pdf_page(self._pdf_page_index)
+        self._render_page(self._page_index, restore_transform=restore_transform)
 
         self._set_has_doc(True)
         self._update_page_widgets()
-        self.zoom_fit_width()
-
-    def _render_pdf_page(self, page_index: int, restore_transform: QTransform | None = None):
-        assert self._pdf_doc is not None
-
-        pix = render_pdf_page(self._pdf_doc, page_index, self._pdf_render_zoom)
-
-        self._clear_scene_all()
-        self._set_pixmap(pix)
+        if restore_transform is None:
+            self.zoom_fit_width()
+        return True
+
+    def _render_page(self, page_index: int, restore_transform: QTransform | None = None):
+        if self._pyramid is not None:
+            pix = None
+        elif self._image_doc is not None:
+            pix = QPixmap.fromImage(self._image_doc.read_frame(page_index))
+        else:
+            assert self._pdf_doc is not None
+            pix = self._render_page_pixmap(page_index)
+        self._show_page_pixmap(page_index, pix, restore_transform)
+
+    def _show_page_pixmap(self, page_index: int, pix: QPixmap | None, restore_transform: QTransform | None = None):
+        """pix=None: página desenhada pela pirâmide (_pyramid)."""
+        PAGE_RENDERS.inc()
+
+        # fundo e retângulos são reaproveitados: nada de scene.clear() a cada troca de página
+        if pix is None:
+            from .pyramid import PyramidItem
+
+            pyr = self._pyramid
+            item = self._pixmap_item
+            if not (isinstance(item, PyramidItem) and item.pyramid is pyr):
+                # só os ladrilhos visíveis ficam em memória (pool "piramide"), não a imagem inteira
+                item = PyramidItem(pyr)
+            self._set_page_item(item, pyr.width, pyr.height, 0)
+        else:
+            self._set_pixmap(pix)
         self._load_stored_rects_for_page(page_index)
 
         if restore_transform is not None:
             self.view.setTransform(restore_transform)
 
+    def _render_page_pixmap(self, page_index: int) -> QPixmap:
+        from .pdf_render import bgr_to_qpixmap, render_pdf_page, render_pdf_page_bgr
+
+        if not self._raster_cache_checked:
+            from .raster_cache import DiskRasterCache
+
+            self._raster_cache = DiskRasterCache.from_env()
+            self._raster_cache_checked = True
+        cache = self._raster_cache
+        if cache is None or not self._file_path:
+            return render_pdf_page(self._pdf_doc, page_index, self._pdf_render_zoom)
+
+        # leitura só quando o hash já está memorizado; hash e gravação vão para a thread do cache
+        doc_hash = cache.known_hash(self._file_path)
+        if doc_hash:
+            bgr = cache.get(doc_hash, page_index, self._pdf_render_zoom)
+            if bgr is not None:
+                return bgr_to_qpixmap(bgr)
+        bgr = render_pdf_page_bgr(self._pdf_doc, page_index, self._pdf_render_zoom)
+        cache.put_later(self._file_path, page_index, self._pdf_render_zoom, bgr)
+        return bgr_to_qpixmap(bgr)
+
     # ---------------- Slider / Page nav ----------------
 
     def _on_slider_changed(self, value: int):
         if self._suppress_slider:
             return
-        if not self._is_pdf or not self._pdf_doc:
+        if not self._has_pages():
             return
-        target_index = max(0, min(self._pdf_page_count - 1, value - 1))
-        if target_index == self._pdf_page_index:
+        target_index = max(0, min(self._page_count - 1, value - 1))
+        if target_index == self._page_index:
             return
         self._go_to_page(target_index)
 
     def prev_page(self):
-        if not self._is_pdf or not self._pdf_doc:
+        if not self._has_pages():
             return
-        if self._pdf_page_index <= 0:
+        if self._page_index <= 0:
             return
-        self._go_to_page(self._pdf_page_index - 1)
+        self._go_to_page(self._page_index - 1)
 
     def next_page(self):
-        if not self._is_pdf or not self._pdf_doc:
+        if not self._has_pages():
             return
-        if self._pdf_page_index >= self._pdf_page_count - 1:
+        if self._page_index >= self._page_count - 1:
             return
-        self._go_to_page(self._pdf_page_index + 1)
+        self._go_to_page(self._page_index + 1)
 
     def _go_to_page(self, page_index: int):
         prev_transform = self.view.transform() if self._keep_view_transform_on_page_change else None
         self._save_current_page_rects_norm()
 
-        self._pdf_page_index = page_index
+        self._page_index = page_index
         self._update_page_widgets()
 
-        self._render_pdf_page(self._pdf_page_index, restore_transform=prev_transform)
+        self._render_page(self._page_index, restore_transform=prev_transform)
 
     # ---------------- Storage (normalized) ----------------
 
+    def _on_thumbnail_clicked(self, page_index: int):
+        if self._has_pages() and page_index != self._page_index:
+            self._go_to_page(page_index)
+
     def _current_page_key(self) -> int:
-        return self._pdf_page_index if self._is_pdf else 0
+        return self._page_index if self._has_pages() else 0
+
+    def _new_annotation_store(self) -> AnnotationStore:
+        from .annotation_store import AnnotationStore
+
+        return AnnotationStore()
+
+    def _page_has_rects(self, page: int) -> bool:
+        store = self._stored_norm
+        return store.count(page) > 0 if hasattr(store, "count") else bool(store.get(page))
 
     def _save_current_page_rects_norm(self):
         page = self._current_page_key()
         img_w = max(1.0, self._image_bounds.width())
         img_h = max(1.0, self._image_bounds.height())
 
-        out: list[StoredRectNorm] = []
-        for item in self._items:
-            r = item.sceneBoundingRect()
-            out.append(
-                StoredRectNorm(
-                    label=item.label(),
-                    x0n=float(r.left() / img_w),
-                    y0n=float(r.top() / img_h),
-                    x1n=float(r.right() / img_w),
-                    y1n=float(r.bottom() / img_h),
-                )
-            )
-        self._stored_norm[page] = out
+        items = self.rect_model.items
+        rects = [item.sceneBoundingRect() for item in items]
+        self._stored_norm.set_page_pixels(
+            page,
+            [(r.left(), r.top(), r.right(), r.bottom()) for r in rects],
+            img_w,
+            img_h,
+            [item.label() for item in items],
+            [item.profile() for item in items],
+        )
+        self.thumb_dock.mark_page(page)
 
     def _load_stored_rects_for_page(self, page_index: int):
-        rects = self._stored_norm.get(page_index, [])
+        store = self._stored_norm
         img_w = max(1.0, self._image_bounds.width())
         img_h = max(1.0, self._image_bounds.height())
 
-        for sr in rects:
-            x0 = sr.x0n * img_w
-            y0 = sr.y0n * img_h
-            x1 = sr.x1n * img_w
-            y1 = sr.y1n * img_h
-            rect = QRectF(QPointF(x0, y0), QPointF(x1, y1)).normalized()
+        coords = store.page_pixels(page_index, img_w, img_h).tolist()
+        # itens da página anterior (já na cena) primeiro, depois as sobras; só cria o que faltar
+        reuse = list(self.rect_model.items)
+        self._release_rect_items(reuse[len(coords):])
+        del reuse[len(coords):]
+
+        items = []
+        self._suppress_table_events = True
+        try:
+            self.scene.clearSelection()
+            for n, ((x0, y0, x1, y1), label, profile) in enumerate(
+                zip(coords, store.labels(page_index), store.profiles(page_index))
+            ):
+                rect = QRectF(QPointF(x0, y0), QPointF(x1, y1)).normalized()
+                if n < len(reuse):
+                    item = reuse[n]
+                    item.retarget(rect, label, profile, self._image_bounds)
+                elif self._rect_spares:
+                    item = self._rect_spares.pop()
+                    item.retarget(rect, label, profile, self._image_bounds)
+                    self.scene.addItem(item)
+                else:
+                    item = AnnotRectItem(rect, label, self._image_bounds, profile=profile)
+                    item.signals.changed.connect(self._on_item_changed)
+                    self.scene.addItem(item)
+                    RECT_ITEMS_CREATED.inc()
+                items.append(item)
+        finally:
+            self._suppress_table_events = False
+        self.rect_model.set_items(items)  # um reset da tabela, não uma inserção por linha
 
-            item = AnnotRectItem(rect, sr.label, self._image_bounds)
-            item.signals.changed.connect(self._on_item_changed)
-            self.scene.addItem(item)
-            self._items.append(item)
-            self._add_table_row(item)
+    def _release_rect_items(self, items) -> None:
+        """Tira os itens da cena e os guarda para a próxima página (conexões de sinal continuam)."""
+        for item in items:
+            item.setSelected(False)
+            self.scene.removeItem(item)
+            self._rect_spares.append(item)
 
     # ---------------- Zoom ----------------
 
@@ -481,55 +791,13 @@ class MainWindow(QMainWindow):
     def _on_rect_created(self, item: AnnotRectItem):
         item.set_image_bounds(self._image_bounds)
         item.signals.changed.connect(self._on_item_changed)
-        self._items.append(item)
-        self._add_table_row(item)
+        self.rect_model.append(item)
         item.setSelected(True)
         self._save_current_page_rects_norm()
 
-    def _add_table_row(self, item: AnnotRectItem):
-        self._suppress_table_events = True
-        try:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-
-            label_item = QTableWidgetItem(item.label())
-            self.table.setItem(row, 0, label_item)
-
-            self._fill_row_coords(row, item)
-            self._item_to_row[item] = row
-        finally:
-            self._suppress_table_events = False
-
-    def _fill_row_coords(self, row: int, item: AnnotRectItem):
-        r = item.sceneBoundingRect()
-        x0, y0, x1, y1 = r.left(), r.top(), r.right(), r.bottom()
-        w, h = r.width(), r.height()
-
-        for col, val in enumerate([x0, y0, x1, y1], start=1):
-            it = self.table.item(row, col)
-            if it is None:
-                it = QTableWidgetItem()
-                it.setFlags(it.flags() & ~Qt.ItemIsEditable)
-                self.table.setItem(row, col, it)
-            it.setText(f"{val:.2f}")
-
-        wh_item = self.table.item(row, 5)
-        if wh_item is None:
-            wh_item = QTableWidgetItem()
-            wh_item.setFlags(wh_item.flags() & ~Qt.ItemIsEditable)
-            self.table.setItem(row, 5, wh_item)
-        wh_item.setText(f"{w:.0f}×{h:.0f}")
-
     def _on_item_changed(self, item: AnnotRectItem):
-        row = self._item_to_row.get(item)
-        if row is not None:
-            self._suppress_table_events = True
-            try:
-                self.table.item(row, 0).setText(item.label())
-                self._fill_row_coords(row, item)
-            finally:
-                self._suppress_table_events = False
-        self._save_current_page_rects_norm()
+        # durante um arrasto chega um sinal por movimento: tabela e página atualizam uma vez por quadro
+        self.rect_model.mark_changed(item)
 
     def _on_scene_selection_changed(self):
         if self._suppress_table_events:
@@ -538,89 +806,69 @@ class MainWindow(QMainWindow):
         if not selected:
             return
         item = selected[0]
-        row = self._item_to_row.get(item)
+        row = self.rect_model.row_of(item)
         if row is None:
             return
         self._suppress_table_events = True
 
         if hasattr(self, "ocr_dock"):
+            self.ocr_dock.show_region_profile(item.profile())
             self.ocr_dock.update_previews()
         try:
             self.table.selectRow(row)
         finally:
             self._suppress_table_events = False
 
-    def _on_table_selection_changed(self):
+    def _on_table_selection_changed(self, *_):
         if self._suppress_table_events:
             return
         rows = self.table.selectionModel().selectedRows()
         if not rows:
             return
-        row = rows[0].row()
-        for item, r in self._item_to_row.items():
-            if r == row:
-                self.scene.clearSelection()
-                item.setSelected(True)
-                self.view.centerOn(item)
-                break
-
-    def _on_table_item_changed(self, changed_item: QTableWidgetItem):
-        if self._suppress_table_events:
-            return
-        if changed_item.column() != 0:
-            return
-        row = changed_item.row()
-        new_label = (changed_item.text() or "").strip()
+        item = self.rect_model.item_at(rows[0].row())
+        if item is not None:
+            self.scene.clearSelection()
+            item.setSelected(True)
+            self.view.centerOn(item)
+
+    def _on_table_edit(self, rect_item: AnnotRectItem, column: int, text: str) -> bool:
+        """Edição de Label/Perfil na tabela; False mantém o valor anterior."""
+        if column == COL_PROFILE:
+            return self._on_table_profile_changed(rect_item, text)
+        if column != COL_LABEL:
+            return False
+        new_label = (text or "").strip()
         if not new_label:
             QMessageBox.warning(self, "Aviso", "Label não pode ser vazio.")
-            self._suppress_table_events = True
-            try:
-                rect_item = self._get_item_by_row(row)
-                if rect_item:
-                    changed_item.setText(rect_item.label())
-            finally:
-                self._suppress_table_events = False
-            return
+            return False
 
-        rect_item = self._get_item_by_row(row)
-        if rect_item:
-            rect_item.set_label(new_label)
-            self._save_current_page_rects_norm()
+        rect_item.set_label(new_label)
+        self._save_current_page_rects_norm()
+        return True
 
-    def _get_item_by_row(self, row: int) -> AnnotRectItem | None:
-        for item, r in self._item_to_row.items():
-            if r == row:
-                return item
-        return None
+    def _on_table_profile_changed(self, rect_item: AnnotRectItem, text: str) -> bool:
+        name = (text or "").strip()
+        if name and name not in self._ocr_profiles:
+            QMessageBox.warning(self, "Aviso", f"Perfil OCR não encontrado: {name}")
+            return False
+
+        rect_item.set_profile(name)
+        self._save_current_page_rects_norm()
+        if rect_item.isSelected() and hasattr(self, "ocr_dock"):
+            self.ocr_dock.show_region_profile(name)
+        return True
 
     def delete_selected(self):
         selected = [it for it in self.scene.selectedItems() if isinstance(it, AnnotRectItem)]
         if not selected:
             return
-        for item in selected:
-            row = self._item_to_row.get(item)
-            if row is not None:
-                self._remove_row_and_reindex(row)
-            self.scene.removeItem(item)
-            if item in self._items:
-                self._items.remove(item)
-            if item in self._item_to_row:
-                del self._item_to_row[item]
-        self._save_current_page_rects_norm()
-
-    def _remove_row_and_reindex(self, row: int):
         self._suppress_table_events = True
         try:
-            self.table.removeRow(row)
-            new_map: dict[AnnotRectItem, int] = {}
-            for item, r in self._item_to_row.items():
-                if r < row:
-                    new_map[item] = r
-                elif r > row:
-                    new_map[item] = r - 1
-            self._item_to_row = new_map
+            self.rect_model.remove_items(selected)
+            self._release_rect_items(selected)
         finally:
             self._suppress_table_events = False
+        self._save_current_page_rects_norm()
 
     def rename_selected(self):
         selected = [it for it in self.scene.selectedItems() if isinstance(it, AnnotRectItem)]
@@ -632,6 +880,25 @@ class MainWindow(QMainWindow):
             item.set_label(text.strip())
             self._save_current_page_rects_norm()
 
+    def check_overlaps(self):
+        from .spatial_index import format_report, overlap_report
+
+        self.rect_model.flush()  # grava a página atual antes de consultar o índice
+        overlaps = overlap_report(self._stored_norm)
+        if not overlaps:
+            QMessageBox.information(self, "Sobreposições", "Nenhum retângulo sobreposto.")
+            return
+
+        # linhas de page_array == linhas da tabela na página atual
+        page = self._current_page_key()
+        rows = {r for o in overlaps if o.page == page for r in (o.i, o.j)}
+        self.scene.clearSelection()
+        for row in sorted(rows):
+            item = self.rect_model.item_at(row)
+            if item is not None:
+                item.setSelected(True)
+        QMessageBox.information(self, "Sobreposições", format_report(self._stored_norm, overlaps, max_lines=30))
+
     # ---------------- Export / Project ----------------
 
     def export_csv(self):
@@ -646,18 +913,21 @@ class MainWindow(QMainWindow):
         if not out_path:
             return
 
+        from .export_csv import export_csv_file
+
         try:
             export_csv_file(
                 out_path,
                 source_path=self._file_path,
                 is_pdf=self._is_pdf,
                 pdf_doc=self._pdf_doc,
-                pdf_page_count=self._pdf_page_count,
+                pdf_page_count=self._page_count,
                 pdf_render_zoom=self._pdf_render_zoom,
                 stored_norm=self._stored_norm,
                 image_w_px=int(self._image_bounds.width()),
                 image_h_px=int(self._image_bounds.height()),
                 profile_name=self._active_profile_name,
+                image_doc=self._image_doc,
             )
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Falha ao salvar CSV:\n{e}")
@@ -682,12 +952,13 @@ class MainWindow(QMainWindow):
                 out_path,
                 source_path=self._file_path,
                 is_pdf=self._is_pdf,
-                pdf_page_index=self._pdf_page_index,
+                pdf_page_index=self._page_index,
                 pdf_render_zoom=self._pdf_render_zoom,
                 view_transform=self.view.transform(),
                 stored_norm=self._stored_norm,
                 ocr_profiles=self._ocr_profiles,
                 active_profile_name=self._active_profile_name,
+                ocr_cascade=self._ocr_cascade,
             )
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Falha ao salvar projeto:\n{e}")
@@ -700,10 +971,12 @@ class MainWindow(QMainWindow):
         if not proj_path:
             return
 
+        t0 = time.perf_counter()
         try:
-            data = load_project_json(proj_path)
+            data = load_project_json(proj_path, lazy_annotations=True)
             self._ocr_profiles = data.get("ocr_profiles", {}) or {}
             self._active_profile_name = data.get("active_profile_name", "") or ""
+            self._ocr_cascade = data.get("ocr_cascade", []) or []
             if hasattr(self, "ocr_dock"):
                 self.ocr_dock.refresh_profiles()
 
@@ -711,11 +984,13 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Erro", f"Falha ao ler projeto:\n{e}")
             return
 
+        elapsed = time.perf_counter() - t0  # sem contar os diálogos abaixo
+
         source_path = data.get("source_path")
         is_pdf = bool(data.get("is_pdf", False))
         page_index = int(data.get("pdf_page_index", 0))
         render_zoom = float(data.get("pdf_render_zoom", 2.5))
-        restore_transform: QTransform | None = data.get("view_transform_parsed")
+        restore_transform: QTransform | None = parse_transform(data.get("view_transform"))
         stored_norm = data.get("annotations_parsed", {})
 
         if not source_path or not os.path.exists(source_path):
@@ -733,40 +1008,18 @@ class MainWindow(QMainWindow):
             if not source_path:
                 return
 
-        self._stored_norm = stored_norm
-        self._pdf_render_zoom = render_zoom
-
-        # Abre fonte
+        t0 = time.perf_counter()
+        # Abre fonte (uma única renderização, já na página e transform salvos);
+        # anotações e página da janela só são trocadas se a abertura der certo
         if is_pdf or str(source_path).lower().endswith(".pdf"):
-            self._pdf_page_index = max(0, page_index)
-            self._open_pdf_path(source_path, reset_storage=False)
-
-            if self._pdf_doc:
-                self._pdf_page_index = min(self._pdf_page_index, self._pdf_page_count - 1)
-                self._update_page_widgets()
-                self._render_pdf_page(self._pdf_page_index, restore_transform=restore_transform)
+            prev_zoom, self._pdf_render_zoom = self._pdf_render_zoom, render_zoom
+            if not self._open_pdf_path(source_path, stored_norm, restore_transform, page_index):
+                self._pdf_render_zoom = prev_zoom
+                return
         else:
-            pix = QPixmap(source_path)
-            if pix.isNull():
-                QMessageBox.critical(self, "Erro", "Não foi possível carregar a imagem do projeto.")
+            if not self._open_image_path(source_path, stored_norm, restore_transform, page_index):
                 return
 
-            self._file_path = source_path
-            self._is_pdf = False
-            self._pdf_doc = None
-            self._pdf_page_index = 0
-            self._pdf_page_count = 0
-
-            self._clear_scene_all()
-            self._set_pixmap(pix)
-            self._load_stored_rects_for_page(0)
-
-            self._set_has_doc(True)
-            self._update_page_widgets()
-
-            if restore_transform is not None:
-                self.view.setTransform(restore_transform)
-            else:
-                self.zoom_fit_width()
-
-        QMessageBox.information(self, "OK", "Projeto carregado com sucesso.")
+        elapsed += time.perf_counter() - t0
+        PROJECT_OPEN_SECONDS.observe(elapsed)
+        QMessageBox.information(self, "OK", f"Projeto carregado com sucesso ({elapsed * 1000:.0f} ms).")
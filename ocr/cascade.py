@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .preprocess import OCRParams, apply_preprocess
+from .tesseract_engine import run_ocr
+
+
+@dataclass
+class CascadeStep:
+    profile: str
+    min_conf: float = 0.0  # conf_mean mínima para aceitar o resultado
+    pattern: str = ""      # regex opcional (fullmatch no texto)
+
+    _regex: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+
+    def accepts(self, text: str, conf: Optional[float]) -> bool:
+        if self.min_conf > 0 and (conf is None or conf < self.min_conf):
+            return False
+        if self.pattern:
+            if self._regex is None:
+                self._regex = re.compile(self.pattern)
+            if not self._regex.fullmatch((text or "").strip()):
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"profile": self.profile, "min_conf": self.min_conf, "pattern": self.pattern}
+
+    @staticmethod
+    def from_dict(d: Dict[str, Any]) -> "CascadeStep":
+        return CascadeStep(
+            profile=str(d.get("profile", "")),
+            min_conf=float(d.get("min_conf", 0.0) or 0.0),
+            pattern=str(d.get("pattern", "") or ""),
+        )
+
+
+@dataclass
+class CascadeResult:
+    text: str
+    conf: Optional[float]
+    step: int          # índice (0-based) do passo que produziu o resultado; -1 se nenhum rodou
+    profile: str
+    accepted: bool     # False = nenhum passo passou; resultado é o de maior confiança
+    # imagem pré-processada (BGR) do passo do resultado, para o preview do dock
+    proc_bgr: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+
+def cascade_from_json(data: Any) -> List[CascadeStep]:
+    out: List[CascadeStep] = []
+    for it in data or []:
+        if isinstance(it, dict) and it.get("profile"):
+            out.append(CascadeStep.from_dict(it))
+    return out
+
+
+def run_cascade(
+    crop_bgr: np.ndarray,
+    steps: List[CascadeStep],
+    profiles: Dict[str, Any],
+) -> CascadeResult:
+    """
+    Roda os perfis em ordem (do mais barato ao mais caro) e para no primeiro
+    cujo resultado atinge a confiança mínima e passa no validador.
+    """
+    best: Optional[CascadeResult] = None
+
+    for i, step in enumerate(steps):
+        if step.profile not in profiles:
+            continue
+        params = OCRParams.from_dict(profiles[step.profile])
+        img_ocr, proc_bgr = apply_preprocess(crop_bgr, params)
+        text, conf, _ = run_ocr(img_ocr, params)
+
+        if step.accepts(text, conf):
+            return CascadeResult(text, conf, i, step.profile, True, proc_bgr)
+
+        if best is None or (conf or -1.0) > (best.conf or -1.0):
+            best = CascadeResult(text, conf, i, step.profile, False, proc_bgr)
+
+    return best or CascadeResult("", None, -1, "", False)
@@ -0,0 +1,289 @@
+"""
+Reconhecedor leve para campos numéricos (whitelist tipo "0123456789./-"):
+segmenta caracteres por componentes conexos e classifica cada um por k-NN
+contra glifos rotulados. Pensado para rodar em frações de milissegundo por
+campo; quando a confiança é baixa, run_ocr volta para o Tesseract.
+
+Treino / avaliação (manifest CSV com colunas path,text):
+    python -m ocr.digits train manifest.csv -o digits.npz [--project p.json --profile nome]
+    python -m ocr.digits eval manifest.csv --model digits.npz [--project p.json --profile nome]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+from .layout import ink_mask
+from .preprocess import OCRParams, apply_preprocess
+
+
+DIGIT_CHARS = "0123456789./-"
+GLYPH_SIZE = 16
+SHAPE_WEIGHT = 4.0  # peso das features de forma (altura/largura/posição) frente aos pixels
+TRAIN_CHUNK_ROWS = 256  # linhas da matriz de distâncias calculadas por vez no treino
+
+
+@dataclass
+class Glyph:
+    x: int
+    y: int
+    w: int
+    h: int
+    features: np.ndarray
+
+
+def segment_glyphs(img: np.ndarray) -> List[Glyph]:
+    """Componentes conexos da tinta, da esquerda para a direita."""
+    ink = ink_mask(img).astype(np.uint8)
+    h_img = ink.shape[0]
+    n, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+    min_area = max(3, int(0.002 * h_img * h_img))
+    boxes = [
+        [int(stats[i, cv2.CC_STAT_LEFT]), int(stats[i, cv2.CC_STAT_TOP]),
+         int(stats[i, cv2.CC_STAT_WIDTH]), int(stats[i, cv2.CC_STAT_HEIGHT])]
+        for i in range(1, n)
+        if stats[i, cv2.CC_STAT_AREA] >= min_area
+    ]
+    if not boxes:
+        return []
+    boxes.sort(key=lambda b: b[0])
+
+    # junta pedaços de um mesmo caractere (sobreposição horizontal forte)
+    merged: List[List[int]] = []
+    for b in boxes:
+        if merged:
+            m = merged[-1]
+            overlap = min(m[0] + m[2], b[0] + b[2]) - max(m[0], b[0])
+            if overlap >= 0.6 * min(m[2], b[2]):
+                x0, y0 = min(m[0], b[0]), min(m[1], b[1])
+                x1, y1 = max(m[0] + m[2], b[0] + b[2]), max(m[1] + m[3], b[1] + b[3])
+                merged[-1] = [x0, y0, x1 - x0, y1 - y0]
+                continue
+        merged.append(b)
+
+    ref_h = float(max(b[3] for b in merged))
+    line_top = float(min(b[1] for b in merged))
+
+    glyphs: List[Glyph] = []
+    for x, y, w, h in merged:
+        mask = ink[y:y + h, x:x + w]
+        glyphs.append(Glyph(x, y, w, h, _glyph_features(mask, y, ref_h, line_top)))
+    return glyphs
+
+
+def _glyph_features(mask: np.ndarray, y: int, ref_h: float, line_top: float) -> np.ndarray:
+    h, w = mask.shape
+    side = max(h, w)
+    canvas = np.zeros((side, side), dtype=np.float32)
+    oy, ox = (side - h) // 2, (side - w) // 2
+    canvas[oy:oy + h, ox:ox + w] = mask
+    small = cv2.resize(canvas, (GLYPH_SIZE, GLYPH_SIZE), interpolation=cv2.INTER_AREA)
+
+    shape = np.array([h / ref_h, w / ref_h, (y + h / 2.0 - line_top) / ref_h], dtype=np.float32)
+    return np.concatenate([small.ravel(), shape * SHAPE_WEIGHT])
+
+
+class DigitModel:
+    """k-NN sobre glifos rotulados."""
+    def __init__(self, features: np.ndarray, labels: np.ndarray, reject_dist: float, k: int = 3):
+        self.features = np.asarray(features, dtype=np.float32)
+        self.labels = np.asarray(labels)
+        self.reject_dist = float(reject_dist)
+        self.k = int(k)
+        self._sq_norms = (self.features ** 2).sum(axis=1)
+
+    @staticmethod
+    def train(features: np.ndarray, labels: np.ndarray, k: int = 3) -> "DigitModel":
+        features = np.asarray(features, dtype=np.float32)
+        # distância de rejeição: NN leave-one-out (amostra) com folga
+        idx = np.arange(len(features))
+        if len(idx) > 2000:
+            idx = np.random.default_rng(0).choice(idx, 2000, replace=False)
+        sq = (features ** 2).sum(axis=1)
+        nn = np.empty(len(idx), dtype=np.float64)
+        for start in range(0, len(idx), TRAIN_CHUNK_ROWS):
+            rows = idx[start:start + TRAIN_CHUNK_ROWS]
+            d = _sq_dists(features[rows], features, sq)
+            d[np.arange(len(rows)), rows] = np.inf
+            nn[start:start + len(rows)] = d.min(axis=1)
+        nn = np.sqrt(np.maximum(nn, 0.0))
+        finite = nn[np.isfinite(nn)]
+        reject = float(np.percentile(finite, 95) * 1.5) if finite.size else 1.0
+        return DigitModel(features, np.asarray(labels), reject, k)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path, features=self.features, labels=self.labels.astype("U1"),
+            reject_dist=self.reject_dist, k=self.k, glyph_size=GLYPH_SIZE,
+        )
+
+    @staticmethod
+    def load(path: str) -> "DigitModel":
+        z = np.load(path)
+        if int(z["glyph_size"]) != GLYPH_SIZE:
+            raise RuntimeError(f"Modelo incompatível (glyph_size={int(z['glyph_size'])}).")
+        return DigitModel(z["features"], z["labels"], float(z["reject_dist"]), int(z["k"]))
+
+    def classify(self, feats: np.ndarray, allowed: str = "") -> Tuple[List[str], List[float]]:
+        """Retorna (caracteres, confs 0–100) para cada linha de feats."""
+        if not len(feats):
+            return [], []
+        d = _sq_dists(np.asarray(feats, dtype=np.float32), self.features, self._sq_norms)
+        if allowed:
+            d[:, ~np.isin(self.labels, list(allowed))] = np.inf
+
+        k = min(self.k, d.shape[1])
+        nn = np.argpartition(d, k - 1, axis=1)[:, :k]
+        chars: List[str] = []
+        confs: List[float] = []
+        for row, idx in enumerate(nn):
+            idx = idx[np.argsort(d[row, idx])]
+            labs = self.labels[idx]
+            best = labs[0]
+            votes = int((labs == best).sum())
+            d_best = float(np.sqrt(max(d[row, idx[0]], 0.0)))
+            chars.append(str(best))
+            confs.append(100.0 * votes / k if d_best <= self.reject_dist else 0.0)
+        return chars, confs
+
+
+def _sq_dists(a: np.ndarray, b: np.ndarray, b_sq: np.ndarray) -> np.ndarray:
+    return (a ** 2).sum(axis=1)[:, None] + b_sq[None, :] - 2.0 * (a @ b.T)
+
+
+@lru_cache(maxsize=8)
+def _load_model_cached(path: str, mtime_ns: int) -> DigitModel:
+    return DigitModel.load(path)
+
+
+def load_model(path: str) -> DigitModel:
+    """Cache por (caminho, mtime): um modelo re-treinado no mesmo arquivo é relido."""
+    return _load_model_cached(path, os.stat(path).st_mtime_ns)
+
+
+def is_digit_whitelist(whitelist: str) -> bool:
+    wl = (whitelist or "").strip()
+    return bool(wl) and set(wl) <= set(DIGIT_CHARS)
+
+
+def recognize_digits(image: np.ndarray, model: DigitModel, allowed: str = "") -> Tuple[str, float]:
+    """Texto e confiança do campo (= confiança do glifo mais fraco)."""
+    glyphs = segment_glyphs(image)
+    if not glyphs:
+        return "", 0.0
+    chars, confs = model.classify(np.stack([g.features for g in glyphs]), allowed=allowed)
+    return "".join(chars), float(min(confs))
+
+
+# ---------------- treino / avaliação ----------------
+
+def _read_manifest(path: str) -> List[Tuple[str, str]]:
+    base = os.path.dirname(os.path.abspath(path))
+    out: List[Tuple[str, str]] = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            img_path = row.get("path", "")
+            if not os.path.isabs(img_path):
+                img_path = os.path.join(base, img_path)
+            out.append((img_path, (row.get("text") or "").replace(" ", "")))
+    return out
+
+
+def _params_from_project(project: str, profile: str) -> OCRParams:
+    if not project:
+        return OCRParams()
+    with open(project, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    profiles = data.get("ocr_profiles", {}) or {}
+    name = profile or data.get("active_profile_name", "")
+    return OCRParams.from_dict(profiles.get(name, {}))
+
+
+def _iter_samples(manifest: str, params: OCRParams) -> Iterable[Tuple[np.ndarray, str]]:
+    for img_path, text in _read_manifest(manifest):
+        bgr = cv2.imread(img_path, cv2.IMREAD_COLOR)
+        if bgr is None:
+            continue
+        img_ocr, _ = apply_preprocess(bgr, params)
+        yield img_ocr, text
+
+
+def train_from_samples(samples: Iterable[Tuple[np.ndarray, str]]) -> Tuple[DigitModel, int, int]:
+    """Usa só os recortes cuja segmentação bate com o nº de caracteres do rótulo."""
+    feats: List[np.ndarray] = []
+    labels: List[str] = []
+    used = skipped = 0
+    for img, text in samples:
+        glyphs = segment_glyphs(img)
+        if not text or len(glyphs) != len(text):
+            skipped += 1
+            continue
+        used += 1
+        feats.extend(g.features for g in glyphs)
+        labels.extend(text)
+    if not feats:
+        raise RuntimeError("Nenhum recorte utilizável para treino.")
+    return DigitModel.train(np.stack(feats), np.array(labels)), used, skipped
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m ocr.digits", description="Classificador de dígitos (k-NN).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("train", "eval"):
+        sp = sub.add_parser(name)
+        sp.add_argument("manifest", help="CSV com colunas path,text")
+        sp.add_argument("--project", default="", help="Projeto JSON (para o pré-processamento)")
+        sp.add_argument("--profile", default="", help="Perfil OCR do projeto (padrão: ativo)")
+    sub.choices["train"].add_argument("-o", "--output", required=True, help="Modelo .npz de saída")
+    sub.choices["eval"].add_argument("--model", required=True, help="Modelo .npz")
+    sub.choices["eval"].add_argument("--min-conf", type=float, default=90.0)
+    args = ap.parse_args(argv)
+
+    params = _params_from_project(args.project, args.profile)
+
+    if args.cmd == "train":
+        model, used, skipped = train_from_samples(_iter_samples(args.manifest, params))
+        model.save(args.output)
+        print(f"{len(model.labels)} glifos de {used} recortes ({skipped} ignorados) -> {args.output}")
+        return 0
+
+    model = DigitModel.load(args.model)
+    allowed = params.whitelist.strip()
+    n = ok = ok_accepted = accepted = 0
+    chars_ok = chars_total = 0
+    elapsed = 0.0
+    for img, text in _iter_samples(args.manifest, params):
+        t0 = time.perf_counter()
+        pred, conf = recognize_digits(img, model, allowed)
+        elapsed += time.perf_counter() - t0
+        n += 1
+        ok += int(pred == text)
+        if conf >= args.min_conf:
+            accepted += 1
+            ok_accepted += int(pred == text)
+        chars_total += len(text)
+        chars_ok += sum(a == b for a, b in zip(pred, text))
+
+    if not n:
+        print("Nenhum recorte avaliado.")
+        return 1
+    print(f"campos: {n} | acerto campo: {100.0 * ok / n:.1f}% | acerto caractere: "
+          f"{100.0 * chars_ok / max(1, chars_total):.1f}%")
+    print(f"aceitos (conf >= {args.min_conf:g}): {100.0 * accepted / n:.1f}% | acerto nos aceitos: "
+          f"{100.0 * ok_accepted / max(1, accepted):.1f}%")
+    print(f"tempo médio: {1000.0 * elapsed / n:.3f} ms/campo")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,6 @@
 from __future__ import annotations
 from PySide6.QtWidgets import QSizePolicy
-from typing import Optional, Callable, Dict, Any
-
-import numpy as np
-import cv2
+from typing import TYPE_CHECKING, Optional, Callable, Dict, Any, List
 
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap, QImage
@@ -13,17 +10,45 @@ from PySide6.QtWidgets import (
     QGroupBox, QFormLayout
 )
 
-from .preprocess import OCRParams, apply_preprocess
-from .tesseract_engine import run_ocr
+from .params import OCRParams
+
+# numpy/OpenCV/pytesseract só são importados no primeiro preview/OCR (partida rápida da GUI)
+if TYPE_CHECKING:
+    import numpy as np
+
+
+PSM_CHOICES = [
+    ("padrão", ""), ("auto (formato do campo)", "auto"),
+    ("0 só orientação (OSD)", "0"), ("1 página + OSD", "1"), ("2 página sem OCR", "2"),
+    ("3 página", "3"), ("4 coluna", "4"), ("5 bloco vertical", "5"), ("6 bloco", "6"), ("7 linha", "7"),
+    ("8 palavra", "8"), ("9 palavra em círculo", "9"), ("10 caractere", "10"),
+    ("11 texto esparso", "11"), ("12 texto esparso + OSD", "12"), ("13 linha crua", "13"),
+]
+OEM_CHOICES = [("padrão", -1), ("0 legacy", 0), ("1 LSTM", 1), ("2 legacy+LSTM", 2), ("3 auto", 3)]
+
+
+def _set_combo_data(cb: QComboBox, value) -> None:
+    idx = cb.findData(value)
+    if idx < 0 and value not in ("", None):
+        # valor fora da lista (projeto de outra versão): mantém em vez de cair no "padrão"
+        cb.addItem(str(value), value)
+        idx = cb.count() - 1
+    cb.setCurrentIndex(max(0, idx))
 
 
 def bgr_to_qpix(bgr: np.ndarray) -> QPixmap:
+    import cv2
+
     rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
     h, w, _ = rgb.shape
     qimg = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888).copy()
     return QPixmap.fromImage(qimg)
 
 
+def _pixmap_bytes(pm: QPixmap) -> int:
+    return pm.width() * pm.height() * max(1, pm.depth()) // 8
+
+
 class OCRDock(QDockWidget):
     """
     Dock de OCR:
@@ -41,6 +66,8 @@ class OCRDock(QDockWidget):
         set_profiles: Callable[[Dict[str, Any]], None],
         get_active_profile: Callable[[], str],
         set_active_profile: Callable[[str], None],
+        get_cascade: Optional[Callable[[], List[Dict[str, Any]]]] = None,
+        memory_pool: Any = None,
     ):
         super().__init__("OCR", parent)
         self.setAllowedAreas(Qt.BottomDockWidgetArea | Qt.RightDockWidgetArea | Qt.LeftDockWidgetArea)
@@ -50,8 +77,13 @@ class OCRDock(QDockWidget):
         self._set_profiles = set_profiles
         self._get_active_profile = get_active_profile
         self._set_active_profile = set_active_profile
+        self._get_cascade = get_cascade or (lambda: [])
+        # pool do orçamento de memória do app (set_pinned); opcional
+        self._memory_pool = memory_pool
 
         self.params = OCRParams()
+        # edições não salvas por perfil, preservadas quando a seleção troca o perfil mostrado
+        self._unsaved: Dict[str, OCRParams] = {}
 
         self._debounce = QTimer(self)
         self._debounce.setSingleShot(True)
@@ -141,6 +173,48 @@ class OCRDock(QDockWidget):
         self.ed_blacklist = QLineEdit(self.params.blacklist)
         form.addRow("Blacklist", self.ed_blacklist)
 
+        self.cb_psm = QComboBox()
+        for text, value in PSM_CHOICES:
+            self.cb_psm.addItem(text, value)
+        _set_combo_data(self.cb_psm, self.params.psm)
+        form.addRow("PSM", self.cb_psm)
+
+        self.cb_oem = QComboBox()
+        for text, value in OEM_CHOICES:
+            self.cb_oem.addItem(text, value)
+        _set_combo_data(self.cb_oem, self.params.oem)
+        form.addRow("OEM", self.cb_oem)
+
+        self.cb_variant = QComboBox()
+        self.cb_variant.addItems(["", "fast", "best"])
+        self.cb_variant.setCurrentText(self.params.model_variant)
+        self.cb_variant.setToolTip("Procura tessdata_<variante>/ dentro do tessdata dir")
+        form.addRow("Modelo", self.cb_variant)
+
+        self.ck_split_lines = QCheckBox()
+        self.ck_split_lines.setChecked(self.params.split_lines)
+        self.ck_split_lines.setToolTip("Divide a região em linhas e reconhece cada uma em paralelo (PSM 7)")
+        form.addRow("Dividir linhas", self.ck_split_lines)
+
+        self.cb_recognizer = QComboBox()
+        self.cb_recognizer.addItems(["tesseract", "digits"])
+        self.cb_recognizer.setCurrentText(self.params.recognizer)
+        self.cb_recognizer.setToolTip("digits: k-NN para whitelists numéricas; volta ao Tesseract se a confiança for baixa")
+        form.addRow("Reconhecedor", self.cb_recognizer)
+
+        self.ed_digits_model = QLineEdit(self.params.digits_model)
+        self.ed_digits_model.setPlaceholderText("Modelo .npz (python -m ocr.digits train)")
+        form.addRow("Modelo dígitos", self.ed_digits_model)
+
+        self.sp_digits_conf = QDoubleSpinBox()
+        self.sp_digits_conf.setRange(0.0, 100.0)
+        self.sp_digits_conf.setValue(self.params.digits_min_conf)
+        form.addRow("Conf. mín. dígitos", self.sp_digits_conf)
+
+        self.ed_tessdata = QLineEdit(self.params.tessdata_dir)
+        self.ed_tessdata.setPlaceholderText("Pasta com os .traineddata (opcional)")
+        form.addRow("tessdata dir", self.ed_tessdata)
+
         self.ed_tcmd = QLineEdit(self.params.tesseract_cmd)
         self.ed_tcmd.setPlaceholderText(r"Ex: C:\Program Files\Tesseract-OCR\tesseract.exe")
         form.addRow("tesseract_cmd", self.ed_tcmd)
@@ -153,6 +227,10 @@ class OCRDock(QDockWidget):
         self.ck_autorun.setChecked(False)
         act_row.addWidget(self.ck_autorun)
 
+        self.ck_cascade = QCheckBox("Cascata")
+        self.ck_cascade.setToolTip("Usa a cascata de perfis do projeto (ocr_cascade) em vez do perfil atual")
+        act_row.addWidget(self.ck_cascade)
+
         self.btn_run = QPushButton("Rodar OCR")
         self.btn_run.clicked.connect(self.run_now)
         act_row.addWidget(self.btn_run)
@@ -192,7 +270,9 @@ class OCRDock(QDockWidget):
             self.sp_scale, self.ck_gray, self.ck_invert, self.cb_thresh,
             self.sp_adapt_bs, self.sp_adapt_c, self.sp_blur, self.ck_sharp,
             self.cb_morph, self.sp_morph_k, self.ed_lang, self.ed_whitelist,
-            self.ed_blacklist, self.ed_tcmd
+            self.ed_blacklist, self.cb_psm, self.cb_oem, self.cb_variant, self.ck_split_lines,
+            self.cb_recognizer, self.ed_digits_model, self.sp_digits_conf,
+            self.ed_tessdata, self.ed_tcmd
         ):
             self._connect_change(w)
 
@@ -233,6 +313,15 @@ class OCRDock(QDockWidget):
             whitelist=self.ed_whitelist.text(),
             blacklist=self.ed_blacklist.text(),
             tesseract_cmd=self.ed_tcmd.text(),
+            psm=str(self.cb_psm.currentData() or ""),
+            oem=int(self.cb_oem.currentData()),
+            tessdata_dir=self.ed_tessdata.text().strip(),
+            model_variant=str(self.cb_variant.currentText()),
+            split_lines=bool(self.ck_split_lines.isChecked()),
+            line_workers=int(self.params.line_workers),
+            recognizer=str(self.cb_recognizer.currentText()),
+            digits_model=self.ed_digits_model.text().strip(),
+            digits_min_conf=float(self.sp_digits_conf.value()),
         )
         self.params = OCRParams.from_dict(p.to_dict())
         return self.params
@@ -244,6 +333,9 @@ class OCRDock(QDockWidget):
             self.lbl_proc.setText("—")
             return
 
+        import cv2
+        from .preprocess import apply_preprocess
+
         params = self.pull_params_from_ui()
 
         # original preview (com scale aplicada para ficar comparável)
@@ -254,22 +346,28 @@ class OCRDock(QDockWidget):
         img_ocr, proc_bgr = apply_preprocess(crop, params)
 
         pm_orig = bgr_to_qpix(orig)
-        pm_proc = bgr_to_qpix(proc_bgr)
 
         self.lbl_orig.setPixmap(pm_orig.scaled(
             self.lbl_orig.size(),
             Qt.KeepAspectRatio,
             Qt.SmoothTransformation
         ))
-        self.lbl_proc.setPixmap(pm_proc.scaled(
+        self.lbl_orig.setMinimumSize(240, 180)
+        self._show_processed(proc_bgr)
+
+    def _show_processed(self, proc_bgr: np.ndarray):
+        self.lbl_proc.setPixmap(bgr_to_qpix(proc_bgr).scaled(
             self.lbl_proc.size(),
             Qt.KeepAspectRatio,
             Qt.SmoothTransformation
         ))
-
-        self.lbl_orig.setMinimumSize(240, 180)
         self.lbl_proc.setMinimumSize(240, 180)
 
+        if self._memory_pool is not None:
+            self._memory_pool.set_pinned(
+                "previews", _pixmap_bytes(self.lbl_orig.pixmap()) + _pixmap_bytes(self.lbl_proc.pixmap())
+            )
+
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -283,6 +381,31 @@ class OCRDock(QDockWidget):
             self.lbl_conf.setText("Conf: —")
             return
 
+        from .cascade import cascade_from_json, run_cascade
+        from .preprocess import apply_preprocess
+        from .tesseract_engine import run_ocr
+
+        if self.ck_cascade.isChecked():
+            steps = cascade_from_json(self._get_cascade())
+            if not steps:
+                self.txt_out.setPlainText("A cascata do projeto está vazia (ocr_cascade).")
+                self.lbl_conf.setText("Conf: — | cascata vazia")
+                return
+            profiles = self._get_profiles() or {}
+            res = run_cascade(crop, steps, profiles)
+            if res.step < 0:
+                missing = ", ".join(sorted({s.profile for s in steps if s.profile not in profiles}))
+                self.txt_out.setPlainText(f"Nenhum passo da cascata rodou: perfis não encontrados ({missing}).")
+                self.lbl_conf.setText("Conf: — | cascata sem passos válidos")
+                return
+            self.txt_out.setPlainText(res.text)
+            if res.proc_bgr is not None:
+                self._show_processed(res.proc_bgr)  # preview do passo que venceu, não do perfil do dock
+            conf_txt = "—" if res.conf is None else f"{res.conf:.1f}"
+            status = "" if res.accepted else " (nenhum aceito)"
+            self.lbl_conf.setText(f"Conf: {conf_txt} | passo {res.step + 1}: {res.profile}{status}")
+            return
+
         params = self.pull_params_from_ui()
         img_ocr, _ = apply_preprocess(crop, params)
 
@@ -319,6 +442,7 @@ class OCRDock(QDockWidget):
         params = self.pull_params_from_ui()
         profiles = dict(self._get_profiles() or {})
         profiles[name] = params.to_dict()
+        self._unsaved.pop(name, None)
         self._set_profiles(profiles)
         self._set_active_profile(name)
         self.refresh_profiles()
@@ -332,9 +456,34 @@ class OCRDock(QDockWidget):
             return
 
         self._set_active_profile(name)
-        p = OCRParams.from_dict(profiles[name])
+        self._push_params_to_ui(OCRParams.from_dict(profiles[name]))
+        self.update_previews()
+
+    def show_region_profile(self, name: str):
+        """
+        Mostra o perfil vinculado à região, sem trocar o perfil ativo. Só troca
+        quando a região tem perfil próprio diferente do mostrado; edições não
+        salvas do perfil anterior ficam guardadas e voltam junto com ele.
+        """
+        name = (name or "").strip()
+        profiles = self._get_profiles() or {}
+        current = self.cb_profiles.currentText()
+        if not name or name == current or name not in profiles:
+            return
 
-        # push to UI
+        edited = self.pull_params_from_ui()
+        saved = profiles.get(current)
+        if saved is None or OCRParams.from_dict(saved).to_dict() != edited.to_dict():
+            self._unsaved[current] = edited
+
+        self.cb_profiles.blockSignals(True)
+        try:
+            self.cb_profiles.setCurrentText(name)
+        finally:
+            self.cb_profiles.blockSignals(False)
+        self._push_params_to_ui(self._unsaved.pop(name, None) or OCRParams.from_dict(profiles[name]))
+
+    def _push_params_to_ui(self, p: OCRParams):
         self.sp_scale.setValue(float(p.scale))
         self.ck_gray.setChecked(bool(p.grayscale))
         self.ck_invert.setChecked(bool(p.invert))
@@ -348,6 +497,13 @@ class OCRDock(QDockWidget):
         self.ed_lang.setText(str(p.lang))
         self.ed_whitelist.setText(str(p.whitelist))
         self.ed_blacklist.setText(str(p.blacklist))
+        _set_combo_data(self.cb_psm, str(p.psm))
+        _set_combo_data(self.cb_oem, int(p.oem))
+        self.cb_variant.setCurrentText(str(p.model_variant))
+        self.ck_split_lines.setChecked(bool(p.split_lines))
+        self.cb_recognizer.setCurrentText(str(p.recognizer))
+        self.ed_digits_model.setText(str(p.digits_model))
+        self.sp_digits_conf.setValue(float(p.digits_min_conf))
+        self.params.line_workers = int(p.line_workers)  # sem widget; preserva o valor do perfil
+        self.ed_tessdata.setText(str(p.tessdata_dir))
         self.ed_tcmd.setText(str(p.tesseract_cmd))
-
-        self.update_previews()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+import cv2
+
+
+def ink_mask(img: np.ndarray) -> np.ndarray:
+    """Máscara booleana de 'tinta' (texto), assumindo que o texto é a minoria dos pixels."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = bw == 0
+    if ink.mean() > 0.5:  # texto claro em fundo escuro
+        ink = ~ink
+    return ink
+
+
+def _runs(flags: np.ndarray) -> List[Tuple[int, int]]:
+    """Intervalos [início, fim) onde flags é True."""
+    padded = np.concatenate([[False], flags, [False]]).astype(np.int8)
+    d = np.diff(padded)
+    starts = np.flatnonzero(d == 1)
+    ends = np.flatnonzero(d == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def text_line_spans(img: np.ndarray, *, min_ink_frac: float = 0.01) -> List[Tuple[int, int]]:
+    """
+    Estima as linhas de texto pela projeção horizontal da tinta.
+    Retorna lista de (y0, y1) em ordem de cima para baixo.
+    """
+    return _line_spans(ink_mask(img), min_ink_frac)
+
+
+def _line_spans(ink: np.ndarray, min_ink_frac: float = 0.01) -> List[Tuple[int, int]]:
+    h, w = ink.shape[:2]
+    if h == 0 or w == 0:
+        return []
+
+    profile = ink.sum(axis=1)
+    spans = _runs(profile >= max(1, int(w * min_ink_frac)))
+    if not spans:
+        return []
+
+    # descarta ruído (riscos muito baixos) e junta acentos/pingos à linha vizinha
+    heights = np.array([y1 - y0 for y0, y1 in spans])
+    ref = float(np.median(heights))
+    merged: List[Tuple[int, int]] = []
+    for y0, y1 in spans:
+        if merged and (y0 - merged[-1][1]) < 0.2 * ref:
+            merged[-1] = (merged[-1][0], y1)
+        else:
+            merged.append((y0, y1))
+
+    ref = float(np.median([y1 - y0 for y0, y1 in merged]))
+    return [(y0, y1) for y0, y1 in merged if (y1 - y0) >= max(2.0, 0.35 * ref)]
+
+
+def count_text_lines(img: np.ndarray) -> int:
+    return len(text_line_spans(img))
+
+
+def choose_psm(img: np.ndarray, *, word_max_aspect: float = 3.0) -> int:
+    """
+    PSM automático pelo formato do campo:
+      - várias linhas -> 6 (bloco uniforme)
+      - uma linha curta -> 8 (palavra única)
+      - uma linha -> 7 (linha única)
+    """
+    ink = ink_mask(img)
+    spans = _line_spans(ink)
+    if len(spans) > 1:
+        return 6
+    if not spans:
+        return 7
+
+    y0, y1 = spans[0]
+    cols = np.flatnonzero(ink[y0:y1].any(axis=0))
+    ink_w = (cols[-1] - cols[0] + 1) if cols.size else ink.shape[1]
+    aspect = ink_w / max(1, y1 - y0)
+    return 8 if aspect <= word_max_aspect else 7
+
+
+def split_lines(img: np.ndarray, *, pad: int = 3) -> List[Tuple[int, int, np.ndarray]]:
+    """Recorta a região em linhas de texto: [(y0, y1, recorte), ...] de cima para baixo."""
+    h = img.shape[0]
+    out: List[Tuple[int, int, np.ndarray]] = []
+    for y0, y1 in text_line_spans(img):
+        a, b = max(0, y0 - pad), min(h, y1 + pad)
+        out.append((a, b, img[a:b]))
+    return out
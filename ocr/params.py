@@ -0,0 +1,65 @@
+"""
+Parâmetros de OCR/pré-processamento. Só biblioteca padrão: a GUI importa
+isto na partida sem carregar numpy/OpenCV (ver ocr/preprocess.py).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, asdict
+from typing import Any, Dict
+
+
+@dataclass
+class OCRParams:
+    # tesseract
+    lang: str = "por"
+    whitelist: str = ""
+    blacklist: str = ""
+    tesseract_cmd: str = ""  # opcional (Windows)
+    psm: str = ""            # "" (padrão do tesseract) | "auto" | "3".."13"
+    oem: int = -1            # -1 = padrão; 0 legacy | 1 LSTM | 2 ambos | 3 auto
+    tessdata_dir: str = ""   # opcional; pasta com os .traineddata
+    model_variant: str = ""  # "" | "fast" | "best" (tessdata_fast / tessdata_best)
+    split_lines: bool = False  # segmenta em linhas e reconhece cada uma em paralelo (psm 7)
+    line_workers: int = 0      # 0 = nº de CPUs
+    recognizer: str = "tesseract"  # "tesseract" | "digits" (k-NN para whitelists numéricas)
+    digits_model: str = ""         # modelo .npz do reconhecedor de dígitos
+    digits_min_conf: float = 90.0  # abaixo disso volta para o Tesseract
+
+    # preprocess
+    scale: float = 2.0
+    grayscale: bool = True
+    invert: bool = False
+
+    threshold_mode: str = "otsu"  # "none" | "otsu" | "adaptive"
+    adaptive_block_size: int = 31
+    adaptive_c: int = 7
+
+    blur_ksize: int = 0  # 0 desliga; valores ímpares: 3,5,7...
+    sharpen: bool = False
+
+    morph_mode: str = "none"  # "none" | "open" | "close"
+    morph_ksize: int = 3
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(d: Dict[str, Any]) -> "OCRParams":
+        p = OCRParams()
+        for k, v in (d or {}).items():
+            if hasattr(p, k):
+                setattr(p, k, v)
+        # sanitização mínima
+        p.adaptive_block_size = max(3, int(p.adaptive_block_size) | 1)  # ímpar >=3
+        p.blur_ksize = int(p.blur_ksize)
+        if p.blur_ksize != 0:
+            p.blur_ksize = max(3, p.blur_ksize | 1)
+        p.morph_ksize = max(1, int(p.morph_ksize) | 1)
+        p.scale = max(1.0, float(p.scale))
+        p.psm = str(p.psm or "").strip()
+        p.oem = int(p.oem)
+        p.split_lines = bool(p.split_lines)
+        p.line_workers = max(0, int(p.line_workers))
+        p.recognizer = str(p.recognizer or "tesseract")
+        p.digits_min_conf = float(p.digits_min_conf)
+        return p
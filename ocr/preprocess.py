@@ -1,52 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
-from typing import Any, Dict, Tuple
+from typing import Tuple
 
 import numpy as np
 import cv2
 
-
-@dataclass
-class OCRParams:
-    # tesseract
-    lang: str = "por"
-    whitelist: str = ""
-    blacklist: str = ""
-    tesseract_cmd: str = ""  # opcional (Windows)
-
-    # preprocess
-    scale: float = 2.0
-    grayscale: bool = True
-    invert: bool = False
-
-    threshold_mode: str = "otsu"  # "none" | "otsu" | "adaptive"
-    adaptive_block_size: int = 31
-    adaptive_c: int = 7
-
-    blur_ksize: int = 0  # 0 desliga; valores ímpares: 3,5,7...
-    sharpen: bool = False
-
-    morph_mode: str = "none"  # "none" | "open" | "close"
-    morph_ksize: int = 3
-
-    def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
-
-    @staticmethod
-    def from_dict(d: Dict[str, Any]) -> "OCRParams":
-        p = OCRParams()
-        for k, v in (d or {}).items():
-            if hasattr(p, k):
-                setattr(p, k, v)
-        # sanitização mínima
-        p.adaptive_block_size = max(3, int(p.adaptive_block_size) | 1)  # ímpar >=3
-        p.blur_ksize = int(p.blur_ksize)
-        if p.blur_ksize != 0:
-            p.blur_ksize = max(3, p.blur_ksize | 1)
-        p.morph_ksize = max(1, int(p.morph_ksize) | 1)
-        p.scale = max(1.0, float(p.scale))
-        return p
+from .params import OCRParams  # reexportado: "from ocr.preprocess import OCRParams" continua valendo
 
 
 def apply_preprocess(bgr: np.ndarray, params: OCRParams) -> Tuple[np.ndarray, np.ndarray]:
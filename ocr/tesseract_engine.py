@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-from typing import Dict, Any, Tuple, Optional
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Any, List, Tuple, Optional
 
 import pytesseract
 from pytesseract import Output
 import numpy as np
 
+from .digits import is_digit_whitelist, load_model, recognize_digits
+from .layout import choose_psm, split_lines
 from .preprocess import OCRParams
 
 
@@ -14,8 +19,43 @@ def configure_tesseract(params: OCRParams) -> None:
         pytesseract.pytesseract.tesseract_cmd = params.tesseract_cmd.strip()
 
 
-def build_config(params: OCRParams) -> str:
+def resolve_tessdata_dir(params: OCRParams) -> str:
+    """
+    Pasta de modelos efetiva. Com model_variant ("fast"/"best"), procura
+    tessdata_<variant>/ ou <variant>/ dentro de tessdata_dir.
+    """
+    base = (params.tessdata_dir or "").strip()
+    variant = (params.model_variant or "").strip()
+    if not base or not variant:
+        return base
+    for cand in (os.path.join(base, f"tessdata_{variant}"), os.path.join(base, variant)):
+        if os.path.isdir(cand):
+            return cand
+    return base
+
+
+def resolve_psm(params: OCRParams, image: Optional[np.ndarray] = None) -> Optional[int]:
+    psm = (params.psm or "").strip().lower()
+    if not psm:
+        return None
+    if psm == "auto":
+        return choose_psm(image) if image is not None else None
+    try:
+        return int(psm)
+    except ValueError:
+        return None
+
+
+def build_config(params: OCRParams, image: Optional[np.ndarray] = None) -> str:
     cfg = []
+    psm = resolve_psm(params, image)
+    if psm is not None:
+        cfg.append(f"--psm {psm}")
+    if params.oem is not None and int(params.oem) >= 0:
+        cfg.append(f"--oem {int(params.oem)}")
+    tessdata = resolve_tessdata_dir(params)
+    if tessdata:
+        cfg.append(f'--tessdata-dir "{tessdata}"')
     if params.whitelist.strip():
         cfg.append(f'-c tessedit_char_whitelist={params.whitelist.strip()}')
     if params.blacklist.strip():
@@ -23,13 +63,35 @@ def build_config(params: OCRParams) -> str:
     return " ".join(cfg)
 
 
+def use_digit_recognizer(params: OCRParams) -> bool:
+    return (
+        params.recognizer == "digits"
+        and bool(params.digits_model)
+        and os.path.exists(params.digits_model)
+        and is_digit_whitelist(params.whitelist)
+    )
+
+
 def run_ocr(image_gray: np.ndarray, params: OCRParams) -> Tuple[str, Optional[float], Dict[str, Any]]:
     """
     Retorna: (texto, conf_media, raw_data)
     conf_media = média das confs válidas (>=0), quando disponível
     """
+    if use_digit_recognizer(params):
+        text, conf = recognize_digits(image_gray, load_model(params.digits_model), params.whitelist.strip())
+        if conf >= params.digits_min_conf:
+            return text, conf, {"recognizer": "digits"}
+        # confiança baixa: segue para o Tesseract
+
+    if params.split_lines:
+        return run_ocr_lines(image_gray, params)
+    return _run_tesseract(image_gray, params)
+
+
+def _run_tesseract(image_gray: np.ndarray, params: OCRParams) -> Tuple[str, Optional[float], Dict[str, Any]]:
+    """Região inteira numa chamada do Tesseract (sem reconhecedor de dígitos)."""
     configure_tesseract(params)
-    config = build_config(params)
+    config = build_config(params, image_gray)
 
     data = pytesseract.image_to_data(
         image_gray,
@@ -44,6 +106,12 @@ def run_ocr(image_gray: np.ndarray, params: OCRParams) -> Tuple[str, Optional[fl
         config=config,
     ) or "").strip()
 
+    confs = _valid_confs(data)
+    conf_mean = (sum(confs) / len(confs)) if confs else None
+    return text, conf_mean, data
+
+
+def _valid_confs(data: Dict[str, Any]) -> List[float]:
     confs = []
     for c in data.get("conf", []):
         try:
@@ -52,6 +120,56 @@ def run_ocr(image_gray: np.ndarray, params: OCRParams) -> Tuple[str, Optional[fl
                 confs.append(v)
         except Exception:
             pass
+    return confs
 
-    conf_mean = (sum(confs) / len(confs)) if confs else None
-    return text, conf_mean, data
+
+def _ocr_line(image_line: np.ndarray, params: OCRParams, config: str) -> Tuple[str, List[float]]:
+    # uma única chamada por linha: o texto sai do próprio image_to_data
+    data = pytesseract.image_to_data(
+        image_line,
+        lang=params.lang.strip() or "por",
+        config=config,
+        output_type=Output.DICT,
+    )
+    words = [t for t in data.get("text", []) if (t or "").strip()]
+    return " ".join(words), _valid_confs(data)
+
+
+def run_ocr_lines(
+    image_gray: np.ndarray,
+    params: OCRParams,
+    max_workers: Optional[int] = None,
+) -> Tuple[str, Optional[float], Dict[str, Any]]:
+    """
+    Divide a região em linhas (projeção horizontal) e reconhece cada linha
+    em modo linha única, em paralelo. O texto é remontado na ordem original.
+    raw_data = {"lines": [{"y0", "y1", "text", "conf"}, ...]}
+    """
+    single = replace(params, split_lines=False)
+    lines = split_lines(image_gray)
+    if len(lines) <= 1:
+        # o reconhecedor de dígitos já rodou em run_ocr
+        return _run_tesseract(image_gray, single)
+
+    configure_tesseract(params)
+    config = build_config(replace(single, psm="7"))
+
+    workers = max_workers or params.line_workers or (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(lines)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda ln: _ocr_line(ln[2], single, config), lines))
+
+    out_lines = []
+    all_confs: List[float] = []
+    for (y0, y1, _), (line_text, confs) in zip(lines, results):
+        all_confs.extend(confs)
+        out_lines.append({
+            "y0": y0,
+            "y1": y1,
+            "text": line_text,
+            "conf": (sum(confs) / len(confs)) if confs else None,
+        })
+
+    text = "\n".join(ln["text"] for ln in out_lines).strip()
+    conf_mean = (sum(all_confs) / len(all_confs)) if all_confs else None
+    return text, conf_mean, {"lines": out_lines}
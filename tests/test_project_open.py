@@ -0,0 +1,88 @@
+"""
+Abrir um projeto salvo rasteriza a página uma única vez, já na página e no
+transform gravados (PyMuPDF substituído por um documento falso).
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import types
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("numpy")
+pytest.importorskip("PySide6.QtWidgets")
+
+from PySide6.QtGui import QPixmap, QTransform  # noqa: E402
+from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox  # noqa: E402
+
+
+class _FakeDoc:
+    page_count = 3
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("OCR_RASTER_CACHE_MB", "0")
+    fake_fitz = types.ModuleType("fitz")
+    fake_fitz.open = lambda path: _FakeDoc()
+    monkeypatch.setitem(sys.modules, "fitz", fake_fitz)
+
+    app = QApplication.instance() or QApplication([])
+    from app.window import MainWindow
+
+    win = MainWindow()
+    yield win
+    win.close()
+    app.processEvents()
+
+
+def test_open_project_renders_once(window, tmp_path, monkeypatch):
+    from app.window import PAGE_RENDERS, MainWindow
+
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    proj = tmp_path / "proj.json"
+    proj.write_text(json.dumps({
+        "version": 1,
+        "source_path": str(pdf),
+        "is_pdf": True,
+        "pdf_page_index": 2,
+        "pdf_render_zoom": 2.0,
+        "view_transform": [1.5, 0, 0, 0, 1.5, 0, 0, 0, 1],
+        "annotations": {
+            "0": [{"label": "A", "x0_norm": 0.1, "y0_norm": 0.1, "x1_norm": 0.2, "y1_norm": 0.2}],
+            "2": [{"label": "B", "x0_norm": 0.3, "y0_norm": 0.3, "x1_norm": 0.5, "y1_norm": 0.4}],
+        },
+        "ocr_profiles": {},
+        "active_profile_name": "",
+    }), encoding="utf-8")
+
+    rendered = []
+
+    def fake_render(self, page_index):
+        rendered.append(page_index)
+        pix = QPixmap(200, 300)
+        pix.fill()
+        return pix
+
+    monkeypatch.setattr(MainWindow, "_render_page_pixmap", fake_render)
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", staticmethod(lambda *a, **k: (str(proj), "")))
+    monkeypatch.setattr(QMessageBox, "information", staticmethod(lambda *a, **k: None))
+    monkeypatch.setattr(QMessageBox, "critical", staticmethod(lambda *a, **k: pytest.fail(a[-1])))
+    monkeypatch.setattr(QMessageBox, "warning", staticmethod(lambda *a, **k: pytest.fail(a[-1])))
+
+    before = PAGE_RENDERS.total()
+    window.open_project()
+
+    assert PAGE_RENDERS.total() - before == 1
+    assert rendered == [2]
+    assert window._page_index == 2
+    assert window.view.transform() == QTransform(1.5, 0, 0, 0, 1.5, 0, 0, 0, 1)
+    assert [it.label() for it in window.rect_model.items] == ["B"]